@@ -0,0 +1,163 @@
+"""
+Agent Pool
+----------
+A fixed number of ExpertAgents per process that serve any session.
+
+Each ExpertAgent holds the subject expert engines and their knowledge bases,
+so one agent per Streamlit session made process memory grow with the number
+of sessions. ``AgentPool.session()`` checks out a pooled agent, loads the
+session's state from the session store into it, and writes the state back
+when the request finishes. Per-process memory depends on the pool size, not on
+how many sessions exist.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import AGENT_POOL_SIZE
+from core.session_store import SessionState, SessionStore, get_session_store
+from utils.metrics import METRICS
+
+# Locks serializing requests per session. Sessions share a fixed set of
+# stripes (hash of the ID), so the lock table does not grow with sessions.
+SESSION_LOCK_STRIPES = 256
+
+
+class PooledSession:
+    """A checked-out agent together with the state of the session it serves."""
+
+    __slots__ = ('agent', 'state')
+
+    def __init__(self, agent, state: SessionState):
+        self.agent = agent
+        self.state = state
+
+
+class AgentPool:
+    """
+    Thread-safe pool of agents backed by a session store.
+
+    Args:
+        size: Maximum number of agents created in this process
+        store: Session store (the process-wide SQLite store by default)
+        factory: Callable creating an agent (ExpertAgent by default)
+    """
+
+    def __init__(self, size: int = AGENT_POOL_SIZE, store: Optional[SessionStore] = None,
+                 factory: Optional[Callable] = None):
+        self.size = size
+        self.store = store or get_session_store()
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._session_locks = tuple(threading.Lock() for _ in range(SESSION_LOCK_STRIPES))
+        self.checkouts = 0
+        self.waits = 0
+
+    def _create_agent(self):
+        if self._factory is None:
+            from agents.expert_agent import ExpertAgent
+            return ExpertAgent()
+        return self._factory()
+
+    def _acquire(self):
+        """Take an idle agent, create one if below ``size``, or wait for one (timed as agent_pool_wait_ms)."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+                self.waits += 1
+        if create:
+            try:
+                return self._create_agent()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        start = time.perf_counter()
+        agent = self._idle.get()
+        METRICS.observe('agent_pool_wait_ms', (time.perf_counter() - start) * 1000)
+        return agent
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        """Stripe lock of a session (two sessions may share one: never hold one while taking another)."""
+        return self._session_locks[hash(session_id) % len(self._session_locks)]
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[PooledSession]:
+        """
+        Serve one request of a session.
+
+        Requests of the same session are serialized within this process. The
+        state is saved only if the block finishes without an exception.
+
+        Yields:
+            PooledSession with the agent (restored to the session) and its SessionState
+        """
+        with self._session_lock(session_id):
+            state = self.store.load(session_id)
+            agent = self._acquire()
+            with self._lock:
+                self.checkouts += 1
+            try:
+                agent.reset()
+                agent.restore_session(state)
+                yield PooledSession(agent, state)
+                agent.export_session(state)
+                self.store.save(state)
+            finally:
+                self._idle.put(agent)
+
+    def warm_up(self, count: int = 1):
+        """Create up to ``count`` agents ahead of the first request."""
+        agents = [self._acquire() for _ in range(min(count, self.size))]
+        for agent in agents:
+            self._idle.put(agent)
+
+    def idle_agents(self) -> List:
+        """Agents not checked out right now (for diagnostics; do not use them for requests)."""
+        with self._idle.mutex:
+            return list(self._idle.queue)
+
+    def clear_session(self, session_id: str):
+        """Forget a session's stored state."""
+        with self._session_lock(session_id):
+            self.store.delete(session_id)
+
+    def stats(self) -> Dict:
+        """Pool usage for reporting."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'agents_created': self._created,
+                'idle_agents': self._idle.qsize(),
+                'checkouts': self.checkouts,
+                'waits': self.waits
+            }
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentPool:
+    """The process-wide agent pool (created on first use)."""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = AgentPool()
+                METRICS.register_collector('agent_pool', _default_pool.stats,
+                                           counters=('agents_created', 'checkouts', 'waits'))
+                METRICS.register_collector('session_store', _default_pool.store.stats, counters=('loads', 'saves'))
+    return _default_pool
@@ -0,0 +1,262 @@
+"""
+Bulk Question Runner
+--------------------
+Streams questions from a JSON-lines file through the tutor pipeline.
+
+Each input line is a JSON object with a ``question`` (and optionally an
+``id``). Every question runs through routing, expert lookup and enhancement on
+its own reset ExpertAgent. Questions run concurrently, up to ``--concurrency``
+of them, and start no faster than ``--rate`` per second. Results are
+appended to the output file as they finish, one JSON object per line, with
+per-stage timings.
+
+Input is read lazily, and only a bounded number of questions is in flight,
+so memory does not depend on the size of the dataset. If the output file
+already exists, questions whose IDs it contains are skipped. An interrupted
+run therefore resumes where it stopped (use ``--restart`` to start over).
+
+Usage:
+    python -m agents.bulk_runner questions.jsonl -o results.jsonl --concurrency 4 --rate 2
+    python -m agents.bulk_runner questions.jsonl -o results.jsonl --fake-llm
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+from config import BULK_CONCURRENCY, BULK_RATE_LIMIT
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how fast questions start.
+
+    Args:
+        rate: Questions per second (0 or less = unlimited)
+        burst: Questions that may start back to back
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a question may start."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def read_questions(path: str, done: Set[str]) -> Iterator[Tuple[str, Dict]]:
+    """
+    Lazily yield (id, record) for each input line whose ID is not in ``done``.
+
+    Lines without an ``id`` (or with a null one) get ``line-<n>`` (1-based line
+    number), so IDs stay stable across resumed runs. Other IDs, including 0
+    and "", are kept as given. A bare JSON string is the question itself; lines
+    that are neither an object nor a string become error records.
+    """
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = {'question': None, 'error': f"Invalid JSON on line {line_number}"}
+            if isinstance(record, str):
+                record = {'question': record}
+            elif not isinstance(record, dict):
+                record = {'question': None,
+                          'error': f"Expected a JSON object or string on line {line_number}, got {type(record).__name__}"}
+            question_id = record.get('id')
+            question_id = str(question_id if question_id is not None else f"line-{line_number}")
+            if question_id not in done:
+                yield question_id, record
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    IDs already present in an output file.
+
+    A trailing partial line (from an interrupted write) is cut off so appended
+    results start on a fresh line.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as f:
+        valid_end = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(raw)['id'])
+            except (ValueError, KeyError):
+                pass
+            valid_end += len(raw)
+        f.truncate(valid_end)
+    return done
+
+
+class BulkRunner:
+    """
+    Runs questions concurrently on a fixed set of ExpertAgents.
+
+    Args:
+        concurrency: Questions processed at the same time (one agent each)
+        rate: Questions started per second (0 = unlimited)
+        agent_factory: Callable creating an agent (ExpertAgent by default)
+    """
+
+    def __init__(self, concurrency: int = BULK_CONCURRENCY, rate: float = BULK_RATE_LIMIT,
+                 agent_factory: Optional[Callable] = None):
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate, burst=self.concurrency)
+        if agent_factory is None:
+            from agents.expert_agent import ExpertAgent
+            agent_factory = ExpertAgent
+        self._agents = queue.Queue()
+        for _ in range(self.concurrency):
+            self._agents.put(agent_factory())
+
+    def process(self, question_id: str, record: Dict) -> Dict:
+        """Run one question and build its output record (never raises)."""
+        question = record.get('question')
+        output = {'id': question_id, 'question': question}
+        if not isinstance(question, str) or not question.strip():
+            output.update(status='error', error=record.get('error') or "Missing 'question'")
+            return output
+
+        self.limiter.acquire()
+        agent = self._agents.get()
+        start = time.perf_counter()
+        timings = {}
+        try:
+            agent.reset()
+            result = agent.process_query(question.strip())
+            trace = result.get('timings') or {}
+            timings = {stage: round(ms, 3) for stage, ms in trace.get('stages_ms', {}).items()}
+            output['tokens'] = (trace.get('tokens') or {}).get('total_tokens')
+            raw = result.get('raw_expert_response') or []
+            if isinstance(raw, Mapping):
+                raw = [raw]
+            output.update(
+                status='ok',
+                tool_used=result.get('tool_used'),
+                query_topics=result.get('query_topics', []),
+                concepts=[data.get('concept') for data in raw if isinstance(data, Mapping)],
+                success=result.get('success', False),
+                confidence=(result.get('confidence_metrics') or {}).get('aggregate_certainty'),
+                response=result.get('response')
+            )
+        except Exception as e:
+            output.update(status='error', error=f"{type(e).__name__}: {e}")
+        finally:
+            timings['total'] = round((time.perf_counter() - start) * 1000, 3)
+            output['timings_ms'] = timings
+            self._agents.put(agent)
+        return output
+
+    def run(self, input_path: str, output_path: str, resume: bool = True,
+            limit: Optional[int] = None, progress_every: int = 50) -> Dict:
+        """
+        Process every pending question of ``input_path`` into ``output_path``.
+
+        Returns:
+            Summary with counts, wall time, throughput and mean stage timings
+        """
+        done = completed_ids(output_path) if resume else set()
+        mode = 'a' if resume else 'w'
+        summary = {'skipped': len(done), 'processed': 0, 'errors': 0, 'stage_ms': {}}
+        max_in_flight = self.concurrency * 2
+        start = time.perf_counter()
+
+        with open(output_path, mode, encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bulk") as executor:
+            pending = set()
+
+            def drain(block: bool):
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED) if block else (
+                    {f for f in pending if f.done()}, None)
+                for future in finished:
+                    pending.discard(future)
+                    output = future.result()
+                    out.write(json.dumps(output, ensure_ascii=False, default=str) + "\n")
+                    out.flush()
+                    summary['processed'] += 1
+                    summary['errors'] += output['status'] != 'ok'
+                    for stage, ms in output.get('timings_ms', {}).items():
+                        summary['stage_ms'][stage] = summary['stage_ms'].get(stage, 0.0) + ms
+                    if progress_every and summary['processed'] % progress_every == 0:
+                        rate = summary['processed'] / (time.perf_counter() - start)
+                        log.info("bulk_progress", processed=summary['processed'],
+                                 questions_per_s=round(rate, 1), errors=summary['errors'])
+
+            for count, (question_id, record) in enumerate(read_questions(input_path, done)):
+                if limit is not None and count >= limit:
+                    break
+                if len(pending) >= max_in_flight:
+                    drain(block=True)
+                pending.add(executor.submit(self.process, question_id, record))
+                drain(block=False)
+            while pending:
+                drain(block=True)
+
+        wall = time.perf_counter() - start
+        processed = summary['processed']
+        summary['wall_time_s'] = wall
+        summary['throughput_qps'] = processed / wall if wall else 0.0
+        summary['stage_ms'] = {stage: total / processed for stage, total in summary['stage_ms'].items()} if processed else {}
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSON-lines file of questions through the tutor")
+    parser.add_argument('input', help="JSON lines with a 'question' (and optional 'id') per line")
+    parser.add_argument('-o', '--output', required=True, help="JSON-lines results file (appended to when resuming)")
+    parser.add_argument('--concurrency', type=int, default=BULK_CONCURRENCY, help="Questions processed at once")
+    parser.add_argument('--rate', type=float, default=BULK_RATE_LIMIT, help="Questions started per second (0 = unlimited)")
+    parser.add_argument('--limit', type=int, help="Process at most this many pending questions")
+    parser.add_argument('--restart', action='store_true', help="Ignore existing results and overwrite the output")
+    parser.add_argument('--fake-llm', action='store_true', help="Use the offline fake LLM (benchmarks/fake_llm.py)")
+    args = parser.parse_args()
+
+    if args.fake_llm:
+        from benchmarks.fake_llm import install_fake_llm
+        install_fake_llm()
+
+    runner = BulkRunner(concurrency=args.concurrency, rate=args.rate)
+    summary = runner.run(args.input, args.output, resume=not args.restart, limit=args.limit)
+
+    print(f"✅ Processed {summary['processed']} questions ({summary['errors']} errors, "
+          f"{summary['skipped']} already done) in {summary['wall_time_s']:.1f}s "
+          f"({summary['throughput_qps']:.2f} questions/s)")
+    for stage, ms in summary['stage_ms'].items():
+        print(f"   {stage:22s} {ms:9.1f} ms/question")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Conversation History
+--------------------
+Bounded, compact history of ExpertAgent turns.
+
+The agent used to append every result dict, including the matched KB entries
+(``raw_expert_response``) and the LLM analysis, to a list that grew for the
+lifetime of the session. ``ConversationHistory`` keeps only the last
+``MAX_HISTORY_ITEMS`` turns as small ``TurnRecord`` objects (topic IDs, tool,
+a reference to the answer text, timings). Older turns are folded into running
+summary counters and, if ``HISTORY_SPILL_DIR`` is set, appended to a JSON-lines
+file per session.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import MAX_HISTORY_ITEMS, HISTORY_SPILL_DIR
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+
+class TurnRecord:
+    """Compact record of one agent turn (no copies of KB payloads)."""
+
+    __slots__ = ('query', 'tool', 'topics', 'concepts', 'answer', 'success',
+                 'confidence', 'elapsed', 'timestamp')
+
+    def __init__(self, query: str, tool: Optional[str], topics: tuple, concepts: tuple,
+                 answer: Any, success: bool, confidence: Optional[float],
+                 elapsed: float, timestamp: float):
+        self.query = query
+        self.tool = tool
+        self.topics = topics
+        self.concepts = concepts
+        self.answer = answer  # Same object as result['response'], not a copy
+        self.success = success
+        self.confidence = confidence
+        self.elapsed = elapsed
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_result(cls, query: str, result: Dict[str, Any], elapsed: float = 0.0) -> 'TurnRecord':
+        """Build a record from a process_query result dict."""
+        raw = result.get('raw_expert_response') or []
+        if isinstance(raw, Mapping):
+            raw = [raw]
+        # Expert responses are KBRecord/ScoredResponse Mappings, not dicts
+        concepts = tuple(data.get('concept') for data in raw if isinstance(data, Mapping) and data.get('concept'))
+        confidence = (result.get('confidence_metrics') or {}).get('aggregate_certainty')
+        return cls(
+            query=query,
+            tool=result.get('tool_used'),
+            topics=tuple(topic for topic in result.get('query_topics') or () if topic),
+            concepts=concepts,
+            answer=result.get('response'),
+            success=bool(result.get('success')),
+            confidence=confidence,
+            elapsed=elapsed,
+            timestamp=time.time()
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TurnRecord':
+        """Rebuild a record from ``to_dict()`` output."""
+        return cls(
+            query=data['query'],
+            tool=data.get('tool'),
+            topics=tuple(data.get('topics', ())),
+            concepts=tuple(data.get('concepts', ())),
+            answer=data.get('answer'),
+            success=data.get('success', False),
+            confidence=data.get('confidence'),
+            elapsed=data.get('elapsed', 0.0),
+            timestamp=data.get('timestamp', 0.0)
+        )
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for serialization."""
+        return {
+            'query': self.query,
+            'tool': self.tool,
+            'topics': list(self.topics),
+            'concepts': list(self.concepts),
+            'answer': self.answer if isinstance(self.answer, str) else str(self.answer),
+            'success': self.success,
+            'confidence': self.confidence,
+            'elapsed': self.elapsed,
+            'timestamp': self.timestamp
+        }
+
+
+class ConversationHistory:
+    """
+    Ring buffer of TurnRecords with summary counters for spilled turns.
+
+    Args:
+        max_items: Turns kept in memory (oldest are spilled beyond this)
+        spill_dir: Directory for the per-session JSON-lines spill file (None = summary only)
+    """
+
+    def __init__(self, max_items: int = MAX_HISTORY_ITEMS, spill_dir: Optional[str] = HISTORY_SPILL_DIR):
+        self.max_items = max_items
+        self.spill_dir = spill_dir
+        self.session_id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self.clear()
+
+    @property
+    def spill_path(self) -> Optional[str]:
+        """JSON-lines file receiving spilled turns (None when disabled)."""
+        if not self.spill_dir:
+            return None
+        return os.path.join(self.spill_dir, f"history_{self.session_id}.jsonl")
+
+    def add(self, query: str, result: Dict[str, Any], elapsed: float = 0.0) -> TurnRecord:
+        """Record a turn, spilling the oldest one when the buffer is full."""
+        record = TurnRecord.from_result(query, result, elapsed)
+        with self._lock:
+            if len(self._turns) == self.max_items:
+                self._spill(self._turns.popleft())
+            self._turns.append(record)
+            self._tool_counts[record.tool] += 1
+            self._topic_counts.update(record.topics)
+            self.total_turns += 1
+            self.total_time += elapsed
+        return record
+
+    def _spill(self, record: TurnRecord):
+        """Fold an evicted turn into the summary (and the spill file, if enabled)."""
+        self.spilled_turns += 1
+        path = self.spill_path
+        if path is None:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            log.warning("history_spill_failed", path=path, error=str(e))
+
+    def recent(self, n: Optional[int] = None) -> List[TurnRecord]:
+        """The most recent in-memory turns, oldest first."""
+        turns = list(self._turns)
+        return turns if n is None else turns[-n:]
+
+    def load_spilled(self) -> List[Dict]:
+        """Read spilled turns back from disk (empty if spilling is disabled)."""
+        path = self.spill_path
+        if path is None or not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def stats(self) -> Dict:
+        """Statistics for the sidebar and diagnostics."""
+        with self._lock:
+            return {
+                'total_turns': self.total_turns,
+                'in_memory': len(self._turns),
+                'max_items': self.max_items,
+                'spilled_turns': self.spilled_turns,
+                'spill_path': self.spill_path,
+                'by_tool': dict(self._tool_counts),
+                'top_topics': self._topic_counts.most_common(5),
+                'avg_turn_time': self.total_time / self.total_turns if self.total_turns else 0.0
+            }
+
+    def restore(self, records: List[Dict], total_turns: int = None):
+        """
+        Replace the history with stored turn records (see core.session_store).
+
+        Args:
+            records: ``TurnRecord.to_dict()`` outputs, oldest first
+            total_turns: Turns recorded over the whole session (defaults to len(records))
+        """
+        self.clear()
+        with self._lock:
+            for data in records[-self.max_items:]:
+                record = TurnRecord.from_dict(data)
+                self._turns.append(record)
+                self._tool_counts[record.tool] += 1
+                self._topic_counts.update(record.topics)
+                self.total_time += record.elapsed
+            self.total_turns = max(total_turns or 0, len(self._turns))
+            self.spilled_turns = self.total_turns - len(self._turns)
+
+    def clear(self):
+        """Drop all turns and reset the counters (a spill file is left on disk)."""
+        with self._lock:
+            self._turns = deque()
+            self._tool_counts = Counter()
+            self._topic_counts = Counter()
+            self.total_turns = 0
+            self.spilled_turns = 0
+            self.total_time = 0.0
+
+    def new_session(self):
+        """Clear the history and give it a new session ID (new token ledger and spill file)."""
+        self.clear()
+        self.session_id = uuid.uuid4().hex
+
+    def __len__(self) -> int:
+        """Total turns recorded, including spilled ones."""
+        return self.total_turns
+
+    def __iter__(self) -> Iterator[TurnRecord]:
+        return iter(self.recent())
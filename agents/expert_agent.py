@@ -6,17 +6,92 @@ Study Guide is now a standalone system in a separate tab.
 Uses OpenAI LLM to understand queries and select appropriate expert tools.
 """
 
-from openai import OpenAI
-from typing import Dict, Any, List
-import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, List, Set, Tuple
 from dotenv import load_dotenv
 
 from experts.biology_expert import BiologyExpert
 from experts.physics_expert import PhysicsExpert
 from experts.chemistry_expert import ChemistryExpert
+from experts.kb_records import rule_records
+from config import SPELLING_CORRECTION
+from utils.llm_cache import LLM_CACHE
+from utils.llm_client import get_openai_client
+from utils.log import get_logger, new_request_id, request_context
+from utils.metrics import METRICS
+from utils.spelling import WORD_PATTERN, SpellingIndex, load_word_list, word_stems
+from utils.token_usage import TOKEN_USAGE, TokenBudgetExceeded, budget_exhausted, record_usage
+from utils.tracing import span, start_trace
+from agents.conversation_history import ConversationHistory
 
 load_dotenv()
 
+log = get_logger(__name__)
+
+# Query words the topic search ignores
+STOP_WORDS = frozenset({'what', 'are', 'is', 'the', 'a', 'an', 'of', 'in', 'on', 'at', 'to', 'for', 'with', 'about', 'tell', 'me', 'explain', 'describe', 'available'})
+
+# Topic search points of a query word equal to a topic-name word, or to an inflection of one
+EXACT_WORD_POINTS = 50
+STEM_WORD_POINTS = 45
+
+# Question phrasing the spelling index treats as correctly spelled (besides the KB text)
+QUESTION_WORDS = frozenset({
+    'how', 'why', 'when', 'where', 'which', 'who', 'does', 'did', 'can', 'could', 'would', 'should',
+    'define', 'definition', 'give', 'list', 'happen', 'happens', 'work', 'works', 'difference',
+    'between', 'mean', 'means', 'example', 'examples', 'help', 'please', 'understand', 'know', 'show'
+})
+
+
+def kb_vocabulary(tools: Dict[str, Any]) -> Tuple[Counter, Set[str], Set[str]]:
+    """
+    Words of the expert engines' knowledge bases.
+    
+    The rule payloads are read from the engines' source (see
+    experts.kb_records.rule_records); no rule is run.
+    
+    Returns:
+        (targets, domain, known):
+        targets - topic-name tokens and concept, explanation and example words
+        -> frequency (the correction candidates);
+        domain - the topic-name tokens (corrected with the full edit budget);
+        known - stop words, QUESTION_WORDS and the general English word list
+        (spelled correctly, never suggested)
+    """
+    targets = Counter()
+    domain = set()
+    known = set(STOP_WORDS | QUESTION_WORDS | load_word_list())
+    for expert in tools.values():
+        for rule_name, records in rule_records(type(expert)).items():
+            words = [w for w in rule_name[len('rule_'):].split('_') if len(w) > 2]
+            targets.update(words)
+            domain.update(words)
+            for record in records:
+                text = ' '.join((record.concept or '', record.explanation or '') + record.examples)
+                targets.update(w for w in WORD_PATTERN.findall(text.lower()) if len(w) > 2)
+    return targets, domain, known
+
+
+_spelling_index = None
+_spelling_index_lock = threading.Lock()
+
+
+def get_spelling_index(tools: Dict[str, Any]) -> SpellingIndex:
+    """The process-wide spelling index over the KB vocabulary (built from ``tools`` on first use)."""
+    global _spelling_index
+    if _spelling_index is None:
+        with _spelling_index_lock:
+            if _spelling_index is None:
+                start = time.perf_counter()
+                targets, domain, known = kb_vocabulary(tools)
+                _spelling_index = SpellingIndex(targets, known, domain)
+                log.info("spelling_index_ready", ms=(time.perf_counter() - start) * 1000, **_spelling_index.stats())
+                METRICS.register_collector('spelling', _spelling_index.stats)
+    return _spelling_index
+
 
 class ExpertAgent:
     """
@@ -34,12 +109,8 @@ class ExpertAgent:
     
     def __init__(self):
         """Initialize the Expert Agent with subject expert tools."""
-        # Initialize OpenAI
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        
-        self.client = OpenAI(api_key=api_key)
+        # Shared, connection-pooled OpenAI client (raises ValueError without OPENAI_API_KEY)
+        self.client = get_openai_client()
         self.model = "gpt-4o-mini"  # Using GPT-4o-mini for cost efficiency
         
         # Initialize subject expert system tools (Study Guide moved to separate tab)
@@ -49,21 +120,28 @@ class ExpertAgent:
             'chemistry_expert': ChemistryExpert()
         }
         
+        # Expert name -> [(topic, lowercase topic, topic words)] for the topic search
+        self._topic_words = {}
+        
+        # Spelling correction for topic search (built once per process from the KB)
+        self.spelling = get_spelling_index(self.tools) if SPELLING_CORRECTION else None
+        
         # Reset all expert systems
         for tool in self.tools.values():
             tool.reset()
         
-        # Conversation history for context
-        self.conversation_history = []
+        # Bounded history of compact turn records (older turns are spilled)
+        self.conversation_history = ConversationHistory()
         
         # Track the last offered topic for follow-up confirmations
         self.last_offered_topic = None
         self.last_tool_used = None
         
-        print("✅ Expert Agent initialized with tools:")
-        print("   - Biology Expert (Knowledge Base)")
-        print("   - Physics Expert (Knowledge Base)")
-        print("   - Chemistry Expert (Knowledge Base)")
+        # Receives answer text deltas while the enhancement/synthesis completion
+        # streams (set per request by process_query)
+        self.token_callback = None
+        
+        log.info("expert_agent_ready", tools=",".join(self.tools))
     
     def _get_available_topics(self, expert_name: str) -> List[str]:
         """
@@ -101,36 +179,45 @@ class ExpertAgent:
         Returns:
             List of {topic: str, score: int} dictionaries sorted by relevance
         """
-        # Get all topics
-        all_topics = self._get_available_topics(expert_name)
+        # Topic names split into words (built once per expert)
+        topic_words = self._topic_words.get(expert_name)
+        if topic_words is None:
+            topic_words = self._topic_words[expert_name] = [
+                (topic, topic.lower(), topic.lower().split('_'), frozenset(topic.lower().split('_')))
+                for topic in self._get_available_topics(expert_name)
+            ]
         
         # Extract keywords from query (lowercase, remove common words)
         query_lower = query.lower()
-        stop_words = {'what', 'are', 'is', 'the', 'a', 'an', 'of', 'in', 'on', 'at', 'to', 'for', 'with', 'about', 'tell', 'me', 'explain', 'describe', 'available'}
-        query_words = [w for w in query_lower.split() if w not in stop_words and len(w) > 2]
+        query_words = [w for w in query_lower.split() if w not in STOP_WORDS and len(w) > 2]
+        # Inflected words also match their stems ("laws" -> "law"), a little below an exact match
+        query_stems = [(word, frozenset(word_stems(word))) for word in query_words]
+        query_stems = [(word, stems) for word, stems in query_stems if stems]
         
         # Score each topic
         matches = []
-        for topic in all_topics:
+        for topic, topic_lower, word_list, words in topic_words:
             score = 0
-            topic_lower = topic.lower()
-            topic_words = topic_lower.split('_')
             
             # HIGHEST PRIORITY: Multiple key words match exactly
-            exact_word_matches = sum(1 for word in query_words if word in topic_words)
-            score += exact_word_matches * 50  # 50 points per exact word match
+            exact_word_matches = sum(1 for word in query_words if word in words)
+            score += exact_word_matches * EXACT_WORD_POINTS
+            # Inflected query words matching a topic word by their stem ("laws" -> "law")
+            stem_matched = {word for word, stems in query_stems
+                            if word not in words and not stems.isdisjoint(words)} if query_stems else ()
+            score += len(stem_matched) * STEM_WORD_POINTS
             
             # MEDIUM PRIORITY: Word appears anywhere in topic (substring)
             for word in query_words:
-                if word in topic_lower and word not in topic_words:
+                if word in topic_lower and word not in words and word not in stem_matched:
                     score += 20
             
             # LOW PRIORITY: Partial word matches (e.g., "digest" in "digestion")
             for word in query_words:
                 if len(word) > 4:  # Only for longer words
-                    for topic_word in topic_words:
+                    for topic_word in word_list:
                         if len(topic_word) > 4 and (word in topic_word or topic_word in word):
-                            if word not in topic_words:  # Don't double count exact matches
+                            if word not in words and word not in stem_matched:  # Don't double count exact matches
                                 score += 5
             
             if score > 0:
@@ -177,7 +264,7 @@ CRITICAL - Topic Selection Strategy:
 - Use underscore_separated lowercase names
 """
     
-    def _analyze_query(self, user_query: str) -> Dict[str, Any]:
+    def _analyze_query(self, user_query: str, search_query: str = None) -> Dict[str, Any]:
         """
         Use LLM to analyze which tool to use and extract parameters.
         Can detect MULTIPLE topics in a single query.
@@ -185,14 +272,28 @@ CRITICAL - Topic Selection Strategy:
         
         Args:
             user_query: User's question
+            search_query: Spelling-corrected question for the topic search
+                (defaults to ``user_query``)
             
         Returns:
-            Dict with tool_name, topics (list), and reasoning
+            Dict with tool_name, topics (list), reasoning and route
+            (llm, topic_search when over the token budget, default on error)
         """
         # STEP 1: Pre-search for matching topics in each expert
-        bio_matches = self._find_matching_topics(user_query, 'biology_expert', max_results=5)
-        phys_matches = self._find_matching_topics(user_query, 'physics_expert', max_results=5)
-        chem_matches = self._find_matching_topics(user_query, 'chemistry_expert', max_results=5)
+        search_query = search_query or user_query
+        with span('topic_search') as search:
+            bio_matches = self._find_matching_topics(search_query, 'biology_expert', max_results=5)
+            phys_matches = self._find_matching_topics(search_query, 'physics_expert', max_results=5)
+            chem_matches = self._find_matching_topics(search_query, 'chemistry_expert', max_results=5)
+            search['matches'] = len(bio_matches) + len(phys_matches) + len(chem_matches)
+        
+        # Over the token budget: route on the topic search alone
+        if budget_exhausted('routing', self.conversation_history.session_id):
+            return self._route_by_matches({
+                'biology_expert': bio_matches,
+                'physics_expert': phys_matches,
+                'chemistry_expert': chem_matches
+            })
         
         # Build suggested topics string
         suggested_topics = ""
@@ -215,7 +316,7 @@ CRITICAL - Topic Selection Strategy:
 2. What query_topic(s) to pass (MUST choose from the suggested topics below)
 3. Your reasoning
 
-User Query: "{user_query}"
+User Query: "{user_query}"{f' (spelling corrected: "{search_query}")' if search_query != user_query else ''}
 
 {suggested_topics if suggested_topics else "No matching topics found - use your best judgment."}
 
@@ -246,15 +347,17 @@ TOPIC: chemical_process__digestion_
 REASONING: The query asks about digestive "processes" (plural), which includes both mechanical and chemical digestion. Selected all three most relevant topics to provide comprehensive answer."""
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert system coordinator for an O/L tutoring system."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
+            with span('llm_routing'):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You are an expert system coordinator for an O/L tutoring system."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=500
+                )
+            record_usage('routing', response)
             text = response.choices[0].message.content.strip()
             
             # Parse response - NOW SUPPORTS MULTIPLE TOPICS
@@ -262,7 +365,8 @@ REASONING: The query asks about digestive "processes" (plural), which includes b
             result = {
                 'tool_name': None,
                 'topics': [],  # Changed from query_topic to topics (list)
-                'reasoning': None
+                'reasoning': None,
+                'route': 'llm'
             }
             
             for line in lines:
@@ -283,13 +387,37 @@ REASONING: The query asks about digestive "processes" (plural), which includes b
             return result
             
         except Exception as e:
-            print(f"❌ Error analyzing query: {e}")
+            log.warning("routing_failed", error=str(e))
+            METRICS.inc('llm_errors_total', stage='routing', error=type(e).__name__)
             return {
                 'tool_name': 'biology_expert',  # Default fallback
                 'topics': ['general'],
-                'reasoning': f'Error in analysis: {e}'
+                'reasoning': f'Error in analysis: {e}',
+                'route': 'default'
             }
     
+    def _route_by_matches(self, matches: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        LLM-free routing (used once the session's token budget is spent).
+        
+        Picks the expert with the best-scoring topic match and its topics tied
+        at that score (at most 3).
+        
+        Args:
+            matches: Tool name -> ranked _find_matching_topics() results
+            
+        Returns:
+            Dict with tool_name, topics (list), reasoning and route, like _analyze_query
+        """
+        ranked = [(found[0]['score'], tool) for tool, found in matches.items() if found]
+        if not ranked:
+            return {'tool_name': 'biology_expert', 'topics': ['general'],
+                    'reasoning': 'Token budget reached; no matching topics found', 'route': 'topic_search'}
+        best_score, tool_name = max(ranked)
+        topics = [m['topic'] for m in matches[tool_name] if m['score'] == best_score][:3]
+        return {'tool_name': tool_name, 'topics': topics,
+                'reasoning': 'Token budget reached; routed by topic search score', 'route': 'topic_search'}
+    
     def _execute_tool(self, tool_name: str, query_topic: str) -> Dict[str, Any]:
         """
         Execute the selected expert system tool.
@@ -321,25 +449,26 @@ REASONING: The query asks about digestive "processes" (plural), which includes b
         response = expert.get_response()
         
         if response:
-            return {
+            result = {
                 'success': True,
                 'response': response,
                 'tool_used': tool_name,
                 'query_topic': query_topic
             }
         else:
-            return {
+            result = {
                 'success': False,
                 'error': f"No match found for topic '{query_topic}'",
                 'tool_used': tool_name,
                 'suggestion': 'Try rephrasing or using more specific terms'
             }
         
-        return {
-            'success': False,
-            'error': 'Unknown expert state',
-            'tool_used': tool_name
-        }
+        # Per-run rule profile (only present when profiling is enabled)
+        rule_profile = expert.get_last_run_profile()
+        if rule_profile:
+            result['rule_profile'] = rule_profile
+        
+        return result
     
     def _enhance_response(self, tool_result: Dict[str, Any], user_query: str) -> str:
         """
@@ -431,8 +560,7 @@ REASONING: The query asks about digestive "processes" (plural), which includes b
  Shall I explain [specific sub-topic from expert system] in more detail?"""
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            enhanced = self._answer_completion(
                 messages=[
                     {
                         "role": "system", 
@@ -441,15 +569,17 @@ REASONING: The query asks about digestive "processes" (plural), which includes b
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.4,  # Lower temperature for more focused responses
-                max_tokens=550  # Slightly increased to accommodate reasoning
+                max_tokens=550,  # Slightly increased to accommodate reasoning
+                stage='enhancement'
             )
-            enhanced = response.choices[0].message.content.strip()
             
             # Add attribution
             return f"{enhanced}\n\n---\n*📚 Source: {topic} Expert System*"
             
         except Exception as e:
-            print(f"⚠️ Error enhancing response: {e}")
+            if not isinstance(e, TokenBudgetExceeded):
+                log.warning("enhancement_failed", error=str(e))
+                METRICS.inc('llm_errors_total', stage='enhancement', error=type(e).__name__)
             # Fallback to raw expert response
             result = f"**{concept}**\n\n{explanation}"
             if examples:
@@ -469,8 +599,7 @@ REASONING: The query asks about digestive "processes" (plural), which includes b
         Returns:
             Synthesized comprehensive response
         """
-        print(f"   🔍 Multiple rules matched: {len(responses)} responses found")
-        print(f"   📚 Synthesizing comprehensive answer...")
+        log.debug("synthesizing", responses=len(responses), sampled=True)
         
         # Build comprehensive information from all responses
         all_concepts = []
@@ -552,8 +681,7 @@ EXAMPLES:
 💭 Shall I explain [specific sub-topic 1 from concepts] in more detail?"""
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            synthesized = self._answer_completion(
                 messages=[
                     {
                         "role": "system", 
@@ -562,9 +690,9 @@ EXAMPLES:
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.4,  # Lower for more focused responses
-                max_tokens=650  # Slightly increased to accommodate reasoning
+                max_tokens=650,  # Slightly increased to accommodate reasoning
+                stage='synthesis'
             )
-            synthesized = response.choices[0].message.content.strip()
             
             # Add metadata
             topic_str = ', '.join(topics) if topics else tool_used.replace('_', ' ').title()
@@ -573,7 +701,9 @@ EXAMPLES:
             return f"{synthesized}{match_count}"
             
         except Exception as e:
-            print(f"⚠️ Error synthesizing responses: {e}")
+            if not isinstance(e, TokenBudgetExceeded):
+                log.warning("synthesis_failed", error=str(e))
+                METRICS.inc('llm_errors_total', stage='synthesis', error=type(e).__name__)
             # Fallback to listing all responses
             result = f"I found {len(responses)} related concepts:\n\n"
             for i, resp in enumerate(responses, 1):
@@ -582,6 +712,112 @@ EXAMPLES:
                 result += f"**{i}. {concept}**\n{explanation}\n\n"
             return result
     
+    def _answer_completion(self, messages: list, temperature: float, max_tokens: int, stage: str) -> str:
+        """
+        Chat completion for the user-facing answer text.
+        
+        Streams the completion and forwards each text delta to token_callback
+        when one is set; otherwise makes a regular (blocking) request. Answers
+        are kept in LLM_CACHE; once the session's token budget is spent, a
+        cached answer to the same prompt is returned instead of calling the LLM.
+        
+        Args:
+            stage: Trace stage the call is timed and its tokens counted under
+        
+        Returns:
+            The complete, stripped answer text
+            
+        Raises:
+            TokenBudgetExceeded: Over budget and no cached answer (callers fall back
+                to the expert system text)
+        """
+        cache_key = LLM_CACHE.fingerprint(f"agent_{stage}", {'messages': messages}, self.model)
+        if budget_exhausted(stage, self.conversation_history.session_id):
+            cached = LLM_CACHE.get(cache_key)
+            if cached is None:
+                raise TokenBudgetExceeded(f"Session token budget reached; no cached {stage} answer")
+            if self.token_callback is not None:
+                self.token_callback(cached)
+            return cached
+        
+        with span(stage):
+            if self.token_callback is None:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                record_usage(stage, response)
+                text = response.choices[0].message.content.strip()
+            else:
+                text = self._stream_answer(messages, temperature, max_tokens, stage)
+        LLM_CACHE.put(cache_key, text)
+        return text
+    
+    def _stream_answer(self, messages: list, temperature: float, max_tokens: int, stage: str) -> str:
+        """Streaming branch of _answer_completion."""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parts = []
+        for chunk in stream:
+            if getattr(chunk, 'usage', None):
+                # Final chunk (no choices) carries the usage
+                record_usage(stage, chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                self.token_callback(delta)
+        return "".join(parts).strip()
+    
+    def _topic_word_score(self, word: str) -> int:
+        """Topic search points one word earns as a topic-name word (or an inflection of one) of the spelling index."""
+        domain = self.spelling.domain
+        if word in domain:
+            return EXACT_WORD_POINTS
+        if any(stem in domain for stem in word_stems(word)):
+            return STEM_WORD_POINTS
+        return 0
+    
+    def _correct_spelling(self, query: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Correct misspelled query words against the KB vocabulary (see utils/spelling.py).
+        
+        A correction is kept only if the corrected word earns more topic search
+        points than the original, i.e. it turns the word into a topic-name word
+        (scored from the spelling index, no topic search is run).
+        
+        Args:
+            query: User's query
+            
+        Returns:
+            (query for the topic search, [{original, corrected, distance}]);
+            the query is returned unchanged when nothing was corrected
+        """
+        if self.spelling is None:
+            return query, []
+        _, candidates = self.spelling.correct(query)
+        corrected = query.lower()
+        corrections = []
+        for correction in candidates:
+            if self._topic_word_score(correction['corrected']) > self._topic_word_score(correction['original']):
+                corrected = re.sub(rf"(?<![a-z]){correction['original']}(?![a-z])", correction['corrected'], corrected)
+                corrections.append(correction)
+        if not corrections:
+            return query, []
+        log.debug("query_spelling_corrected", sampled=True,
+                  corrections=",".join(f"{c['original']}->{c['corrected']}" for c in corrections))
+        METRICS.inc('spelling_corrections_total', len(corrections))
+        return corrected, corrections
+    
     def _is_confirmation(self, text: str) -> bool:
         """
         Check if the user's response is a confirmation (yes, okay, sure, etc.).
@@ -630,26 +866,55 @@ EXAMPLES:
         
         return None
     
-    def process_query(self, user_query: str) -> Dict[str, Any]:
+    def process_query(self, user_query: str, on_token=None) -> Dict[str, Any]:
         """
         Main entry point: Process a user query using expert tools.
         NOW SUPPORTS MULTIPLE TOPICS in a single query.
         
         Args:
             user_query: User's question
+            on_token: Optional callable receiving answer text deltas as the final
+                LLM completion streams (the result's 'response' stays authoritative)
             
         Returns:
-            Dict with response and metadata
+            Dict with response and metadata; 'timings' holds the request trace
+            (stage spans in ms and LLM token counts, see utils/tracing.py) and
+            'token_usage' the session's running token totals and budget state
         """
-        print(f"\n{'='*60}")
-        print(f"🤖 EXPERT AGENT: Processing query")
-        print(f"{'='*60}")
-        print(f"Query: {user_query}\n")
+        self.token_callback = on_token
+        try:
+            with request_context(session_id=self.conversation_history.session_id, request_id=new_request_id()), \
+                    start_trace('expert_agent') as trace:
+                result = self._process_query(user_query)
+                result['timings'] = trace.to_dict()
+                result['token_usage'] = TOKEN_USAGE.session_usage(self.conversation_history.session_id)
+                log.info(
+                    "query_processed",
+                    tool=result.get('tool_used'),
+                    topics=len(result.get('query_topics') or []),
+                    matches=len(result.get('raw_expert_response') or []),
+                    success=result.get('success', False),
+                    ms=result['timings']['total_ms'],
+                    tokens=result['timings']['tokens']['total_tokens']
+                )
+                METRICS.inc('queries_total', subject=(result.get('tool_used') or 'none').replace('_expert', ''),
+                            route=(result.get('analysis') or {}).get('route', 'unknown'))
+            return result
+        finally:
+            self.token_callback = None
+    
+    def _process_query(self, user_query: str) -> Dict[str, Any]:
+        """Body of process_query (see there)."""
+        log.debug("query_received", query=user_query, sampled=True)
+        start = time.perf_counter()
         
         # Check if this is a confirmation response to a previous offer
-        if self._is_confirmation(user_query) and self.last_offered_topic and self.last_tool_used:
-            print(f"✅ Detected confirmation to explain: {self.last_offered_topic}")
-            print(f"   Using tool: {self.last_tool_used}\n")
+        with span('canonicalize') as canonical:
+            is_confirmation = self._is_confirmation(user_query)
+            search_query, corrections = self._correct_spelling(user_query)
+            canonical['corrections'] = len(corrections)
+        if is_confirmation and self.last_offered_topic and self.last_tool_used:
+            log.debug("confirmation_detected", topic=self.last_offered_topic, tool=self.last_tool_used, sampled=True)
             
             # Create a query for the offered topic
             query_for_topic = self.last_offered_topic
@@ -660,15 +925,14 @@ EXAMPLES:
             self.last_tool_used = None
             
             # Execute the tool with the offered topic
-            print(f"🔧 Executing expert tool for confirmed topic...")
-            tool_result = self._execute_tool(tool_to_use, query_for_topic)
+            with span('expert_execution', tool=tool_to_use, topic=query_for_topic):
+                tool_result = self._execute_tool(tool_to_use, query_for_topic)
             
             if tool_result.get('success'):
                 response = tool_result.get('response')
                 all_responses = [response] if not isinstance(response, list) else response
                 
                 # Enhance the response
-                print("✨ Enhancing response...")
                 if len(all_responses) > 1:
                     enhanced_response = self._synthesize_multiple_rules(
                         all_responses, 
@@ -680,9 +944,6 @@ EXAMPLES:
                     fake_result = {'success': True, 'response': all_responses[0]}
                     enhanced_response = self._enhance_response(fake_result, f"Explain {query_for_topic}")
                 
-                print(f"   ✅ Response enhanced\n")
-                print(f"{'='*60}\n")
-                
                 # Extract and store new offered topic from the response
                 self.last_offered_topic = self._extract_topic_from_response(enhanced_response)
                 self.last_tool_used = tool_to_use if self.last_offered_topic else None
@@ -694,98 +955,94 @@ EXAMPLES:
                     'success': True,
                     'needs_clarification': False,
                     'raw_expert_response': all_responses,
-                    'analysis': {'tool_name': tool_to_use, 'topics': [query_for_topic], 'reasoning': 'User confirmed interest in previously offered topic'},
-                    'confidence_metrics': None
+                    'analysis': {'tool_name': tool_to_use, 'topics': [query_for_topic], 'reasoning': 'User confirmed interest in previously offered topic', 'route': 'confirmation'},
+                    'confidence_metrics': None,
+                    'spelling_corrections': corrections
                 }
+                if tool_result.get('rule_profile'):
+                    result['rule_profiles'] = [tool_result['rule_profile']]
                 
-                self.conversation_history.append({'query': user_query, 'result': result})
+                self.conversation_history.add(user_query, result, time.perf_counter() - start)
                 return result
             else:
-                print(f"   ⚠️ Could not find information about {query_for_topic}\n")
+                log.debug("confirmed_topic_not_found", topic=query_for_topic, sampled=True)
                 # Fall through to normal processing
         
         # Step 1: Analyze query to determine tool and parameters
-        print("📊 Step 1: Analyzing query...")
-        analysis = self._analyze_query(user_query)
+        analysis = self._analyze_query(user_query, search_query)
         topics = analysis.get('topics', [])
-        print(f"   Selected Tool: {analysis['tool_name']}")
-        print(f"   Query Topics: {', '.join(topics)}")
-        print(f"   Reasoning: {analysis['reasoning']}\n")
+        log.debug("query_routed", tool=analysis['tool_name'], topics=",".join(topics),
+                  reasoning=analysis['reasoning'], sampled=True)
         
         # NOTE: Study Guide is now in a separate tab and not handled by this agent
         # Only Biology, Physics, and Chemistry experts are available here
         
         # Step 2: Execute expert system tool for EACH topic
-        print(f"🔧 Step 2: Executing expert tool for {len(topics)} topic(s)...")
         all_responses = []
         all_tool_results = []
         
-        for i, topic in enumerate(topics, 1):
-            print(f"   [{i}/{len(topics)}] Querying topic: {topic}")
-            tool_result = self._execute_tool(
-                analysis['tool_name'],
-                topic
-            )
+        for topic in topics:
+            with span('expert_execution', tool=analysis['tool_name'], topic=topic) as execution:
+                tool_result = self._execute_tool(
+                    analysis['tool_name'],
+                    topic
+                )
+                execution['success'] = bool(tool_result.get('success'))
             all_tool_results.append(tool_result)
             
+            matches = 0
             if tool_result.get('success'):
                 response = tool_result.get('response')
                 if isinstance(response, list):
                     # Multiple matches for this topic
                     all_responses.extend(response)
-                    print(f"       ✅ Found {len(response)} matches")
+                    matches = len(response)
                 elif response:
                     all_responses.append(response)
-                    print(f"       ✅ Found 1 match")
-            else:
-                print(f"       ⚠️ No match found")
-        
-        print(f"   Total matches: {len(all_responses)}\n")
+                    matches = 1
+            log.debug("expert_executed", tool=analysis['tool_name'], topic=topic, matches=matches, sampled=True)
         
         # Get confidence metrics from the expert if available
         confidence_metrics = None
         if len(all_responses) > 0 and hasattr(self.tools[analysis['tool_name']], 'get_aggregated_confidence'):
             try:
-                confidence_metrics = self.tools[analysis['tool_name']].get_aggregated_confidence()
-                print(f"📊 Confidence Metrics:")
-                print(f"   Aggregate CF: {confidence_metrics.get('aggregate_certainty', 0):.3f}")
-                print(f"   Confidence Level: {confidence_metrics.get('confidence_level', 'N/A')}")
-                print(f"   Rules Fired: {confidence_metrics.get('num_rules_fired', 0)}\n")
+                with span('confidence_aggregation'):
+                    confidence_metrics = self.tools[analysis['tool_name']].get_aggregated_confidence()
+                log.debug(
+                    "confidence_aggregated",
+                    aggregate_cf=confidence_metrics.get('aggregate_certainty', 0),
+                    level=confidence_metrics.get('confidence_level', 'N/A'),
+                    rules_fired=confidence_metrics.get('num_rules_fired', 0),
+                    sampled=True
+                )
             except Exception as e:
-                print(f"⚠️ Could not get confidence metrics: {e}\n")
+                log.warning("confidence_failed", error=str(e))
         
         # Step 3: Synthesize if multiple topics or multiple matches
         if len(all_responses) > 1:
-            print("✨ Step 3: Synthesizing multiple responses...")
             enhanced_response = self._synthesize_multiple_rules(
                 all_responses, 
                 user_query, 
                 analysis['tool_name'],
                 topics
             )
-            print(f"   ✅ Synthesized {len(all_responses)} concepts\n")
         elif len(all_responses) == 1:
-            print("✨ Step 3: Enhancing single response...")
             # Create a fake tool_result for compatibility
             fake_result = {
                 'success': True,
                 'response': all_responses[0]
             }
             enhanced_response = self._enhance_response(fake_result, user_query)
-            print(f"   ✅ Response enhanced\n")
         else:
-            print("⚠️ Step 3: No responses found")
+            log.debug("no_expert_matches", topics=",".join(topics), sampled=True)
             enhanced_response = "I couldn't find information about that topic. Could you rephrase your question?"
-            print()
-        
-        print(f"{'='*60}\n")
         
         # Extract and store the offered topic from the response for next interaction
         self.last_offered_topic = self._extract_topic_from_response(enhanced_response)
         self.last_tool_used = analysis['tool_name'] if self.last_offered_topic else None
         
         if self.last_offered_topic:
-            print(f"💡 Stored offered topic for next interaction: '{self.last_offered_topic}'\n")
+            log.debug("topic_offered", topic=self.last_offered_topic, sampled=True)
         
         # Build final result
         result = {
@@ -796,14 +1053,17 @@ EXAMPLES:
             'needs_clarification': False,
             'raw_expert_response': all_responses,
             'analysis': analysis,
-            'confidence_metrics': confidence_metrics  # Add confidence metrics
+            'confidence_metrics': confidence_metrics,  # Add confidence metrics
+            'spelling_corrections': corrections
         }
         
-        # Store in conversation history
-        self.conversation_history.append({
-            'query': user_query,
-            'result': result
-        })
+        # Per-request rule profiles for the diagnostics page (opt-in)
+        rule_profiles = [r['rule_profile'] for r in all_tool_results if r.get('rule_profile')]
+        if rule_profiles:
+            result['rule_profiles'] = rule_profiles
+        
+        # Store a compact record in conversation history
+        self.conversation_history.add(user_query, result, time.perf_counter() - start)
         
         return result
     
@@ -817,7 +1077,7 @@ EXAMPLES:
         Returns:
             Dict with response and metadata
         """
-        print(f"\n🔄 Handling clarification response: {user_response}")
+        log.debug("clarification_response", response=user_response)
         
         # For study guide expert, continue diagnostic
         expert = self.tools['study_guide_expert']
@@ -848,11 +1108,46 @@ EXAMPLES:
             'needs_clarification': False
         }
     
+    def get_history_stats(self) -> Dict[str, Any]:
+        """Conversation statistics (turn counts, tools, top topics) for the sidebar."""
+        return self.conversation_history.stats()
+    
+    def restore_session(self, state):
+        """
+        Load a stored session into this agent (see core.session_store.SessionState).
+        
+        Args:
+            state: SessionState with turn records and the pending follow-up topic
+        """
+        self.conversation_history.session_id = state.session_id
+        self.conversation_history.restore(state.turns, state.total_turns)
+        self.last_offered_topic = state.last_offered_topic
+        self.last_tool_used = state.last_tool_used
+        TOKEN_USAGE.restore(state.session_id, state.token_usage)
+    
+    def export_session(self, state):
+        """
+        Write this agent's session data back into a SessionState.
+        
+        Args:
+            state: SessionState to update in place
+        """
+        state.turns = [record.to_dict() for record in self.conversation_history.recent()]
+        state.total_turns = len(self.conversation_history)
+        state.last_offered_topic = self.last_offered_topic
+        state.last_tool_used = self.last_tool_used
+        state.token_usage = TOKEN_USAGE.export(state.session_id)
+    
     def reset(self):
-        """Reset all expert systems and clear history."""
+        """
+        Reset all expert systems and clear history.
+
+        The agent starts a new session ID, so its token budget starts over too
+        (pooled agents get their session's ID back from restore_session).
+        """
         for tool in self.tools.values():
             tool.reset()
-        self.conversation_history = []
+        self.conversation_history.new_session()
         self.last_offered_topic = None
         self.last_tool_used = None
-        print("🔄 Expert Agent reset complete")
+        log.debug("expert_agent_reset", sampled=True)
@@ -0,0 +1,5 @@
+"""
+API Package
+-----------
+Headless HTTP access to the tutor (see api/asgi.py).
+"""
@@ -0,0 +1,305 @@
+"""
+Tutoring API
+------------
+Headless ASGI application exposing the tutor without the Streamlit UI.
+
+Endpoints (JSON bodies):
+    GET  /healthz             Liveness plus agent pool, session store and token usage stats
+    GET  /metrics             Process metrics in Prometheus text format (utils/metrics.py)
+    POST /v1/sessions         Create a session ID
+    POST /v1/tutor/query      {"session_id", "query", "stream"} - ExpertAgent.process_query
+    POST /v1/tutor/confirm    {"session_id", "stream"} - accept the topic the last answer offered
+    POST /v1/study-guide      {"category", "study_hours", "stress_level", "sleep_hours",
+                               "learning_style", "has_upcoming_exam", "question"}
+
+With ``"stream": true`` (or ``Accept: text/event-stream``) tutor answers are
+sent as server-sent events: ``session``, then one ``token`` event per answer
+text delta, then ``result`` (the complete answer and metadata) and ``done``.
+
+The expert core is created once per process: tutor requests run on the shared
+AgentPool (sessions live in the session store, keyed by ID) and study guide
+requests on one shared StudyGuideExpert. Blocking work runs on a thread pool.
+
+Serve with any ASGI server, e.g. ``uvicorn api.asgi:app --workers 4``.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from config import API_WORKER_THREADS, API_MAX_BODY_BYTES
+from utils.metrics import METRICS, PROMETHEUS_CONTENT_TYPE
+from utils.token_usage import TOKEN_USAGE
+
+
+class APIError(Exception):
+    """Error returned to the client as ``{"error": message}`` with an HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def public_result(result: Dict[str, Any], offered_topic: Optional[str]) -> Dict[str, Any]:
+    """The parts of a process_query result an API client needs (no KB payloads)."""
+    raw = result.get('raw_expert_response') or []
+    if isinstance(raw, Mapping):
+        raw = [raw]
+    return {
+        'response': result.get('response'),
+        'tool_used': result.get('tool_used'),
+        'query_topics': result.get('query_topics', []),
+        'concepts': [data.get('concept') for data in raw if isinstance(data, Mapping)],
+        'success': result.get('success', False),
+        'needs_clarification': result.get('needs_clarification', False),
+        'confidence_metrics': result.get('confidence_metrics'),
+        'timings': result.get('timings'),
+        'token_usage': result.get('token_usage'),
+        'spelling_corrections': result.get('spelling_corrections', []),
+        'offered_topic': offered_topic
+    }
+
+
+class TutorAPI:
+    """
+    The ASGI application.
+
+    Args:
+        pool: AgentPool serving tutor sessions (the process-wide pool by default)
+        study_expert: StudyGuideExpert for study guide analysis (created on first use)
+        max_workers: Threads running the blocking expert/LLM work
+    """
+
+    def __init__(self, pool=None, study_expert=None, max_workers: int = API_WORKER_THREADS):
+        self._pool = pool
+        self._study_expert = study_expert
+        self._study_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tutor-api")
+        self.routes = {
+            ('GET', '/healthz'): self._health,
+            ('GET', '/metrics'): self._metrics,
+            ('POST', '/v1/sessions'): self._create_session,
+            ('POST', '/v1/tutor/query'): self._tutor_query,
+            ('POST', '/v1/tutor/confirm'): self._tutor_confirm,
+            ('POST', '/v1/study-guide'): self._study_guide,
+        }
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from agents.agent_pool import get_agent_pool
+            self._pool = get_agent_pool()
+        return self._pool
+
+    @property
+    def study_expert(self):
+        if self._study_expert is None:
+            from experts.study_guide_expert import StudyGuideExpert
+            self._study_expert = StudyGuideExpert()
+        return self._study_expert
+
+    # ------------------------------------------------------------------ ASGI
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        try:
+            if handler is None:
+                raise APIError(404, f"No route for {scope['method']} {scope['path']}")
+            body = await self._read_json(receive)
+            headers = dict(scope.get('headers') or [])
+            wants_stream = body.get('stream') or b'text/event-stream' in headers.get(b'accept', b'')
+            await handler(body, send, bool(wants_stream))
+        except APIError as e:
+            await self._send_json(send, e.status, {'error': e.message})
+        except Exception as e:
+            await self._send_json(send, 500, {'error': str(e)})
+
+    async def _lifespan(self, receive, send):
+        """Build the expert core at startup so the first request does not pay for it."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, self._warm_up)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _warm_up(self):
+        self.pool.warm_up()
+        self.study_expert
+
+    async def _read_json(self, receive) -> Dict:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise APIError(499, "Client disconnected")
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > API_MAX_BODY_BYTES:
+                raise APIError(413, f"Request body larger than {API_MAX_BODY_BYTES} bytes")
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        raw = b''.join(chunks)
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise APIError(400, "Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise APIError(400, "Request body must be a JSON object")
+        return body
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict):
+        data = json.dumps(payload, default=str, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                        (b'content-length', str(len(data)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': data})
+
+    @staticmethod
+    async def _send_text(send, status: int, text: str, content_type: str):
+        data = text.encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode()),
+                        (b'content-length', str(len(data)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': data})
+
+    @staticmethod
+    async def _send_event(send, event: str, payload: Any, more: bool = True):
+        data = json.dumps(payload, default=str, ensure_ascii=False)
+        await send({
+            'type': 'http.response.body',
+            'body': f"event: {event}\ndata: {data}\n\n".encode('utf-8'),
+            'more_body': more
+        })
+
+    # -------------------------------------------------------------- handlers
+
+    async def _health(self, body, send, stream):
+        await self._send_json(send, 200, {
+            'status': 'ok',
+            'agent_pool': self.pool.stats(),
+            'session_store': self.pool.store.stats(),
+            'token_usage': TOKEN_USAGE.stats()
+        })
+
+    async def _metrics(self, body, send, stream):
+        self.pool  # registers the pool and session store collectors
+        await self._send_text(send, 200, METRICS.prometheus_text(), PROMETHEUS_CONTENT_TYPE)
+
+    async def _create_session(self, body, send, stream):
+        await self._send_json(send, 201, {'session_id': uuid.uuid4().hex})
+
+    async def _tutor_query(self, body, send, stream):
+        query = body.get('query')
+        if not isinstance(query, str) or not query.strip():
+            raise APIError(400, "'query' must be a non-empty string")
+        await self._run_tutor(body.get('session_id') or uuid.uuid4().hex, query.strip(), False, send, stream)
+
+    async def _tutor_confirm(self, body, send, stream):
+        session_id = body.get('session_id')
+        if not session_id:
+            raise APIError(400, "'session_id' is required")
+        await self._run_tutor(session_id, "yes", True, send, stream)
+
+    def _tutor_turn(self, session_id: str, query: str, confirm: bool, on_token) -> Dict:
+        """Blocking part of a tutor request (runs on the executor)."""
+        with self.pool.session(session_id) as session:
+            if confirm and not session.state.last_offered_topic:
+                raise APIError(409, "The last answer did not offer a follow-up topic")
+            result = session.agent.process_query(query, on_token=on_token)
+            session.state.awaiting_clarification = bool(result.get('needs_clarification'))
+            session.state.clarification_tool = result.get('tool_used') if result.get('needs_clarification') else None
+            return public_result(result, session.agent.last_offered_topic)
+
+    async def _run_tutor(self, session_id: str, query: str, confirm: bool, send, stream: bool):
+        loop = asyncio.get_running_loop()
+
+        if not stream:
+            payload = await loop.run_in_executor(self._executor, self._tutor_turn, session_id, query, confirm, None)
+            payload['session_id'] = session_id
+            await self._send_json(send, 200, payload)
+            return
+
+        tokens: asyncio.Queue = asyncio.Queue()
+
+        def on_token(text: str):
+            loop.call_soon_threadsafe(tokens.put_nowait, text)
+
+        future = loop.run_in_executor(self._executor, self._tutor_turn, session_id, query, confirm, on_token)
+        future.add_done_callback(lambda _: tokens.put_nowait(None))
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                        (b'cache-control', b'no-cache')]
+        })
+        await self._send_event(send, 'session', {'session_id': session_id})
+        while True:
+            text = await tokens.get()
+            if text is None:
+                break
+            await self._send_event(send, 'token', {'text': text})
+
+        try:
+            payload = future.result()
+            payload['session_id'] = session_id
+            await self._send_event(send, 'result', payload)
+        except APIError as e:
+            await self._send_event(send, 'error', {'status': e.status, 'error': e.message})
+        except Exception as e:
+            await self._send_event(send, 'error', {'status': 500, 'error': str(e)})
+        await self._send_event(send, 'done', {}, more=False)
+
+    def _study_guide_turn(self, body: Dict) -> Dict:
+        category = body.get('category')
+        if not isinstance(category, str) or not category:
+            raise APIError(400, "'category' is required")
+        with self._study_lock:
+            response = self.study_expert.process_query_with_inputs(
+                category=category,
+                question=body.get('question') or f"I need help with {category.lower()}",
+                study_hours=body.get('study_hours'),
+                stress_level=body.get('stress_level'),
+                learning_style=body.get('learning_style'),
+                has_upcoming_exam=body.get('has_upcoming_exam'),
+                sleep_hours=body.get('sleep_hours')
+            )
+        if not response:
+            raise APIError(422, f"No recommendation for category '{category}'")
+        return response
+
+    async def _study_guide(self, body, send, stream):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self._executor, self._study_guide_turn, body)
+        await self._send_json(send, 200, response)
+
+
+# Default application for ASGI servers
+app = TutorAPI()
@@ -0,0 +1,6 @@
+"""
+Benchmarks Package
+------------------
+Performance and memory benchmarks for the EduMentor system.
+Run individual benchmarks as modules, e.g. ``python -m benchmarks.kb_record_memory``.
+"""
@@ -0,0 +1,176 @@
+"""
+API Throughput Benchmark
+------------------------
+Drives the tutoring ASGI app (api/asgi.py) in-process with concurrent clients.
+
+Uses the fake LLM (benchmarks/fake_llm.py) with a configurable per-completion
+latency and a temporary session store, so it runs offline and measures the API,
+agent pool and expert systems rather than the network. Each client opens a
+session and sends questions, following up with a confirmation whenever an answer
+offers a topic. Reports throughput, latency percentiles and, for streaming
+requests, time to first token.
+
+Usage:
+    python -m benchmarks.api_throughput --clients 8 --requests 20 --llm-latency 0.05
+    python -m benchmarks.api_throughput --stream
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.fake_llm import install_fake_llm
+from utils.log import set_log_level
+
+QUESTIONS = (
+    "What is photosynthesis?",
+    "How does respiration work in cells?",
+    "Explain Newton's laws of motion",
+    "What is electric current?",
+    "What are acids and bases?",
+    "How is the periodic table arranged?",
+    "What is diffusion and osmosis?",
+    "Explain the structure of an atom",
+)
+
+
+async def call(app, method: str, path: str, body: dict = None, stream: bool = False) -> dict:
+    """Run one request against an ASGI app; returns status, payload and timings."""
+    raw = json.dumps(body or {}).encode('utf-8')
+    scope = {
+        'type': 'http', 'method': method, 'path': path,
+        'headers': [(b'accept', b'text/event-stream' if stream else b'application/json')]
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': raw, 'more_body': False}
+        await asyncio.sleep(3600)
+
+    start = time.perf_counter()
+    reply = {'status': None, 'chunks': [], 'first_token': None}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            reply['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            chunk = message.get('body', b'')
+            if reply['first_token'] is None and chunk.startswith(b'event: token'):
+                reply['first_token'] = time.perf_counter() - start
+            reply['chunks'].append(chunk)
+
+    await app(scope, receive, send)
+    reply['elapsed'] = time.perf_counter() - start
+
+    data = b''.join(reply['chunks'])
+    if stream:
+        events = [block for block in data.decode('utf-8').split("\n\n") if block]
+        result = [json.loads(e.split("data: ", 1)[1]) for e in events if e.startswith("event: result")]
+        reply['payload'] = result[0] if result else {}
+        reply['tokens'] = sum(1 for e in events if e.startswith("event: token"))
+    else:
+        reply['payload'] = json.loads(data) if data else {}
+    return reply
+
+
+async def _client(app, rng: random.Random, requests: int, stream: bool, samples: list):
+    session = await call(app, 'POST', '/v1/sessions')
+    session_id = session['payload']['session_id']
+    offered = None
+    for _ in range(requests):
+        if offered and rng.random() < 0.5:
+            reply = await call(app, 'POST', '/v1/tutor/confirm', {'session_id': session_id, 'stream': stream}, stream)
+            kind = 'confirm'
+        else:
+            question = rng.choice(QUESTIONS)
+            reply = await call(app, 'POST', '/v1/tutor/query',
+                               {'session_id': session_id, 'query': question, 'stream': stream}, stream)
+            kind = 'query'
+        offered = reply['payload'].get('offered_topic')
+        samples.append((kind, reply['status'], reply['elapsed'], reply['first_token']))
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def run(clients: int, requests: int, stream: bool, llm_latency: float, seed: int = 42) -> dict:
+    """Benchmark the app with ``clients`` concurrent sessions of ``requests`` requests each."""
+    from agents.agent_pool import AgentPool
+    from api.asgi import TutorAPI
+    from core.session_store import SQLiteSessionStore
+
+    install_fake_llm(latency=llm_latency, chunk_delay=llm_latency / 20 if stream else 0.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = AgentPool(store=SQLiteSessionStore(os.path.join(tmp, "sessions.sqlite3")))
+        app = TutorAPI(pool=pool)
+        await asyncio.get_running_loop().run_in_executor(None, pool.warm_up, pool.size)
+
+        rng = random.Random(seed)
+        samples = []
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _client(app, random.Random(rng.random()), requests, stream, samples) for _ in range(clients)
+        ))
+        wall = time.perf_counter() - start
+        pool_stats = pool.stats()
+
+    latencies = [s[2] for s in samples]
+    first_tokens = [s[3] for s in samples if s[3] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for s in samples if s[1] != 200),
+        'confirmations': sum(1 for s in samples if s[0] == 'confirm'),
+        'wall_time_s': wall,
+        'throughput_rps': len(samples) / wall if wall else 0.0,
+        'latency_ms': {
+            'mean': statistics.mean(latencies) * 1000 if latencies else 0.0,
+            'p50': _percentile(latencies, 0.50) * 1000,
+            'p95': _percentile(latencies, 0.95) * 1000,
+            'max': max(latencies, default=0.0) * 1000
+        },
+        'first_token_ms': {
+            'p50': _percentile(first_tokens, 0.50) * 1000,
+            'p95': _percentile(first_tokens, 0.95) * 1000
+        } if first_tokens else None,
+        'agent_pool': pool_stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tutoring API throughput benchmark")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent client sessions")
+    parser.add_argument('--requests', type=int, default=20, help="Requests per client")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Fake LLM seconds per completion")
+    parser.add_argument('--stream', action='store_true', help="Use server-sent events")
+    parser.add_argument('--json', action='store_true', help="Print the raw results as JSON")
+    args = parser.parse_args()
+    set_log_level("WARNING")
+
+    results = asyncio.run(run(args.clients, args.requests, args.stream, args.llm_latency))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Clients: {args.clients}, requests/client: {args.requests}, "
+          f"LLM latency: {args.llm_latency * 1000:.0f} ms, streaming: {args.stream}")
+    print(f"  {results['requests']} requests ({results['confirmations']} confirmations, "
+          f"{results['errors']} errors) in {results['wall_time_s']:.2f}s -> {results['throughput_rps']:.1f} req/s")
+    lat = results['latency_ms']
+    print(f"  Latency  mean {lat['mean']:.1f} ms  p50 {lat['p50']:.1f} ms  p95 {lat['p95']:.1f} ms  max {lat['max']:.1f} ms")
+    if results['first_token_ms']:
+        print(f"  First token  p50 {results['first_token_ms']['p50']:.1f} ms  p95 {results['first_token_ms']['p95']:.1f} ms")
+    print(f"  Agent pool: {results['agent_pool']}")
+
+
+if __name__ == "__main__":
+    main()
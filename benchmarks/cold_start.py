@@ -0,0 +1,317 @@
+"""
+Cold-Start Profiler
+-------------------
+How long does a fresh worker take to serve its first answer?
+
+Startup is dominated by imports (Experta, the OpenAI SDK, Streamlit, the
+large expert modules) and by building the expert engines. Each target below is
+profiled in its own fresh interpreter, started with ``python -X importtime``:
+
+    ExpertAgent        import agents.expert_agent, build the agent, answer one query
+    BiologyExpert      import and build the expert, run one topic through the engine
+    PhysicsExpert      (same)
+    ChemistryExpert    (same)
+    StudyGuideExpert   import and build the expert, answer one study guide query
+
+For each target the child process reports the import time of its module, the
+cold and a second (warm) constructor call, the first answer, and the wall time
+from process spawn to that first answer (interpreter startup included). The
+ExpertAgent run also imports the third-party SDKs a worker loads (``openai``,
+``streamlit`` when installed) and builds the pooled LLM client; answers come
+from the offline fake LLM (benchmarks/fake_llm.py) with no latency.
+
+The ``-X importtime`` output becomes an import tree (modules whose cumulative
+time is below ``--min-import-ms`` are pruned), the slowest modules by self time
+and a per-package total.
+
+The report is JSON. Its flat ``metrics`` (``<target>.<phase>_ms``, medians over
+``--runs`` processes) can be checked against a budgets file of
+``{"metric": max_ms}``; any metric over budget is listed and the exit status
+is 1. benchmarks/cold_start_budgets.json holds the default budgets.
+
+Usage:
+    python -m benchmarks.cold_start --output cold_start.json
+    python -m benchmarks.cold_start --runs 5 --budgets benchmarks/cold_start_budgets.json
+    python -m benchmarks.cold_start --targets ExpertAgent --tree
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# name -> (module, class, topic for the first engine run)
+TARGETS = {
+    'ExpertAgent': ('agents.expert_agent', 'ExpertAgent', None),
+    'BiologyExpert': ('experts.biology_expert', 'BiologyExpert', 'balanced_chemical_equation_for_photosynthesis'),
+    'PhysicsExpert': ('experts.physics_expert', 'PhysicsExpert', 'concave_lens'),
+    'ChemistryExpert': ('experts.chemistry_expert', 'ChemistryExpert', 'common_acids_and_bases'),
+    'StudyGuideExpert': ('experts.study_guide_expert', 'StudyGuideExpert', None),
+}
+# Third-party SDKs a tutoring worker imports besides the expert modules
+SDK_MODULES = ('openai', 'streamlit')
+FIRST_QUERY = "What is photosynthesis?"
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cold_start_budgets.json')
+
+
+# ------------------------------------------------------------------ child side
+
+def _timed(phases: Dict[str, Any], name: str, fn):
+    """Run ``fn`` and store its duration in ms under ``name``; returns its result."""
+    start = time.perf_counter()
+    result = fn()
+    phases[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _first_answer(target: str, instance):
+    if target == 'ExpertAgent':
+        return instance.process_query(FIRST_QUERY)
+    if target == 'StudyGuideExpert':
+        return instance.process_query_with_inputs(
+            category="Study Techniques", question="How should I revise?", study_hours=2,
+            stress_level=5, learning_style="visual", has_upcoming_exam=True, sleep_hours=7
+        )
+    from experta import Fact
+    instance.reset()
+    instance.declare(Fact(query_topic=TARGETS[target][2]))
+    instance.run()
+    return instance.get_response()
+
+
+def profile_target(target: str, spawned_at: float) -> Dict[str, Any]:
+    """Child body: import, build and query one target in this (fresh) process."""
+    module_name, class_name, _ = TARGETS[target]
+    phases = {'interpreter_startup_ms': (time.time() - spawned_at) * 1000}
+    skipped = []
+
+    if target == 'ExpertAgent':
+        for sdk in SDK_MODULES:
+            try:
+                _timed(phases, f"import_{sdk}", lambda: __import__(sdk))
+            except ImportError:
+                skipped.append(sdk)
+
+    from utils.log import set_log_level
+    set_log_level("WARNING")
+    module = _timed(phases, 'import', lambda: __import__(module_name, fromlist=[class_name]))
+    cls = getattr(module, class_name)
+
+    if target == 'ExpertAgent':
+        from utils.llm_client import LLM_CLIENTS
+        os.environ.setdefault('OPENAI_API_KEY', 'cold-start-profile')  # building the client sends nothing
+        try:
+            _timed(phases, 'llm_client', LLM_CLIENTS.get_openai_client)
+        except Exception as e:
+            skipped.append(f"llm_client ({type(e).__name__}: {e})")
+        from benchmarks.fake_llm import install_fake_llm
+        install_fake_llm(latency=0.0)
+
+    instance = _timed(phases, 'construct', cls)
+    _timed(phases, 'first_answer', lambda: _first_answer(target, instance))
+    phases['time_to_first_answer_ms'] = (time.time() - spawned_at) * 1000
+    _timed(phases, 'construct_warm', cls)
+    return {'phases': phases, 'skipped': skipped}
+
+
+# ----------------------------------------------------------------- parent side
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Import tree from ``-X importtime`` output.
+
+    Lines are emitted after each import finishes (children before their
+    parent), indented two spaces per nesting level.
+
+    Returns:
+        Root nodes: {'module', 'self_ms', 'cumulative_ms', 'children'}
+    """
+    pending: Dict[int, List[Dict]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header line
+        name = fields[2]
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        node = {
+            'module': name.strip(),
+            'self_ms': self_us / 1000,
+            'cumulative_ms': cumulative_us / 1000,
+            'children': pending.pop(depth + 1, [])
+        }
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def _walk(nodes: List[Dict]):
+    for node in nodes:
+        yield node
+        yield from _walk(node['children'])
+
+
+def _prune(nodes: List[Dict], min_ms: float) -> List[Dict]:
+    return [
+        dict(node, children=_prune(node['children'], min_ms))
+        for node in sorted(nodes, key=lambda n: -n['cumulative_ms'])
+        if node['cumulative_ms'] >= min_ms
+    ]
+
+
+def summarize_imports(tree: List[Dict], min_ms: float, top: int = 15) -> Dict[str, Any]:
+    """Total, slowest modules by self time, per-package self time and the pruned tree."""
+    nodes = list(_walk(tree))
+    packages: Dict[str, float] = {}
+    for node in nodes:
+        package = node['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + node['self_ms']
+    return {
+        'total_ms': sum(node['cumulative_ms'] for node in tree),
+        'modules': len(nodes),
+        'slowest': [{'module': n['module'], 'self_ms': n['self_ms'], 'cumulative_ms': n['cumulative_ms']}
+                    for n in sorted(nodes, key=lambda n: -n['self_ms'])[:top]],
+        'by_package_ms': dict(sorted(packages.items(), key=lambda item: -item[1])[:top]),
+        'tree': _prune(tree, min_ms)
+    }
+
+
+def run_child(target: str) -> Dict[str, Any]:
+    """Profile ``target`` in a fresh ``python -X importtime`` process."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    spawned_at = time.time()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'benchmarks.cold_start',
+         '--child', target, '--spawned-at', repr(spawned_at)],
+        cwd=root, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"{target} profile failed:\n" + "\n".join(errors[-20:]))
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['import_tree'] = parse_importtime(proc.stderr)
+    return result
+
+
+def profile(targets: List[str], runs: int, min_import_ms: float) -> Dict[str, Any]:
+    """
+    Profile each target in ``runs`` fresh processes.
+
+    Returns:
+        Report with per-target phase medians (and all runs), the import summary
+        of the first run, and the flat ``metrics`` checked against budgets
+    """
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': runs
+        },
+        'targets': {},
+        'metrics': {}
+    }
+    for target in targets:
+        results = [run_child(target) for _ in range(runs)]
+        phase_names = list(results[0]['phases'])
+        medians = {name: statistics.median(r['phases'][name] for r in results if name in r['phases'])
+                   for name in phase_names}
+        report['targets'][target] = {
+            'phases_ms': medians,
+            'runs_ms': [r['phases'] for r in results],
+            'skipped': results[0]['skipped'],
+            'imports': summarize_imports(results[0]['import_tree'], min_import_ms)
+        }
+        for name, value in medians.items():
+            report['metrics'][f"{target}.{name}"] = value
+        report['metrics'][f"{target}.imports_total_ms"] = report['targets'][target]['imports']['total_ms']
+    return report
+
+
+def check_budgets(metrics: Dict[str, float], budgets: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Metrics above their budget (budgets for metrics that were not measured are ignored)."""
+    return [
+        {'metric': metric, 'value_ms': metrics[metric], 'budget_ms': limit}
+        for metric, limit in budgets.items()
+        if metric in metrics and metrics[metric] > limit
+    ]
+
+
+def _print_tree(nodes: List[Dict], indent: int = 0, max_depth: int = 4):
+    for node in nodes:
+        print(f"  {'  ' * indent}{node['module']:<{48 - 2 * indent}s} {node['cumulative_ms']:9.1f} {node['self_ms']:9.1f}")
+        if indent + 1 < max_depth:
+            _print_tree(node['children'], indent + 1, max_depth)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Cold-start and import-time profiler")
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS), help="Targets to profile")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh processes per target (medians are reported)")
+    parser.add_argument('--min-import-ms', type=float, default=1.0, help="Prune import tree nodes below this cumulative time")
+    parser.add_argument('--output', help="Save the report as JSON")
+    parser.add_argument('--budgets', nargs='?', const=DEFAULT_BUDGETS, help="Budgets JSON to check (default file if no path)")
+    parser.add_argument('--tree', action='store_true', help="Print the import trees")
+    parser.add_argument('--child', choices=list(TARGETS), help=argparse.SUPPRESS)
+    parser.add_argument('--spawned-at', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(profile_target(args.child, args.spawned_at or time.time())))
+        return
+
+    report = profile(args.targets, args.runs, args.min_import_ms)
+
+    print(f"{'target':18s} {'startup':>9s} {'import':>9s} {'construct':>10s} {'warm':>9s} {'1st answer':>11s} {'to answer':>10s}")
+    for target, data in report['targets'].items():
+        p = data['phases_ms']
+        print(f"{target:18s} {p['interpreter_startup_ms']:9.1f} {p['import_ms']:9.1f} {p['construct_ms']:10.1f} "
+              f"{p['construct_warm_ms']:9.1f} {p['first_answer_ms']:11.1f} {p['time_to_first_answer_ms']:10.1f}")
+        extras = {name[:-3]: value for name, value in p.items() if name.startswith(('import_', 'llm_'))}
+        if extras:
+            print(f"{'':18s} " + ", ".join(f"{name} {value:.1f}" for name, value in extras.items()))
+        if data['skipped']:
+            print(f"{'':18s} skipped: {', '.join(data['skipped'])}")
+    print("(ms, medians of fresh processes; 'to answer' is spawn to first answer)")
+
+    imports = report['targets'][args.targets[0]]['imports']
+    print(f"\nSlowest imports for {args.targets[0]} ({imports['modules']} modules, {imports['total_ms']:.1f} ms):")
+    for row in imports['slowest'][:10]:
+        print(f"  {row['module']:48s} self {row['self_ms']:8.1f}  cumulative {row['cumulative_ms']:8.1f}")
+    print("By package (self ms): " + ", ".join(f"{name} {ms:.1f}" for name, ms in list(imports['by_package_ms'].items())[:8]))
+
+    if args.tree:
+        for target, data in report['targets'].items():
+            print(f"\nImport tree: {target} (cumulative / self ms)")
+            _print_tree(data['imports']['tree'])
+
+    over = []
+    if args.budgets:
+        with open(args.budgets, encoding='utf-8') as f:
+            budgets = json.load(f)
+        over = report['budget_violations'] = check_budgets(report['metrics'], budgets)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved report to {args.output}")
+
+    if args.budgets:
+        if over:
+            for row in over:
+                print(f"  {row['metric']:40s} {row['value_ms']:9.1f} ms > budget {row['budget_ms']:.1f} ms")
+            print(f"❌ {len(over)} metric(s) over budget")
+            sys.exit(1)
+        print(f"✅ Within budgets ({args.budgets})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Fake LLM
+--------
+Offline stand-in for the OpenAI client used by the benchmarks.
+
+``FakeOpenAIClient`` implements the part of the ``chat.completions.create``
+API the tutor uses (blocking and ``stream=True``). Routing prompts are answered
+with the best-ranked suggested topics from the prompt itself (several when they
+tie, as for "X and Y" questions), so requests reach the real expert systems;
+answer prompts get a canned answer ending in a "Shall I explain ...?" offer, so
+confirmation follow-ups work. Install it with ``install_fake_llm()`` (uses
+utils.llm_client.LLMClientFactory.set_openai_client).
+
+Latency can be fixed or drawn from a uniform, normal, lognormal or
+exponential distribution, and a fraction of completions can fail with
+``FakeLLMError`` to exercise the fallback paths.
+"""
+
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+SUGGESTION_HEADER = re.compile(r"\*\*Suggested (Biology|Physics|Chemistry) Topics")
+SUGGESTED_TOPIC = re.compile(r"  - '([^']+)' \(relevance: (\d+)\)")
+CONCEPT_LINE = re.compile(r"- Concept: (.+)|CONCEPTS:\n1\. (.+)")
+
+ANSWER_TEMPLATE = (
+    "Here is what the expert system says about {concept}. It explains the key idea step by step "
+    "and links it to the examples from your syllabus so you can revise it quickly before the exam. "
+    "The expert system chose this answer because your question matched the {concept} topic.\n\n"
+    "💭 Shall I explain {concept} in more detail?"
+)
+
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+# Most topics the fake router selects for one query
+MAX_ROUTED_TOPICS = 3
+
+
+class FakeLLMError(Exception):
+    """Injected completion failure (stands in for API/timeout errors)."""
+
+
+def _approx_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class FakeCompletions:
+    """``client.chat.completions`` with canned, prompt-dependent replies."""
+
+    def __init__(self, client: 'FakeOpenAIClient'):
+        self._client = client
+
+    def create(self, model: str = None, messages: List[Dict] = None, stream: bool = False,
+               stream_options: Optional[Dict] = None, **kwargs):
+        prompt = messages[-1]['content'] if messages else ""
+        text = self._client.reply(prompt)
+        self._client.record(prompt, text)
+        self._client.wait()
+        self._client.maybe_fail()
+
+        usage = SimpleNamespace(
+            prompt_tokens=_approx_tokens(prompt),
+            completion_tokens=_approx_tokens(text),
+            total_tokens=_approx_tokens(prompt) + _approx_tokens(text)
+        )
+        if not stream:
+            message = SimpleNamespace(role="assistant", content=text)
+            return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")], usage=usage)
+        include_usage = bool(stream_options and stream_options.get('include_usage'))
+        return self._client.stream_chunks(model, text, usage if include_usage else None)
+
+
+class FakeOpenAIClient:
+    """
+    Minimal OpenAI client replacement.
+
+    Args:
+        latency: Mean seconds each completion takes before returning (or before its first chunk)
+        chunk_words: Words per streamed chunk
+        chunk_delay: Seconds between streamed chunks
+        distribution: How latency varies per call (one of LATENCY_DISTRIBUTIONS)
+        spread: Variation around ``latency``: half-width for uniform, standard
+            deviation for normal, sigma of the underlying normal for lognormal
+        failure_rate: Fraction of completions that raise FakeLLMError (after the latency)
+        seed: Seed of the latency/failure random generator
+    """
+
+    def __init__(self, latency: float = 0.0, chunk_words: int = 3, chunk_delay: float = 0.0,
+                 distribution: str = 'fixed', spread: float = 0.0, failure_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}' (expected one of {LATENCY_DISTRIBUTIONS})")
+        self.latency = latency
+        self.chunk_words = chunk_words
+        self.chunk_delay = chunk_delay
+        self.distribution = distribution
+        self.spread = spread
+        self.failure_rate = failure_rate
+        self.chat = SimpleNamespace(completions=FakeCompletions(self))
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.prompt_chars = 0
+        self.total_latency = 0.0
+
+    def sample_latency(self) -> float:
+        """Draw one completion latency in seconds (never negative)."""
+        if self.latency <= 0:
+            return 0.0
+        with self._lock:
+            if self.distribution == 'uniform':
+                value = self._rng.uniform(self.latency - self.spread, self.latency + self.spread)
+            elif self.distribution == 'normal':
+                value = self._rng.gauss(self.latency, self.spread)
+            elif self.distribution == 'lognormal':
+                # Median-preserving: long tail above ``latency``
+                value = self.latency * self._rng.lognormvariate(0.0, self.spread)
+            elif self.distribution == 'exponential':
+                value = self._rng.expovariate(1.0 / self.latency)
+            else:
+                value = self.latency
+        return max(0.0, value)
+
+    def wait(self):
+        """Simulate request latency."""
+        delay = self.sample_latency()
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.total_latency += delay
+
+    def maybe_fail(self):
+        """Raise FakeLLMError for ``failure_rate`` of the calls."""
+        if self.failure_rate <= 0:
+            return
+        with self._lock:
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            raise FakeLLMError("Injected LLM failure")
+
+    def record(self, prompt: str, text: str):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+
+    def stats(self) -> Dict:
+        """Calls, injected failures and mean injected latency."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'failures': self.failures,
+                'mean_latency_ms': (self.total_latency * 1000 / self.calls) if self.calls else 0.0,
+                'prompt_chars': self.prompt_chars
+            }
+
+    def reply(self, prompt: str) -> str:
+        """Canned reply for a tutor prompt."""
+        if "TOOL:" in prompt and "REASONING:" in prompt:
+            return self._route(prompt)
+        concept = CONCEPT_LINE.search(prompt)
+        concept = (concept.group(1) or concept.group(2)).strip() if concept else "this topic"
+        return ANSWER_TEMPLATE.format(concept=concept)
+
+    @staticmethod
+    def _route(prompt: str) -> str:
+        """Pick the best-ranked suggested topics, as a well-behaved router would."""
+        headers = list(SUGGESTION_HEADER.finditer(prompt))
+        if not headers:
+            return "TOOL: biology_expert\nTOPIC: general\nREASONING: No suggested topics."
+
+        best_tool, best_topics, best_score = None, [], -1
+        for i, header in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(prompt)
+            # The suggestion lists end at the first blank line after the last header
+            section = prompt[header.end():end].split("\n\n", 1)[0]
+            topics = [(name, int(score)) for name, score in SUGGESTED_TOPIC.findall(section)]
+            if topics and topics[0][1] > best_score:
+                best_score = topics[0][1]
+                best_tool = f"{header.group(1).lower()}_expert"
+                best_topics = [name for name, score in topics if score == best_score][:MAX_ROUTED_TOPICS]
+
+        if best_tool is None:
+            return "TOOL: biology_expert\nTOPIC: general\nREASONING: No suggested topics."
+        lines = [f"TOOL: {best_tool}"] + [f"TOPIC: {topic}" for topic in best_topics]
+        lines.append("REASONING: Highest-ranked suggested topics.")
+        return "\n".join(lines)
+
+    def stream_chunks(self, model: Optional[str], text: str, usage=None):
+        """Yield ``text`` as streaming chunks of ``chunk_words`` words (then a usage chunk if given)."""
+        words = text.split(" ")
+        for i in range(0, len(words), self.chunk_words):
+            piece = " ".join(words[i:i + self.chunk_words])
+            if i + self.chunk_words < len(words):
+                piece += " "
+            if self.chunk_delay > 0:
+                time.sleep(self.chunk_delay)
+            delta = SimpleNamespace(content=piece, role=None)
+            yield SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+        if usage is not None:
+            yield SimpleNamespace(model=model, choices=[], usage=usage)
+
+
+def install_fake_llm(**kwargs) -> FakeOpenAIClient:
+    """Make every get_openai_client() caller use a FakeOpenAIClient; returns it."""
+    from utils.llm_client import LLM_CLIENTS
+
+    client = FakeOpenAIClient(**kwargs)
+    LLM_CLIENTS.set_openai_client(client)
+    return client
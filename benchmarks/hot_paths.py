@@ -0,0 +1,255 @@
+"""
+Hot Path Micro-Benchmarks
+-------------------------
+Times the tutoring hot paths in isolation:
+
+    find_matching_topics   ExpertAgent._find_matching_topics (keyword topic search)
+    execute_tool           ExpertAgent._execute_tool (one expert engine run)
+    construct_<expert>     Building each expert engine (KB load and rule setup)
+    study_guide_query      StudyGuideExpert.process_query_with_inputs
+
+The LLM is replaced by the offline fake (benchmarks/fake_llm.py), so nothing
+leaves the process. For each case this reports the first (cold) call, the
+warm-up mean, then the mean, p50 and p95 over the measured iterations. An
+allocation pass under tracemalloc gives the peak memory allocated per call and
+the blocks still allocated after it. Logging is lowered to WARNING so
+per-query log records are not part of the measurement.
+
+Results can be saved as JSON. With ``--baseline`` they are compared against an
+earlier results file, and a case whose mean, p95 or allocation grew by more
+than ``--threshold`` is flagged as a regression (the exit status is then 1).
+
+Usage:
+    python -m benchmarks.hot_paths --iterations 200 --output results.json
+    python -m benchmarks.hot_paths --baseline results.json --threshold 0.15
+    python -m benchmarks.hot_paths --cases find_matching_topics execute_tool
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.fake_llm import install_fake_llm
+from utils.log import set_log_level
+
+QUERIES = (
+    ("What is photosynthesis?", 'biology_expert'),
+    ("How does the digestive system break down food?", 'biology_expert'),
+    ("Explain the structure of the human heart", 'biology_expert'),
+    ("What are transverse and longitudinal waves?", 'physics_expert'),
+    ("How does an electric current flow in a circuit?", 'physics_expert'),
+    ("Explain Newton's laws of motion", 'physics_expert'),
+    ("What are acids and bases?", 'chemistry_expert'),
+    ("How is the periodic table arranged?", 'chemistry_expert'),
+    ("Explain covalent and ionic bonds", 'chemistry_expert'),
+)
+
+# Compared against the baseline (lower is better)
+COMPARED_METRICS = ('mean_ms', 'p95_ms', 'alloc_kib')
+
+
+def _agent():
+    from agents.expert_agent import ExpertAgent
+    install_fake_llm()
+    return ExpertAgent()
+
+
+def _case_find_matching_topics() -> Callable:
+    agent = _agent()
+    queries = itertools.cycle(QUERIES)
+    return lambda: agent._find_matching_topics(*next(queries))
+
+
+def _case_execute_tool() -> Callable:
+    agent = _agent()
+    inputs = []
+    for query, tool in QUERIES:
+        matches = agent._find_matching_topics(query, tool, max_results=1)
+        if matches:
+            inputs.append((tool, matches[0]['topic']))
+    inputs = itertools.cycle(inputs)
+    return lambda: agent._execute_tool(*next(inputs))
+
+
+def _case_construct(module: str, name: str) -> Callable:
+    def setup():
+        return getattr(__import__(module, fromlist=[name]), name)
+    return setup
+
+
+def _case_study_guide_query() -> Callable:
+    from experts.study_guide_compiled import (
+        GRID_CATEGORIES, GRID_EXAM, GRID_LEARNING_STYLES, GRID_SLEEP_HOURS,
+        GRID_STRESS_LEVELS, GRID_STUDY_HOURS
+    )
+    from experts.study_guide_expert import StudyGuideExpert
+
+    expert = StudyGuideExpert()
+    # A fixed, spread-out sample of the Study Guide tab's input grid
+    grid = list(itertools.product(GRID_CATEGORIES, GRID_STUDY_HOURS[::4], GRID_STRESS_LEVELS[::3],
+                                  GRID_SLEEP_HOURS[::4], GRID_LEARNING_STYLES[::2], GRID_EXAM))
+    inputs = itertools.cycle(grid[::max(1, len(grid) // 97)])
+
+    def run():
+        category, hours, stress, sleep, style, exam = next(inputs)
+        return expert.process_query_with_inputs(
+            category=category, question=f"I need help with {category.lower()}",
+            study_hours=hours, stress_level=stress, learning_style=style,
+            has_upcoming_exam=exam, sleep_hours=sleep
+        )
+    return run
+
+
+# name -> setup returning the callable to time (construction cases time the class itself)
+CASES = {
+    'find_matching_topics': _case_find_matching_topics,
+    'execute_tool': _case_execute_tool,
+    'construct_biology_expert': _case_construct('experts.biology_expert', 'BiologyExpert'),
+    'construct_physics_expert': _case_construct('experts.physics_expert', 'PhysicsExpert'),
+    'construct_chemistry_expert': _case_construct('experts.chemistry_expert', 'ChemistryExpert'),
+    'construct_study_guide_expert': _case_construct('experts.study_guide_expert', 'StudyGuideExpert'),
+    'study_guide_query': _case_study_guide_query,
+}
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _time_calls(fn: Callable, count: int) -> List[float]:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _allocations(fn: Callable, count: int) -> Dict:
+    """Peak bytes allocated per call and blocks left allocated per call (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        peaks = []
+        before = tracemalloc.take_snapshot()
+        for _ in range(count):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename')
+    return {
+        'alloc_kib': statistics.mean(peaks) / 1024,
+        'retained_blocks': sum(stat.count_diff for stat in stats) / count
+    }
+
+
+def run_case(name: str, iterations: int, warmup: int, alloc_iterations: int) -> Dict:
+    """Set up one case and measure it."""
+    fn = CASES[name]()
+    cold = _time_calls(fn, 1)[0]
+    warm = _time_calls(fn, warmup)
+    timings = _time_calls(fn, iterations)
+    result = {
+        'iterations': iterations,
+        'first_call_ms': cold * 1000,
+        'warmup_mean_ms': statistics.mean(warm) * 1000 if warm else None,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': _percentile(timings, 0.50) * 1000,
+        'p95_ms': _percentile(timings, 0.95) * 1000,
+    }
+    result.update(_allocations(fn, alloc_iterations))
+    return result
+
+
+def measure(cases: List[str], iterations: int, warmup: int, alloc_iterations: int) -> Dict:
+    """Run the selected cases; returns the JSON-serializable results document."""
+    # Per-query log records would be measured along with the hot paths
+    set_log_level("WARNING")
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'warmup': warmup
+        },
+        'cases': {name: run_case(name, iterations, warmup, alloc_iterations) for name in cases}
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """
+    Compare results with a baseline document.
+
+    Returns:
+        One row per case and metric present in both, with the change ratio and
+        whether it exceeds ``threshold`` (e.g. 0.10 = 10% slower/bigger)
+    """
+    rows = []
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            rows.append({'case': name, 'metric': metric, 'baseline': before, 'current': after,
+                         'change': change, 'regression': change > threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tutoring hot path micro-benchmarks")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES), help="Cases to run")
+    parser.add_argument('--iterations', type=int, default=200, help="Measured calls per case")
+    parser.add_argument('--warmup', type=int, default=20, help="Warm-up calls per case (reported separately)")
+    parser.add_argument('--alloc-iterations', type=int, default=20, help="Calls measured under tracemalloc")
+    parser.add_argument('--output', help="Save the results as JSON")
+    parser.add_argument('--baseline', help="Results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed growth before flagging (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    results = measure(args.cases, args.iterations, args.warmup, args.alloc_iterations)
+
+    print(f"{'case':30s} {'first':>9s} {'warm-up':>9s} {'mean':>9s} {'p95':>9s} {'alloc KiB':>10s} {'blocks':>8s}")
+    for name, r in results['cases'].items():
+        warm = f"{r['warmup_mean_ms']:9.3f}" if r['warmup_mean_ms'] is not None else f"{'-':>9s}"
+        print(f"{name:30s} {r['first_call_ms']:9.3f} {warm} {r['mean_ms']:9.3f} {r['p95_ms']:9.3f} "
+              f"{r['alloc_kib']:10.1f} {r['retained_blocks']:8.1f}")
+    print("(times in ms)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        print(f"\nCompared with {args.baseline} (threshold {args.threshold:.0%}):")
+        for row in rows:
+            flag = "⚠️ REGRESSION" if row['regression'] else ""
+            print(f"  {row['case']:30s} {row['metric']:10s} {row['baseline']:10.3f} -> {row['current']:10.3f} "
+                  f"({row['change']:+.1%}) {flag}")
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+KB Record Memory Benchmark
+--------------------------
+Compares the memory retained by expert responses before and after the switch
+to shared KB records.
+
+Simulates many tutoring sessions that each keep their responses (as the
+conversation history and chat UI do). The "legacy" variant retains one fresh
+dict + examples list per firing with certainty data written into it; the
+"shared" variant retains ScoredResponse wrappers around shared KBRecords.
+
+Usage:
+    python -m benchmarks.kb_record_memory --sessions 50 --queries 10
+"""
+
+import argparse
+import random
+import tracemalloc
+
+from experta import Fact
+
+from experts.biology_expert import BiologyExpert
+
+
+def _legacy_copy(response) -> dict:
+    """Rebuild the per-firing dict the experts used to allocate and mutate."""
+    payload = {
+        'concept': response['concept'],
+        'explanation': response['explanation'],
+        'topic': response['topic'],
+        'subtopic': response['subtopic'],
+        'examples': list(response['examples'])
+    }
+    payload['certainty_factor'] = response['certainty_factor']
+    payload['confidence_level'] = response['confidence_level']
+    return payload
+
+
+def _run_sessions(expert, topics, sessions: int, queries: int, legacy: bool, seed: int) -> list:
+    """Fire `queries` random topics for each session and keep every response."""
+    rng = random.Random(seed)
+    retained = []
+    for _ in range(sessions):
+        history = []
+        for topic in rng.choices(topics, k=queries):
+            expert.reset()
+            expert.declare(Fact(query_topic=topic))
+            expert.run()
+            for response in expert.all_responses:
+                history.append(_legacy_copy(response) if legacy else response)
+        retained.append(history)
+    return retained
+
+
+def measure(sessions: int, queries: int, seed: int = 42) -> dict:
+    """Measure retained bytes for the legacy and shared representations."""
+    expert = BiologyExpert()
+    topics = [name[len('rule_'):] for name in dir(expert) if name.startswith('rule_')]
+
+    # Warm up: create every shared record once so both runs start from the same state
+    _run_sessions(expert, topics, 1, len(topics), legacy=False, seed=seed)
+
+    results = {}
+    for label, legacy in (('legacy_dicts', True), ('shared_records', False)):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        retained = _run_sessions(expert, topics, sessions, queries, legacy, seed)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        # Ignore Experta's own working memory (Rete node state, activation caches),
+        # which is the same for both variants and would drown out the difference
+        engine_noise = (tracemalloc.Filter(False, '*experta*'), tracemalloc.Filter(False, tracemalloc.__file__))
+        stats = after.filter_traces(engine_noise).compare_to(before.filter_traces(engine_noise), 'filename')
+        retained_bytes = sum(stat.size_diff for stat in stats)
+        results[label] = {
+            'retained_bytes': retained_bytes,
+            'responses': sum(len(history) for history in retained),
+        }
+        del retained
+
+    for stats in results.values():
+        stats['bytes_per_response'] = stats['retained_bytes'] / max(1, stats['responses'])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KB record memory benchmark")
+    parser.add_argument('--sessions', type=int, default=50, help="Number of simulated sessions")
+    parser.add_argument('--queries', type=int, default=10, help="Topic queries per session")
+    args = parser.parse_args()
+
+    results = measure(args.sessions, args.queries)
+
+    print(f"Sessions: {args.sessions}, queries/session: {args.queries}")
+    for label, stats in results.items():
+        print(f"  {label:15s} {stats['retained_bytes'] / 1024:10.1f} KiB retained "
+              f"({stats['bytes_per_response']:.0f} B/response, {stats['responses']} responses)")
+    legacy = results['legacy_dicts']['retained_bytes']
+    shared = results['shared_records']['retained_bytes']
+    if legacy > 0:
+        print(f"  Reduction: {100 * (1 - shared / legacy):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
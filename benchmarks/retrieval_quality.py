@@ -0,0 +1,323 @@
+"""
+Topic Retrieval Quality Benchmark
+---------------------------------
+Scores topic retrieval against a versioned gold set of student-style
+questions (benchmarks/retrieval_gold.json). Each question names the expert it
+belongs to and the KB topic IDs (rule names without ``rule_``) that answer it.
+
+For every question the retriever is asked for its top ``--depth`` topics and
+timed over ``--repeats`` calls. Reported per expert, per tag (e.g. ``typo``)
+and overall:
+
+    recall@k     Share of the expected topics found in the top k (k = 1, 3, 5, 10)
+    hit@k        Share of questions with at least one expected topic in the top k
+    mrr          Mean reciprocal rank of the first expected topic (0 if missed)
+    mean/p50/p95 Per-query latency in ms
+
+The default retriever, ``corrected``, is the query path of ExpertAgent:
+spelling correction against the KB vocabulary, then ``_find_matching_topics``
+(``keyword`` skips the correction). Another one is selected with ``--retriever module:factory``, where ``factory(agent)`` returns
+``retrieve(query, expert_name, max_results)`` giving topic IDs or
+``{'topic': ...}`` dicts, best first.
+
+Quality is checked against minimum floors (benchmarks/retrieval_floors.json,
+``{"scope.metric": minimum}``). With ``--baseline`` the results are also
+compared to an earlier results file of the same gold set version: a quality
+metric that fell by more than ``--tolerance``, or an overall latency that grew
+by more than ``--threshold``, is a regression. Either failure sets exit status 1.
+
+Usage:
+    python -m benchmarks.retrieval_quality --output retrieval.json
+    python -m benchmarks.retrieval_quality --baseline retrieval.json --threshold 0.15
+    python -m benchmarks.retrieval_quality --retriever mypkg.retrievers:bm25 --failures
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.fake_llm import install_fake_llm
+from utils.log import set_log_level
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_GOLD = os.path.join(HERE, 'retrieval_gold.json')
+DEFAULT_FLOORS = os.path.join(HERE, 'retrieval_floors.json')
+
+CUTOFFS = (1, 3, 5, 10)
+QUALITY_METRICS = tuple(f"recall@{k}" for k in CUTOFFS) + tuple(f"hit@{k}" for k in CUTOFFS) + ('mrr',)
+# Compared against the baseline (lower is better)
+LATENCY_METRICS = ('mean_ms', 'p95_ms')
+
+
+def _keyword(agent) -> Callable:
+    return agent._find_matching_topics
+
+
+def _corrected(agent) -> Callable:
+    def retrieve(query: str, expert_name: str, max_results: int):
+        return agent._find_matching_topics(agent._correct_spelling(query)[0], expert_name, max_results)
+    return retrieve
+
+
+# name -> factory(agent) returning retrieve(query, expert_name, max_results)
+RETRIEVERS = {
+    'keyword': _keyword,
+    'corrected': _corrected,
+}
+
+
+def load_retriever(spec: str) -> Callable:
+    """A RETRIEVERS name or ``module:factory``."""
+    if spec in RETRIEVERS:
+        return RETRIEVERS[spec]
+    module, _, name = spec.partition(':')
+    if not name:
+        raise ValueError(f"Unknown retriever '{spec}' (use one of {sorted(RETRIEVERS)} or module:factory)")
+    return getattr(importlib.import_module(module), name)
+
+
+def load_gold(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        gold = json.load(f)
+    if 'version' not in gold or not gold.get('queries'):
+        raise ValueError(f"{path} is not a gold set (needs 'version' and 'queries')")
+    return gold
+
+
+def unknown_topics(gold: Dict, agent) -> List[str]:
+    """Expected topic IDs the KB no longer has (the gold set needs updating)."""
+    available = {}
+    missing = []
+    for item in gold['queries']:
+        expert = item['expert']
+        if expert not in available:
+            available[expert] = set(agent._get_available_topics(expert))
+        missing.extend(f"{item['id']}: {topic}" for topic in item['expected'] if topic not in available[expert])
+    return missing
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _topic_ids(results) -> List[str]:
+    return [r['topic'] if isinstance(r, dict) else r for r in results]
+
+
+def score_query(ranked: List[str], expected: List[str]) -> Dict[str, float]:
+    """recall@k, hit@k and reciprocal rank for one ranked list."""
+    relevant = set(expected)
+    scores = {}
+    for k in CUTOFFS:
+        found = len(relevant.intersection(ranked[:k]))
+        scores[f"recall@{k}"] = found / len(relevant)
+        scores[f"hit@{k}"] = 1.0 if found else 0.0
+    rank = next((i for i, topic in enumerate(ranked, 1) if topic in relevant), None)
+    scores['mrr'] = 1 / rank if rank else 0.0
+    scores['first_rank'] = rank
+    return scores
+
+
+def _aggregate(rows: List[Dict]) -> Dict[str, float]:
+    latencies = [row['latency_ms'] for row in rows]
+    summary = {'queries': len(rows)}
+    for metric in QUALITY_METRICS:
+        summary[metric] = statistics.mean(row['scores'][metric] for row in rows)
+    summary.update({
+        'mean_ms': statistics.mean(latencies),
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+    })
+    return summary
+
+
+def evaluate(gold: Dict, retrieve: Callable, depth: int, repeats: int) -> Dict:
+    """
+    Run every gold query through ``retrieve``.
+
+    Returns:
+        Per-query rows, summaries per scope (``overall``, each expert, each tag
+        and ``untagged``) and the flat ``scope.metric`` dict checked against
+        floors and baselines
+    """
+    rows = []
+    for item in gold['queries']:
+        retrieve(item['query'], item['expert'], depth)  # warm any per-query caches
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = retrieve(item['query'], item['expert'], depth)
+            timings.append(time.perf_counter() - start)
+        ranked = _topic_ids(results)[:depth]
+        rows.append({
+            'id': item['id'],
+            'expert': item['expert'],
+            'query': item['query'],
+            'tags': item.get('tags', []),
+            'expected': item['expected'],
+            'retrieved': ranked,
+            'scores': score_query(ranked, item['expected']),
+            'latency_ms': statistics.median(timings) * 1000
+        })
+
+    scopes = {'overall': rows}
+    for row in rows:
+        scopes.setdefault(row['expert'], []).append(row)
+        for tag in row['tags'] or ['untagged']:
+            scopes.setdefault(tag, []).append(row)
+    summaries = {scope: _aggregate(members) for scope, members in scopes.items()}
+    metrics = {f"{scope}.{metric}": value
+               for scope, summary in summaries.items()
+               for metric, value in summary.items() if metric != 'queries'}
+    return {'queries': rows, 'summaries': summaries, 'metrics': metrics}
+
+
+def check_floors(metrics: Dict[str, float], floors: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Metrics below their floor (floors for metrics that were not measured are ignored)."""
+    return [
+        {'metric': metric, 'value': metrics[metric], 'floor': minimum}
+        for metric, minimum in floors.items()
+        if metric in metrics and metrics[metric] < minimum
+    ]
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, threshold: float) -> List[Dict]:
+    """
+    Compare results with a baseline document.
+
+    Returns:
+        One row per metric present in both: quality metrics regress when they
+        fall by more than ``tolerance`` (absolute), the overall latencies when
+        they grow by more than ``threshold`` (e.g. 0.10 = 10% slower; the
+        per-scope latencies are too few queries to compare)
+    """
+    rows = []
+    previous = baseline.get('metrics', {})
+    for name, after in results['metrics'].items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        metric = name.rsplit('.', 1)[1]
+        if metric in QUALITY_METRICS:
+            change = after - before
+            regression = change < -tolerance
+        elif metric in LATENCY_METRICS and name.startswith('overall.') and before:
+            change = after / before - 1
+            regression = change > threshold
+        else:
+            continue
+        rows.append({'metric': name, 'baseline': before, 'current': after,
+                     'change': change, 'regression': regression})
+    return rows
+
+
+def measure(gold_path: str, retriever: str, depth: int, repeats: int) -> Dict:
+    """Build the agent, check the gold set against its KB and evaluate; returns the results document."""
+    from agents.expert_agent import ExpertAgent
+
+    set_log_level("WARNING")
+    install_fake_llm()
+    gold = load_gold(gold_path)
+    agent = ExpertAgent()
+    missing = unknown_topics(gold, agent)
+    if missing:
+        raise ValueError("Gold set expects topics the KB does not have:\n  " + "\n  ".join(missing))
+    report = evaluate(gold, load_retriever(retriever)(agent), depth, repeats)
+    report['meta'] = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'gold_version': gold['version'],
+        'retriever': retriever,
+        'depth': depth,
+        'repeats': repeats
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Topic retrieval quality and latency benchmark")
+    parser.add_argument('--gold', default=DEFAULT_GOLD, help="Gold set JSON")
+    parser.add_argument('--retriever', default='corrected', help="Retriever name or module:factory")
+    parser.add_argument('--depth', type=int, default=max(CUTOFFS), help="Topics requested per query")
+    parser.add_argument('--repeats', type=int, default=50, help="Timed calls per query (median is kept)")
+    parser.add_argument('--floors', default=DEFAULT_FLOORS, help="Minimum quality JSON ('' to skip)")
+    parser.add_argument('--output', help="Save the results as JSON")
+    parser.add_argument('--baseline', help="Results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.02, help="Allowed absolute drop in a quality metric")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed latency growth (0.25 = 25%%)")
+    parser.add_argument('--failures', action='store_true', help="List queries whose first expected topic is not ranked 1")
+    args = parser.parse_args()
+
+    try:
+        results = measure(args.gold, args.retriever, args.depth, args.repeats)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    print(f"Gold set v{results['meta']['gold_version']}, retriever '{args.retriever}'")
+    print(f"{'scope':18s} {'n':>4s} {'R@1':>6s} {'R@3':>6s} {'R@5':>6s} {'R@10':>6s} {'MRR':>6s} "
+          f"{'mean':>8s} {'p50':>8s} {'p95':>8s}")
+    for scope, s in results['summaries'].items():
+        print(f"{scope:18s} {s['queries']:4d} {s['recall@1']:6.3f} {s['recall@3']:6.3f} {s['recall@5']:6.3f} "
+              f"{s['recall@10']:6.3f} {s['mrr']:6.3f} {s['mean_ms']:8.3f} {s['p50_ms']:8.3f} {s['p95_ms']:8.3f}")
+    print("(times in ms)")
+
+    if args.failures:
+        print("\nQueries not answered at rank 1:")
+        for row in results['queries']:
+            rank = row['scores']['first_rank']
+            if rank != 1:
+                print(f"  {row['id']:8s} rank {rank or '-':>2} {row['query']!r} -> {row['retrieved'][:3]}")
+
+    failed = False
+    if args.floors:
+        with open(args.floors, encoding='utf-8') as f:
+            floors = json.load(f)
+        below = results['floor_violations'] = check_floors(results['metrics'], floors)
+        if below:
+            failed = True
+            print(f"\n❌ {len(below)} metric(s) below their floor ({args.floors}):")
+            for row in below:
+                print(f"  {row['metric']:30s} {row['value']:.3f} < {row['floor']:.3f}")
+        else:
+            print(f"\n✅ Above quality floors ({args.floors})")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('gold_version') != results['meta']['gold_version']:
+            print(f"⚠️ {args.baseline} used gold set v{baseline.get('meta', {}).get('gold_version')}; not comparable")
+            sys.exit(2)
+        rows = compare(results, baseline, args.tolerance, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        print(f"\nCompared with {args.baseline} (quality -{args.tolerance:.2f}, latency +{args.threshold:.0%}):")
+        for row in rows:
+            if row['regression'] or row['metric'].startswith('overall.'):
+                flag = "⚠️ REGRESSION" if row['regression'] else ""
+                change = f"{row['change']:+.1%}" if row['metric'].endswith('_ms') else f"{row['change']:+.3f}"
+                print(f"  {row['metric']:30s} {row['baseline']:10.3f} -> {row['current']:10.3f} ({change}) {flag}")
+        if regressions:
+            failed = True
+            print(f"❌ {len(regressions)} regression(s)")
+        else:
+            print("✅ No regressions")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Saved results to {args.output}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Concurrent Session Load Test
+----------------------------
+How many simultaneous students can one worker serve?
+
+Drives N concurrent simulated sessions through ``ExpertAgent.process_query``
+on an AgentPool, as the API and Streamlit app do, with the fake LLM
+(benchmarks/fake_llm.py) injecting latency from a chosen distribution and a
+chosen failure rate. Each session asks single-topic and multi-topic questions.
+It follows up with "yes" when an answer offered a topic and pauses for a
+random think time between turns.
+
+Reports throughput, latency percentiles per pipeline stage (checkout, i.e.
+session load and waiting for an agent; the trace stages of the result's
+``timings``; whole request), and process RSS sampled over the run. Pass several
+``--sessions`` values to sweep the concurrency and see where p95 starts to
+degrade.
+
+Usage:
+    python -m benchmarks.session_load --sessions 1 4 8 16 --turns 10
+    python -m benchmarks.session_load --sessions 8 --llm-latency 0.4 --distribution lognormal --spread 0.6
+    python -m benchmarks.session_load --sessions 8 --failure-rate 0.05 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.fake_llm import LATENCY_DISTRIBUTIONS, install_fake_llm
+from utils.log import set_log_level
+from utils.memory_diagnostics import rss_mb
+
+SINGLE_TOPIC_QUESTIONS = (
+    "What is photosynthesis?",
+    "How does the heart work?",
+    "What are acids and bases?",
+    "What is a concave lens?",
+    "Explain chromatography",
+    "What are longitudinal waves?",
+)
+MULTI_TOPIC_QUESTIONS = (
+    "Explain respiration and photosynthesis",
+    "Explain transverse and longitudinal waves",
+    "Explain digestion and absorption of food",
+)
+
+
+class RSSSampler(threading.Thread):
+    """Samples (elapsed seconds, RSS MiB, completed requests) every ``interval`` seconds."""
+
+    def __init__(self, interval: float, completed: List):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.completed = completed
+        self.samples = []
+        self._stop_event = threading.Event()
+        self._start = time.perf_counter()
+
+    def run(self):
+        while True:
+            self.samples.append((time.perf_counter() - self._start, rss_mb(), len(self.completed)))
+            if self._stop_event.wait(self.interval):
+                self.samples.append((time.perf_counter() - self._start, rss_mb(), len(self.completed)))
+                return
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _session(pool, session_id: str, rng: random.Random, turns: int, think_time: float,
+             multi_topic_rate: float, confirm_rate: float, samples: List):
+    """One simulated student: ``turns`` requests with follow-up confirmations."""
+    offered = False
+    for _ in range(turns):
+        if offered and rng.random() < confirm_rate:
+            kind, question = 'confirm', "yes"
+        elif rng.random() < multi_topic_rate:
+            kind, question = 'multi_topic', rng.choice(MULTI_TOPIC_QUESTIONS)
+        else:
+            kind, question = 'single_topic', rng.choice(SINGLE_TOPIC_QUESTIONS)
+
+        start = time.perf_counter()
+        sample = {'kind': kind, 'ok': False}
+        try:
+            with pool.session(session_id) as session:
+                sample['checkout'] = time.perf_counter() - start
+                result = session.agent.process_query(question)
+                sample.update({stage: ms / 1000 for stage, ms in result['timings']['stages_ms'].items()})
+                sample['ok'] = bool(result.get('success'))
+                sample['topics'] = len(result.get('query_topics') or [])
+                offered = bool(session.agent.last_offered_topic)
+        except Exception as e:
+            sample['error'] = f"{type(e).__name__}: {e}"
+            offered = False
+        sample['request'] = time.perf_counter() - start
+        samples.append(sample)
+
+        if think_time > 0:
+            time.sleep(rng.expovariate(1.0 / think_time))
+
+
+def _stage_names(samples: List[Dict]) -> List[str]:
+    """'checkout', the trace stages seen (in first-seen order), then 'request'."""
+    names = ['checkout']
+    for sample in samples:
+        for key, value in sample.items():
+            if isinstance(value, float) and key not in names and key != 'request':
+                names.append(key)
+    return names + ['request']
+
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+    return {'count': len(values), 'mean': statistics.mean(values) * 1000,
+            'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1] * 1000}
+
+
+def run_level(pool, sessions: int, turns: int, think_time: float, multi_topic_rate: float,
+              confirm_rate: float, rss_interval: float, seed: int) -> Dict:
+    """Run ``sessions`` concurrent sessions to completion and summarize them."""
+    rng = random.Random(seed)
+    samples = []
+    sampler = RSSSampler(rss_interval, samples)
+    threads = [
+        threading.Thread(target=_session, args=(
+            pool, f"load-{sessions}-{i}", random.Random(rng.random()), turns, think_time,
+            multi_topic_rate, confirm_rate, samples))
+        for i in range(sessions)
+    ]
+    sampler.start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    kinds = {}
+    for sample in samples:
+        kinds[sample['kind']] = kinds.get(sample['kind'], 0) + 1
+    rss_values = [rss for _, rss, _ in sampler.samples if rss is not None]
+    return {
+        'sessions': sessions,
+        'requests': len(samples),
+        'requests_by_kind': kinds,
+        'errors': sum(1 for s in samples if 'error' in s),
+        'unsuccessful': sum(1 for s in samples if not s['ok']),
+        'wall_time_s': wall,
+        'throughput_rps': len(samples) / wall if wall else 0.0,
+        'stages_ms': {stage: _percentiles([s[stage] for s in samples if stage in s]) for stage in _stage_names(samples)},
+        'rss_mb': {
+            'start': rss_values[0] if rss_values else None,
+            'end': rss_values[-1] if rss_values else None,
+            'max': max(rss_values) if rss_values else None,
+            'timeline': [{'t': round(t, 2), 'rss_mb': rss, 'requests': done} for t, rss, done in sampler.samples]
+        },
+        'agent_pool': pool.stats()
+    }
+
+
+def run(levels: List[int], turns: int, pool_size: Optional[int], think_time: float, multi_topic_rate: float,
+        confirm_rate: float, rss_interval: float, llm: Dict, seed: int = 42) -> Dict:
+    """Run each concurrency level in turn on one agent pool."""
+    from agents.agent_pool import AgentPool
+    from config import AGENT_POOL_SIZE
+    from core.session_store import SQLiteSessionStore
+
+    client = install_fake_llm(seed=seed, **llm)
+    set_log_level("WARNING")
+    results = {'llm': dict(llm), 'levels': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = AgentPool(size=pool_size or AGENT_POOL_SIZE,
+                         store=SQLiteSessionStore(os.path.join(tmp, "sessions.sqlite3")))
+        pool.warm_up(pool.size)
+        for level in levels:
+            results['levels'].append(run_level(pool, level, turns, think_time, multi_topic_rate,
+                                               confirm_rate, rss_interval, seed + level))
+    results['llm'].update(client.stats())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent tutoring session load test")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[8], help="Concurrent sessions (several values = sweep)")
+    parser.add_argument('--turns', type=int, default=10, help="Requests per session")
+    parser.add_argument('--pool-size', type=int, help="Agents in the pool (default AGENT_POOL_SIZE)")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean seconds between a session's requests")
+    parser.add_argument('--multi-topic-rate', type=float, default=0.3, help="Share of questions spanning several topics")
+    parser.add_argument('--confirm-rate', type=float, default=0.5, help="Chance of answering 'yes' to an offered topic")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Mean fake LLM seconds per completion")
+    parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal', help="Fake LLM latency distribution")
+    parser.add_argument('--spread', type=float, default=0.5, help="Latency spread (see FakeOpenAIClient)")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of LLM completions that fail")
+    parser.add_argument('--rss-interval', type=float, default=0.5, help="Seconds between RSS samples")
+    parser.add_argument('--json', action='store_true', help="Print the raw results as JSON")
+    args = parser.parse_args()
+
+    llm = {'latency': args.llm_latency, 'distribution': args.distribution,
+           'spread': args.spread, 'failure_rate': args.failure_rate}
+    results = run(args.sessions, args.turns, args.pool_size, args.think_time, args.multi_topic_rate,
+                  args.confirm_rate, args.rss_interval, llm)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\nFake LLM: {args.distribution} latency {args.llm_latency * 1000:.0f} ms (spread {args.spread}), "
+          f"failure rate {args.failure_rate:.0%}; {results['llm']['calls']} calls, {results['llm']['failures']} failed")
+    print(f"{'sessions':>8s} {'req/s':>7s} {'errors':>6s} {'failed':>6s} {'stage':>22s} {'mean':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}  RSS MiB")
+    for level in results['levels']:
+        rss = level['rss_mb']
+        rss_text = f"{rss['start']:.0f} -> {rss['end']:.0f} (max {rss['max']:.0f})" if rss['max'] is not None else "n/a"
+        first = True
+        for stage, stats in level['stages_ms'].items():
+            if not stats:
+                continue
+            prefix = (f"{level['sessions']:8d} {level['throughput_rps']:7.1f} {level['errors']:6d} {level['unsuccessful']:6d}" if first
+                      else " " * 30)
+            print(f"{prefix} {stage:>22s} {stats['mean']:8.1f} {stats['p50']:8.1f} {stats['p95']:8.1f} "
+                  f"{stats['p99']:8.1f}  {rss_text if first else ''}")
+            first = False
+        print(f"{'':30s} requests: {level['requests_by_kind']}, pool waits so far: {level['agent_pool']['waits']}")
+    print("(stage times in ms; errors = exceptions, failed = answers without expert content)")
+
+
+if __name__ == "__main__":
+    main()
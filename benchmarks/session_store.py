@@ -0,0 +1,125 @@
+"""
+Session Store Benchmark
+-----------------------
+Measures the per-turn cost of externalized session state.
+
+Simulates tutoring sessions that, on every turn, load their state from the
+SQLite session store, append a compact turn record and save it back (what
+AgentPool.session() does around each request). Reports serialization, save and
+load latency per turn and the stored size per session. Because the state keeps
+at most MAX_HISTORY_ITEMS turns, the cost should flatten once a session is
+longer than that.
+
+Usage:
+    python -m benchmarks.session_store --sessions 20 --turns 60
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from agents.conversation_history import TurnRecord
+from core.session_store import SQLiteSessionStore, SessionState
+
+TOOLS = ('biology_expert', 'physics_expert', 'chemistry_expert')
+TOPICS = ('photosynthesis', 'respiration', 'newtons_laws', 'electricity', 'acids_and_bases', 'periodic_table')
+
+
+def _fake_turn(rng: random.Random, index: int) -> dict:
+    """A turn record with the size of a typical enhanced answer."""
+    topic = rng.choice(TOPICS)
+    result = {
+        'tool_used': rng.choice(TOOLS),
+        'query_topics': [topic],
+        'response': "Answer text " * rng.randint(80, 160),
+        'success': True,
+        'raw_expert_response': [{'concept': topic.replace('_', ' ').title()}],
+        'confidence_metrics': {'aggregate_certainty': rng.random()}
+    }
+    return TurnRecord.from_result(f"Question {index} about {topic}?", result, rng.random()).to_dict()
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def measure(sessions: int, turns: int, seed: int = 42) -> dict:
+    """Run the simulated sessions against a temporary store and collect per-turn timings."""
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSessionStore(os.path.join(tmp, "sessions.sqlite3"))
+        timings = {'serialize': [], 'save': [], 'load': []}
+        by_turn = {}
+
+        for s in range(sessions):
+            session_id = f"bench-{s}"
+            for t in range(turns):
+                start = time.perf_counter()
+                state = store.load(session_id)
+                load_time = time.perf_counter() - start
+
+                state.add_turn(_fake_turn(rng, t))
+                state.last_offered_topic = rng.choice(TOPICS)
+
+                start = time.perf_counter()
+                blob = state.serialize()
+                serialize_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                store.save(state)
+                save_time = time.perf_counter() - start
+
+                timings['load'].append(load_time)
+                timings['serialize'].append(serialize_time)
+                timings['save'].append(save_time)
+                by_turn.setdefault(t + 1, []).append((load_time + save_time, len(blob)))
+
+        # Round trip check
+        state = store.load("bench-0")
+        assert SessionState.deserialize(state.serialize()).to_dict() == state.to_dict()
+        store_stats = store.stats()
+
+    return {
+        'timings': {
+            name: {
+                'mean_ms': statistics.mean(values) * 1000,
+                'p95_ms': _percentile(values, 0.95) * 1000
+            }
+            for name, values in timings.items()
+        },
+        'by_turn': {
+            turn: {
+                'load_save_ms': statistics.mean(v[0] for v in values) * 1000,
+                'state_bytes': statistics.mean(v[1] for v in values)
+            }
+            for turn, values in by_turn.items()
+        },
+        'store': store_stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session store benchmark")
+    parser.add_argument('--sessions', type=int, default=20, help="Number of simulated sessions")
+    parser.add_argument('--turns', type=int, default=60, help="Turns per session")
+    args = parser.parse_args()
+
+    results = measure(args.sessions, args.turns)
+
+    print(f"Sessions: {args.sessions}, turns/session: {args.turns}")
+    for name, stats in results['timings'].items():
+        print(f"  {name:10s} mean {stats['mean_ms']:7.3f} ms   p95 {stats['p95_ms']:7.3f} ms")
+    print("  Turn  load+save (ms)  state size")
+    by_turn = results['by_turn']
+    for turn in sorted(set([1, 5, 10, 20, 40, args.turns]) & set(by_turn)):
+        stats = by_turn[turn]
+        print(f"  {turn:4d}  {stats['load_save_ms']:14.3f}  {stats['state_bytes'] / 1024:7.1f} KiB")
+    print(f"  Stored: {results['store']['sessions']} sessions, {results['store']['total_bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
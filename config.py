@@ -10,8 +10,20 @@ SYSTEM_VERSION = "2.0.0"
 PHASE = "Phase 2+3: Multi-Agent System + LLM Integration"
 
 # Application Settings
-DEBUG_MODE = False
-LOG_LEVEL = "INFO"
+DEBUG_MODE = False  # Forces DEBUG logging with every sampled debug event kept
+LOG_LEVEL = "INFO"  # DEBUG / INFO / WARNING / ERROR (utils/log.py)
+LOG_FORMAT = "text"  # "text" (key=value) or "json" (one JSON object per line)
+LOG_DEBUG_SAMPLE_RATE = 0.05  # Share of requests whose high-volume debug events are logged
+
+# Diagnostics
+ENABLE_RULE_PROFILING = False  # Record per-rule activations/firings/RHS time in expert engines
+ENABLE_MEMORY_DIAGNOSTICS = False  # tracemalloc from startup and a memory report in the sidebar (slows allocation)
+MEMORY_TRACE_FRAMES = 5  # Stack frames stored per traced allocation
+MEMORY_SNAPSHOTS_KEPT = 3  # tracemalloc snapshots kept for growth comparisons
+
+# Study Guide Settings
+STUDY_GUIDE_EVALUATOR = "experta"  # "experta" (Rete engine) or "compiled" (native evaluator, same outputs)
+STUDY_GUIDE_DECISION_CUBE = True  # Answer from the precomputed cube when built (python -m experts.study_guide_cube build)
 
 # Knowledge Base Settings
 MAX_RULES = 100  # Maximum number of rules (for Phase 1)
@@ -21,7 +33,9 @@ DEFAULT_LANGUAGE = "en"  # English only
 # UI Settings
 PAGE_TITLE = "EduMentor - O/L Science Tutor"
 PAGE_ICON = "🎓"
-MAX_HISTORY_ITEMS = 20
+MAX_HISTORY_ITEMS = 20  # Agent turns kept in memory per session (older ones are spilled)
+HISTORY_SPILL_DIR = None  # Directory for spilled turns as JSON lines (None = keep summary counters only)
+CHAT_PAGE_SIZE = 20  # Chat messages rendered per page (earlier ones behind "Load earlier messages")
 SHOW_CONFIDENCE = True
 
 # Response Settings
@@ -73,7 +87,7 @@ MAS_ENABLED = True
 COORDINATOR_ENABLED = True
 MAX_CONCURRENT_AGENTS = 6  # One per subject
 AGENT_TIMEOUT = 5  # seconds
-ENABLE_AGENT_STATISTICS = True
+ENABLE_AGENT_STATISTICS = True  # Record query, LLM error and pool wait metrics (utils/metrics.py)
 
 # Phase 3: LLM Configuration
 LLM_ENABLED = True  # Set to False to use only expert system
@@ -83,6 +97,51 @@ LLM_TEMPERATURE = 0.7
 LLM_MAX_TOKENS = 500
 FALLBACK_TO_EXPERT_SYSTEM = True  # If LLM fails, use expert system
 
+# Session State (core/session_store.py, agents/agent_pool.py)
+SESSION_STORE_PATH = "data/sessions.sqlite3"  # SQLite file shared by all worker processes
+AGENT_POOL_SIZE = 4  # ExpertAgents per process, shared by all sessions
+
+# Headless API (api/asgi.py)
+API_WORKER_THREADS = 8  # Threads running expert/LLM work for API requests
+API_MAX_BODY_BYTES = 64 * 1024  # Larger request bodies are rejected with 413
+
+# Bulk Question Runner (agents/bulk_runner.py)
+BULK_CONCURRENCY = 4  # Questions processed at once (one ExpertAgent each)
+BULK_RATE_LIMIT = 2.0  # Questions started per second (0 = unlimited)
+
+# Conversation Memory (core/memory.py)
+MEMORY_CONTEXT_MAX_CHARS = 4000  # Hard cap on conversation context passed to the LLM (~1000 tokens)
+
+# LLM Response Cache (shared by all sessions in the process)
+LLM_CACHE_MAX_ENTRIES = 256  # Least recently used entries are evicted beyond this
+STUDY_GUIDE_PROMPT_VERSION = 1  # Bump when the study guide prompts change to invalidate cached text
+STUDY_GUIDE_LLM_TIMEOUT = 30  # seconds; shared deadline for the concurrent study guide LLM calls
+
+# LLM HTTP Client (one pooled client per process, see utils/llm_client.py)
+LLM_POOL_MAX_CONNECTIONS = 20  # Upper bound on open connections to the LLM API
+LLM_POOL_MAX_KEEPALIVE = 10  # Idle connections kept open for reuse
+LLM_POOL_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection stays open
+
+# Request Tracing (utils/tracing.py)
+TRACE_HISTOGRAM_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)  # Stage latency histogram bucket bounds
+
+# Spelling Correction (utils/spelling.py)
+SPELLING_CORRECTION = True  # Correct misspelled query words against the KB vocabulary before topic search
+SPELLING_MAX_EDIT_DISTANCE = 2  # Largest edit distance corrected (only towards topic-name words; words under six letters get one edit)
+SPELLING_PREFIX_LENGTH = 7  # Leading characters indexed per word (bounds index size)
+SPELLING_MIN_WORD_LENGTH = 4  # Shorter query words are never corrected
+
+# Metrics Export (utils/metrics.py)
+METRICS_PORT = 0  # Local port serving Prometheus text at /metrics and JSON at /metrics.json (0 = off)
+METRICS_HOST = "127.0.0.1"  # Interface the metrics port binds to
+
+# Token Usage and Budgets (utils/token_usage.py)
+SESSION_TOKEN_BUDGET = 0  # LLM tokens per session before it switches to cached/template answers (0 = unlimited, e.g. 60000)
+PROCESS_TOKEN_BUDGET = 0  # LLM tokens per worker process before every session falls back (0 = unlimited)
+LLM_PROMPT_PRICE_PER_1K = 0.00015  # USD per 1K prompt tokens (gpt-4o-mini), for cost estimates
+LLM_COMPLETION_PRICE_PER_1K = 0.0006  # USD per 1K completion tokens (gpt-4o-mini)
+TOKEN_USAGE_MAX_SESSIONS = 10000  # Sessions tracked in memory per process (least recently used are dropped)
+
 # Analytics (Future)
 TRACK_USAGE = False
 TRACK_STUDENT_PROGRESS = False
@@ -4,11 +4,15 @@ Intent Classifier Agent
 Uses LLM to understand user intent and route to appropriate expert system.
 """
 
-import google.generativeai as genai
-import os
 from typing import Dict, List
 from core.memory import ConversationMemory
 from config import LLM_MODEL
+from utils.llm_client import get_gemini_model
+from utils.log import get_logger
+from utils.metrics import METRICS
+from utils.token_usage import budget_exhausted, record_usage
+
+log = get_logger(__name__)
 
 
 class IntentClassifierAgent:
@@ -58,15 +62,11 @@ class IntentClassifierAgent:
     def _initialize_llm(self):
         """Initialize Gemini LLM."""
         try:
-            api_key = os.getenv('GEMINI_API_KEY')
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY not found in environment variables")
-            
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(LLM_MODEL)
-            print(f"✓ Intent Classifier initialized with {LLM_MODEL}")
+            # Shared model handle; the SDK is configured once per process
+            self.model = get_gemini_model(LLM_MODEL)
+            log.info("intent_classifier_ready", model=LLM_MODEL)
         except Exception as e:
-            print(f"❌ Failed to initialize Intent Classifier: {e}")
+            log.error("intent_classifier_init_failed", error=str(e))
             self.model = None
     
     def classify_intent(self, question: str) -> Dict:
@@ -82,9 +82,10 @@ class IntentClassifierAgent:
                 'reasoning': '...'     # Why this classification
             }
         """
-        print(f"\n{'='*60}")
-        print(f"🎯 INTENT CLASSIFIER: Analyzing question")
-        print(f"   Question: {question}")
+        log.debug("classifying_intent", question=question, sampled=True)
+        
+        if budget_exhausted('intent_classification'):
+            return self._fallback_classification(question)
         
         # Get conversation context
         context = self.memory.get_full_context_for_llm(n=3)
@@ -94,19 +95,23 @@ class IntentClassifierAgent:
         
         try:
             response = self.model.generate_content(prompt)
+            record_usage('intent_classification', response)
             classification = self._parse_classification_response(response.text)
             
-            print(f"   Subject identified: {classification['subject']}")
-            print(f"   Confidence: {classification['confidence']:.2f}")
-            print(f"   Is clarification: {classification['is_clarification']}")
-            if classification['extracted_topic']:
-                print(f"   Topic: {classification['extracted_topic']}")
-            print(f"{'='*60}\n")
+            log.debug(
+                "intent_classified",
+                subject=classification['subject'],
+                confidence=classification['confidence'],
+                is_clarification=classification['is_clarification'],
+                topic=classification['extracted_topic'],
+                sampled=True
+            )
             
             return classification
             
         except Exception as e:
-            print(f"❌ Intent classification failed: {e}")
+            log.warning("intent_classification_failed", error=str(e))
+            METRICS.inc('llm_errors_total', stage='intent_classification', error=type(e).__name__)
             return self._fallback_classification(question)
     
     def _build_classification_prompt(self, question: str, context: str) -> str:
@@ -2,11 +2,20 @@
 Conversation Memory System
 --------------------------
 Tracks conversation history for context-aware clarifications and intent classification.
+
+Turns live in a bounded deque. Each completed turn renders its context text
+once; the summary and LLM context strings are cached until the next turn
+completes and are capped at MEMORY_CONTEXT_MAX_CHARS so prompt size stays flat
+over long conversations.
 """
 
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from typing import List, Dict, Optional
 
+from config import MEMORY_CONTEXT_MAX_CHARS
+
 
 class ConversationTurn:
     """Represents a single turn in the conversation."""
@@ -19,6 +28,8 @@ class ConversationTurn:
         self.needed_clarification = needed_clarification
         self.timestamp = timestamp or datetime.now()
         self.clarifications = []  # List of clarification exchanges
+        self._summary_text = None  # Rendered context text (see summary_text / llm_text)
+        self._llm_text = None
     
     def add_clarification(self, clarification_question: str, user_response: str):
         """Add a clarification exchange to this turn."""
@@ -27,6 +38,34 @@ class ConversationTurn:
             'response': user_response,
             'timestamp': datetime.now()
         })
+        self._llm_text = None
+    
+    def summary_text(self) -> str:
+        """This turn's entry in get_context_summary (rendered once, without its number)."""
+        if self._summary_text is None:
+            lines = [f"User asked about: {self.subject or 'Unknown'}",
+                     f"   Question: {self.question[:100]}..."]
+            if self.needed_clarification:
+                lines.append(f"   (Needed clarification)")
+            self._summary_text = "\n".join(lines)
+        return self._summary_text
+    
+    def llm_text(self) -> str:
+        """This turn's entry in get_full_context_for_llm (rendered once, without its header)."""
+        if self._llm_text is None:
+            lines = [f"User: {self.question}"]
+            if self.subject:
+                lines.append(f"Subject identified: {self.subject}")
+            if self.clarifications:
+                lines.append("Clarifications needed:")
+                for clarif in self.clarifications:
+                    lines.append(f"  System: {clarif['question']}")
+                    lines.append(f"  User: {clarif['response']}")
+            if self.answer:
+                answer_preview = self.answer[:150] + "..." if len(self.answer) > 150 else self.answer
+                lines.append(f"Answer provided: {answer_preview}")
+            self._llm_text = "\n".join(lines)
+        return self._llm_text
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for serialization."""
@@ -49,11 +88,13 @@ class ConversationMemory:
     - Pronoun resolution ("tell me more about it" -> what is "it"?)
     """
     
-    def __init__(self, max_history: int = 10):
+    def __init__(self, max_history: int = 10, max_context_chars: int = MEMORY_CONTEXT_MAX_CHARS):
         self.max_history = max_history
-        self.turns: List[ConversationTurn] = []
+        self.max_context_chars = max_context_chars
+        self.turns = deque(maxlen=max_history)
         self.current_turn: Optional[ConversationTurn] = None
         self.session_start = datetime.now()
+        self._context_cache: Dict[tuple, str] = {}  # (kind, n) -> context string
     
     def start_turn(self, question: str):
         """Start a new conversation turn."""
@@ -66,11 +107,9 @@ class ConversationMemory:
             self.current_turn.subject = subject
             self.current_turn.needed_clarification = needed_clarification
             
+            # The deque drops the oldest turn beyond max_history
             self.turns.append(self.current_turn)
-            
-            # Keep only last N turns
-            if len(self.turns) > self.max_history:
-                self.turns = self.turns[-self.max_history:]
+            self._context_cache.clear()
             
             self.current_turn = None
     
@@ -81,7 +120,7 @@ class ConversationMemory:
     
     def get_recent_context(self, n: int = 3) -> List[ConversationTurn]:
         """Get the last N conversation turns."""
-        return self.turns[-n:] if self.turns else []
+        return list(islice(self.turns, max(0, len(self.turns) - n), None))
     
     def get_last_subject(self) -> Optional[str]:
         """Get the subject from the most recent turn."""
@@ -100,46 +139,58 @@ class ConversationMemory:
         Get a text summary of recent conversation context.
         Useful for passing to LLM for intent classification.
         """
+        cached = self._context_cache.get(('summary', n))
+        if cached is not None:
+            return cached
+        
         recent = self.get_recent_context(n)
         
         if not recent:
             return "No previous conversation history."
         
-        summary_lines = ["Recent conversation context:"]
-        for i, turn in enumerate(recent, 1):
-            summary_lines.append(f"\n{i}. User asked about: {turn.subject or 'Unknown'}")
-            summary_lines.append(f"   Question: {turn.question[:100]}...")
-            if turn.needed_clarification:
-                summary_lines.append(f"   (Needed clarification)")
-        
-        return "\n".join(summary_lines)
+        entries = [turn.summary_text() for turn in recent]
+        context = self._join_capped("Recent conversation context:", entries, lambda i: f"\n{i}. ")
+        self._context_cache[('summary', n)] = context
+        return context
     
     def get_full_context_for_llm(self, n: int = 3) -> str:
         """
         Get detailed context for LLM intent classification.
         Includes questions, subjects, and clarifications.
         """
+        cached = self._context_cache.get(('llm', n))
+        if cached is not None:
+            return cached
+        
         recent = self.get_recent_context(n)
         
         if not recent:
             return "This is the first question in the conversation."
         
-        context_lines = ["Previous conversation:"]
-        for i, turn in enumerate(recent, 1):
-            context_lines.append(f"\n--- Turn {i} ---")
-            context_lines.append(f"User: {turn.question}")
-            if turn.subject:
-                context_lines.append(f"Subject identified: {turn.subject}")
-            if turn.clarifications:
-                context_lines.append("Clarifications needed:")
-                for clarif in turn.clarifications:
-                    context_lines.append(f"  System: {clarif['question']}")
-                    context_lines.append(f"  User: {clarif['response']}")
-            if turn.answer:
-                answer_preview = turn.answer[:150] + "..." if len(turn.answer) > 150 else turn.answer
-                context_lines.append(f"Answer provided: {answer_preview}")
+        entries = [turn.llm_text() for turn in recent]
+        context = self._join_capped("Previous conversation:", entries, lambda i: f"\n--- Turn {i} ---\n")
+        self._context_cache[('llm', n)] = context
+        return context
+    
+    def _join_capped(self, header: str, entries: List[str], prefix) -> str:
+        """
+        Join numbered turn entries under a header within max_context_chars.
         
-        return "\n".join(context_lines)
+        The oldest entries are dropped first; if the newest entry alone is too
+        long, it is truncated.
+        """
+        budget = self.max_context_chars - len(header)
+        kept = []
+        for entry in reversed(entries):
+            cost = len(entry) + len(prefix(len(entries))) + 1
+            if cost > budget:
+                if not kept:
+                    kept.append(entry[:max(0, budget - len(prefix(1)) - 4)] + "...")
+                break
+            kept.append(entry)
+            budget -= cost
+        kept.reverse()
+        return "\n".join([header] + [f"{prefix(i)}{entry}" for i, entry in enumerate(kept, 1)])
     
     def has_recent_subject_context(self, subject: str, lookback: int = 2) -> bool:
         """Check if a subject was recently discussed."""
@@ -148,7 +199,8 @@ class ConversationMemory:
     
     def clear(self):
         """Clear all conversation history."""
-        self.turns = []
+        self.turns.clear()
+        self._context_cache.clear()
         self.current_turn = None
         self.session_start = datetime.now()
     
@@ -13,6 +13,10 @@ from experts.biology_expert import BiologyExpert
 from experts.physics_expert import PhysicsExpert
 from experts.chemistry_expert import ChemistryExpert
 from experts.study_guide_expert import StudyGuideExpert
+from utils.log import get_logger, new_request_id, request_context
+from utils.tracing import span, start_trace
+
+log = get_logger(__name__)
 
 
 class SystemOrchestrator:
@@ -31,10 +35,6 @@ class SystemOrchestrator:
     
     def __init__(self):
         """Initialize all components."""
-        print("\n" + "="*60)
-        print("🚀 Initializing New Expert System Architecture")
-        print("="*60)
-        
         # Core components
         self.memory = ConversationMemory(max_history=10)
         self.intent_classifier = IntentClassifierAgent(self.memory)
@@ -55,7 +55,7 @@ class SystemOrchestrator:
         self.pending_facts = None
         self.pending_expert_instance = None  # For diagnostic experts
         
-        print("✓ System Orchestrator initialized successfully\n")
+        log.info("orchestrator_ready", experts=",".join(self.experts))
     
     def process_query(self, user_input: str) -> dict:
         """
@@ -73,13 +73,25 @@ class SystemOrchestrator:
                 'expert_rule': '...',  # Original expert system output
                 'refined_response': '...',  # LLM-refined version
                 'examples': [...],
-                'conversation_context': '...'
+                'conversation_context': '...',
+                'timings': {...}  # Request trace (stage spans, LLM tokens; see utils/tracing.py)
             }
         """
-        
-        print(f"\n{'='*60}")
-        print(f"📝 USER INPUT: {user_input}")
-        print(f"{'='*60}\n")
+        with request_context(request_id=new_request_id()), start_trace('orchestrator') as trace:
+            result = self._process_query(user_input)
+            result['timings'] = trace.to_dict()
+            log.info(
+                "query_processed",
+                response_type=result.get('response_type'),
+                subject=result.get('subject'),
+                ms=result['timings']['total_ms'],
+                tokens=result['timings']['tokens']['total_tokens']
+            )
+        return result
+    
+    def _process_query(self, user_input: str) -> dict:
+        """Body of process_query (see there)."""
+        log.debug("query_received", query=user_input, sampled=True)
         
         # Start new conversation turn
         self.memory.start_turn(user_input)
@@ -89,11 +101,13 @@ class SystemOrchestrator:
             return self._handle_clarification_response(user_input)
         
         # Step 1: Classify intent
-        classification = self.intent_classifier.classify_intent(user_input)
+        with span('intent_classification'):
+            classification = self.intent_classifier.classify_intent(user_input)
         
         # Check if we need clarification from user
         if self.intent_classifier.should_request_clarification(classification):
-            clarification_q = self.intent_classifier.generate_clarification_question(user_input)
+            with span('clarification_question'):
+                clarification_q = self.intent_classifier.generate_clarification_question(user_input)
             
             self.awaiting_clarification = True
             self.memory.add_clarification_to_current(clarification_q, "(awaiting user response)")
@@ -112,7 +126,8 @@ class SystemOrchestrator:
             return self._handle_unknown_subject(user_input)
         
         # Step 2: Route to expert system
-        expert_result = self._query_expert_system(subject, user_input, classification)
+        with span('expert_execution', subject=subject):
+            expert_result = self._query_expert_system(subject, user_input, classification)
         
         # Step 3: Check if expert needs clarification
         if expert_result.get('needs_clarification'):
@@ -132,7 +147,8 @@ class SystemOrchestrator:
             }
         
         # Step 4: Refine response with LLM
-        refined = self.response_refiner.refine_response(user_input, expert_result)
+        with span('refinement'):
+            refined = self.response_refiner.refine_response(user_input, expert_result)
         
         # Complete conversation turn
         self.memory.complete_turn(
@@ -166,7 +182,7 @@ class SystemOrchestrator:
             Expert system output or clarification request
         """
         
-        print(f"\n🎓 EXPERT SYSTEM: Routing to {subject}Expert")
+        log.debug("routing_to_expert", subject=subject, sampled=True)
         
         # Check if this is a diagnostic expert (StudyGuide)
         if subject == 'StudyGuide':
@@ -181,11 +197,9 @@ class SystemOrchestrator:
         Diagnostic experts (like StudyGuide) ask multiple questions
         before providing a diagnosis.
         """
-        print("   Mode: DIAGNOSTIC (progressive questioning)")
-        
         # Check if we're continuing a previous diagnostic session
         if self.pending_expert_instance and self.pending_expert == subject:
-            print("   Continuing previous diagnostic session...")
+            log.debug("diagnostic_continued", subject=subject, sampled=True)
             expert = self.pending_expert_instance
             
             # Declare fact based on user's response
@@ -194,7 +208,7 @@ class SystemOrchestrator:
             # Run engine again
             expert.run()
         else:
-            print("   Starting new diagnostic session...")
+            log.debug("diagnostic_started", subject=subject, sampled=True)
             # Create new expert instance
             ExpertClass = self.experts[subject]
             expert = ExpertClass()
@@ -207,8 +221,7 @@ class SystemOrchestrator:
         # Check if expert needs more information
         if expert.requires_clarification():
             clarification_q = expert.get_clarification_question()
-            print(f"   ❓ Expert needs clarification")
-            print(f"   Question: {clarification_q[:100]}...")
+            log.debug("expert_needs_clarification", subject=subject, question=clarification_q[:100], sampled=True)
             
             return {
                 'needs_clarification': True,
@@ -218,7 +231,7 @@ class SystemOrchestrator:
         
         # Check if diagnosis is complete
         if expert.is_diagnosis_complete():
-            print("   ✅ Diagnosis complete!")
+            log.debug("diagnosis_complete", subject=subject, sampled=True)
             response = expert.get_response()
             
             # Add response_type for diagnostic results
@@ -240,16 +253,15 @@ class SystemOrchestrator:
         
         Information experts provide direct answers to specific questions.
         """
-        print("   Mode: INFORMATION (direct Q&A)")
-        
         # Create expert instance
         ExpertClass = self.experts[subject]
         expert = ExpertClass()
         expert.reset()
         
         # Extract keywords from question
-        keywords = self._extract_keywords(question)
-        print(f"   Keywords extracted: {keywords}")
+        with span('canonicalize'):
+            keywords = self._extract_keywords(question)
+        log.debug("keywords_extracted", keywords=",".join(keywords), sampled=True)
         
         # Declare facts to the expert system
         expert.declare(Fact(keywords=keywords))
@@ -259,12 +271,11 @@ class SystemOrchestrator:
             expert.declare(Fact(query_topic=classification['extracted_topic']))
         
         # Run the inference engine
-        print("   Running inference engine...")
         expert.run()
         
         # Check results
         if expert.requires_clarification():
-            print("   ⚠️ Expert system requires clarification")
+            log.debug("expert_needs_clarification", subject=subject, sampled=True)
             return {
                 'needs_clarification': True,
                 'clarification_question': expert.get_clarification_question(),
@@ -274,10 +285,10 @@ class SystemOrchestrator:
         response = expert.get_response()
         
         if response:
-            print(f"   ✓ Expert system matched: {response.get('concept', 'N/A')}")
+            log.debug("expert_matched", subject=subject, concept=response.get('concept', 'N/A'), sampled=True)
             return response
         else:
-            print("   ❌ No match found in expert system")
+            log.debug("expert_no_match", subject=subject, sampled=True)
             return {
                 'concept': 'No Match',
                 'explanation': f"I couldn't find information about that in my {subject} knowledge base.",
@@ -301,7 +312,7 @@ class SystemOrchestrator:
     def _handle_clarification_response(self, user_response: str) -> dict:
         """Handle user's response to a clarification request."""
         
-        print("\n🔄 CLARIFICATION RESPONSE received")
+        log.debug("clarification_response", sampled=True)
         
         # Add clarification to memory
         if self.memory.current_turn and self.memory.current_turn.clarifications:
@@ -313,14 +324,16 @@ class SystemOrchestrator:
         # If we have a pending expert system query, continue with it
         if self.pending_expert is not None:
             # Re-classify the clarification response or use the pending info
-            classification = self.intent_classifier.classify_intent(user_response)
+            with span('intent_classification'):
+                classification = self.intent_classifier.classify_intent(user_response)
             
             # Query expert system with clarification
-            expert_result = self._query_expert_system(
-                self.pending_expert,
-                user_response,
-                classification
-            )
+            with span('expert_execution', subject=self.pending_expert):
+                expert_result = self._query_expert_system(
+                    self.pending_expert,
+                    user_response,
+                    classification
+                )
             
             # If still needs clarification, handle it (keep pending state)
             if expert_result.get('needs_clarification'):
@@ -340,7 +353,8 @@ class SystemOrchestrator:
             self.pending_expert_instance = None
             
             # Refine and return
-            refined = self.response_refiner.refine_response(user_response, expert_result)
+            with span('refinement'):
+                refined = self.response_refiner.refine_response(user_response, expert_result)
             
             self.memory.complete_turn(
                 answer=refined['refined_explanation'],
@@ -359,7 +373,7 @@ class SystemOrchestrator:
             }
         
         # Otherwise, process as new query
-        return self.process_query(user_response)
+        return self._process_query(user_response)
     
     def _handle_unknown_subject(self, question: str) -> dict:
         """Handle questions that don't match any subject."""
@@ -393,4 +407,4 @@ Please rephrase your question or specify which subject you're asking about.
         self.awaiting_clarification = False
         self.pending_expert = None
         self.pending_facts = None
-        print("🗑️ Conversation history cleared")
+        log.debug("conversation_cleared")
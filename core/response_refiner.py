@@ -4,9 +4,13 @@ Response Refinement Agent
 Takes expert system output and refines it into natural, friendly language using LLM.
 """
 
-import google.generativeai as genai
-import os
 from config import LLM_MODEL
+from utils.llm_client import get_gemini_model
+from utils.log import get_logger
+from utils.metrics import METRICS
+from utils.token_usage import budget_exhausted, record_usage
+
+log = get_logger(__name__)
 
 
 class ResponseRefinementAgent:
@@ -24,15 +28,11 @@ class ResponseRefinementAgent:
     def _initialize_llm(self):
         """Initialize Gemini LLM."""
         try:
-            api_key = os.getenv('GEMINI_API_KEY')
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY not found in environment variables")
-            
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(LLM_MODEL)
-            print(f"✓ Response Refinement Agent initialized with {LLM_MODEL}")
+            # Shared model handle; the SDK is configured once per process
+            self.model = get_gemini_model(LLM_MODEL)
+            log.info("response_refiner_ready", model=LLM_MODEL)
         except Exception as e:
-            print(f"❌ Failed to initialize Response Refinement Agent: {e}")
+            log.error("response_refiner_init_failed", error=str(e))
             self.model = None
     
     def refine_response(self, user_question: str, expert_output: dict) -> dict:
@@ -53,8 +53,8 @@ class ResponseRefinementAgent:
             }
         """
         
-        if not self.model:
-            # If LLM unavailable, return original
+        if not self.model or budget_exhausted('refinement'):
+            # If LLM unavailable (or the token budget is spent), return original
             return {
                 'original_rule': expert_output.get('explanation', ''),
                 'refined_explanation': expert_output.get('explanation', ''),
@@ -63,16 +63,16 @@ class ResponseRefinementAgent:
                 'examples': expert_output.get('examples', [])
             }
         
-        print("\n🌟 RESPONSE REFINEMENT: Enhancing expert system output")
-        print("🔒 CONSTRAINT: LLM will ONLY rephrase - NO new facts")
+        log.debug("refining_response", concept=expert_output.get('concept'), sampled=True)
         
         prompt = self._build_refinement_prompt(user_question, expert_output)
         
         try:
             response = self.model.generate_content(prompt)
+            record_usage('refinement', response)
             refined = response.text.strip()
             
-            print("✓ Response refined successfully")
+            log.debug("response_refined", chars=len(refined), sampled=True)
             
             return {
                 'original_rule': expert_output.get('explanation', ''),
@@ -83,7 +83,8 @@ class ResponseRefinementAgent:
             }
             
         except Exception as e:
-            print(f"❌ Refinement failed: {e}")
+            log.warning("refinement_failed", error=str(e))
+            METRICS.inc('llm_errors_total', stage='refinement', error=type(e).__name__)
             # Fallback to original
             return {
                 'original_rule': expert_output.get('explanation', ''),
@@ -0,0 +1,219 @@
+"""
+Session Store
+-------------
+Externalized tutoring session state.
+
+Tutoring state used to live only in Streamlit ``session_state`` and on
+``ExpertAgent`` attributes, which pinned a user to one process and was lost on
+restart. A ``SessionState`` holds the compact form of a session (turn records,
+pending clarification, last offered topic, token usage) and a ``SessionStore``
+persists it keyed by session ID, so any worker process can serve any request.
+
+``SQLiteSessionStore`` is the default backend; states are stored as
+zlib-compressed JSON, one row per session.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from config import SESSION_STORE_PATH, MAX_HISTORY_ITEMS
+
+
+class SessionState:
+    """
+    Serializable state of one tutoring session.
+
+    Attributes:
+        session_id: Session key
+        turns: Compact turn records (TurnRecord.to_dict()), at most MAX_HISTORY_ITEMS
+        total_turns: Turns recorded over the whole session (including dropped ones)
+        awaiting_clarification: Whether the next message answers a clarification question
+        clarification_tool: Tool that asked for clarification
+        last_offered_topic: Topic the last answer offered to explain next
+        last_tool_used: Tool that produced the last offered topic
+        token_usage: LLM token counters by stage (utils/token_usage.py), for the session budget
+    """
+
+    def __init__(self, session_id: str, turns: List[Dict] = None, total_turns: int = 0,
+                 awaiting_clarification: bool = False, clarification_tool: Optional[str] = None,
+                 last_offered_topic: Optional[str] = None, last_tool_used: Optional[str] = None,
+                 token_usage: Dict = None, updated_at: float = None):
+        self.session_id = session_id
+        self.turns = turns or []
+        self.total_turns = total_turns
+        self.awaiting_clarification = awaiting_clarification
+        self.clarification_tool = clarification_tool
+        self.last_offered_topic = last_offered_topic
+        self.last_tool_used = last_tool_used
+        self.token_usage = token_usage or {}
+        self.updated_at = updated_at or time.time()
+
+    def add_turn(self, turn: Dict, max_items: int = MAX_HISTORY_ITEMS):
+        """Append a turn record, keeping only the last ``max_items``."""
+        self.turns.append(turn)
+        self.total_turns += 1
+        if len(self.turns) > max_items:
+            del self.turns[:-max_items]
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for serialization."""
+        return {
+            'session_id': self.session_id,
+            'turns': self.turns,
+            'total_turns': self.total_turns,
+            'awaiting_clarification': self.awaiting_clarification,
+            'clarification_tool': self.clarification_tool,
+            'last_offered_topic': self.last_offered_topic,
+            'last_tool_used': self.last_tool_used,
+            'token_usage': self.token_usage,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SessionState':
+        """Rebuild a state from ``to_dict()`` output."""
+        return cls(**data)
+
+    def serialize(self) -> bytes:
+        """Compact binary form: zlib-compressed JSON."""
+        payload = json.dumps(self.to_dict(), separators=(',', ':'), ensure_ascii=False)
+        return zlib.compress(payload.encode('utf-8'))
+
+    @classmethod
+    def deserialize(cls, blob: bytes) -> 'SessionState':
+        """Inverse of ``serialize()``."""
+        return cls.from_dict(json.loads(zlib.decompress(blob).decode('utf-8')))
+
+
+class SessionStore:
+    """Interface of session state backends."""
+
+    def load(self, session_id: str) -> SessionState:
+        """Get a session's state (a fresh state if the session is unknown)."""
+        raise NotImplementedError
+
+    def save(self, state: SessionState):
+        """Persist a session's state."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """Forget a session."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Backend statistics for reporting."""
+        raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a local SQLite database (one row per session).
+
+    Connections are per thread; WAL mode lets several processes share the file.
+    An in-memory store uses one connection shared by all threads.
+
+    Args:
+        path: Database file (":memory:" for a throwaway store)
+    """
+
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.saves = 0
+        self.load_time = 0.0
+        self.save_time = 0.0
+        self._shared_conn = sqlite3.connect(path, check_same_thread=False) if path == ":memory:" else None
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (created on first use)."""
+        if self._shared_conn is not None:
+            return self._shared_conn
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> SessionState:
+        start = time.perf_counter()
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        state = SessionState.deserialize(row[0]) if row else SessionState(session_id)
+        with self._lock:
+            self.loads += 1
+            self.load_time += time.perf_counter() - start
+        return state
+
+    def save(self, state: SessionState):
+        start = time.perf_counter()
+        state.updated_at = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+            (state.session_id, state.serialize(), state.updated_at)
+        )
+        conn.commit()
+        with self._lock:
+            self.saves += 1
+            self.save_time += time.perf_counter() - start
+
+    def delete(self, session_id: str):
+        conn = self._connection()
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    def purge_older_than(self, seconds: float) -> int:
+        """Delete sessions idle for longer than ``seconds``; returns the number removed."""
+        conn = self._connection()
+        cursor = conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - seconds,))
+        conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        sessions, total_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM sessions"
+        ).fetchone()
+        with self._lock:
+            return {
+                'backend': 'sqlite',
+                'path': self.path,
+                'sessions': sessions,
+                'total_bytes': total_bytes,
+                'loads': self.loads,
+                'saves': self.saves,
+                'avg_load_ms': (self.load_time * 1000 / self.loads) if self.loads else 0.0,
+                'avg_save_ms': (self.save_time * 1000 / self.saves) if self.saves else 0.0
+            }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """The process-wide session store (created on first use at SESSION_STORE_PATH)."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = SQLiteSessionStore()
+    return _default_store
@@ -8,8 +8,11 @@ Comprehensive knowledge base integrated from textbook.
 
 from experta import *
 
+from experts.kb_records import KBRecord, ScoredResponse
+from utils.rule_profiler import ProfiledKnowledgeEngine
 
-class BiologyExpert(KnowledgeEngine):
+
+class BiologyExpert(ProfiledKnowledgeEngine):
     """
     Expert system for Biology questions using traditional @Rule format.
     
@@ -31,6 +34,14 @@ class BiologyExpert(KnowledgeEngine):
         self.clarification_question = None
         self.certainty_factors = {}  # Store CF for each response
 
+    def reset(self, **kwargs):
+        """Reset the engine and clear the responses collected by the previous run."""
+        super().reset(**kwargs)
+        self.response = None
+        self.all_responses = []
+        self.needs_clarification = False
+        self.clarification_question = None
+
     def get_response(self):
         """Return the expert's response. Returns all responses if multiple matches."""
         if len(self.all_responses) > 1:
@@ -51,17 +62,19 @@ class BiologyExpert(KnowledgeEngine):
                              0.0 = unknown
                              -1.0 = definitely false
         """
+        # Shared, immutable record for this topic (created once per process)
+        record = KBRecord.shared(response_dict)
+        
         # Calculate CF based on rule specificity if not provided
         if certainty_factor is None:
-            certainty_factor = self._calculate_default_cf(response_dict)
+            certainty_factor = self._calculate_default_cf(record)
         
-        # Add CF to response
-        response_dict['certainty_factor'] = certainty_factor
-        response_dict['confidence_level'] = self._classify_confidence(certainty_factor)
+        # Attach CF in a per-request wrapper instead of mutating the shared record
+        response = ScoredResponse(record, certainty_factor, self._classify_confidence(certainty_factor))
         
-        self.all_responses.append(response_dict)
+        self.all_responses.append(response)
         # Keep the last response as the primary one
-        self.response = response_dict
+        self.response = response
     
     def _calculate_default_cf(self, response_dict) -> float:
         """
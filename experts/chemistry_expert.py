@@ -7,8 +7,11 @@ Comprehensive knowledge base integrated from textbook.
 
 from experta import *
 
+from experts.kb_records import KBRecord
+from utils.rule_profiler import ProfiledKnowledgeEngine
 
-class ChemistryExpert(KnowledgeEngine):
+
+class ChemistryExpert(ProfiledKnowledgeEngine):
     """
     Expert system for Chemistry questions using traditional @Rule format.
     
@@ -28,6 +31,14 @@ class ChemistryExpert(KnowledgeEngine):
         self.needs_clarification = False
         self.clarification_question = None
 
+    def reset(self, **kwargs):
+        """Reset the engine and clear the responses collected by the previous run."""
+        super().reset(**kwargs)
+        self.response = None
+        self.all_responses = []
+        self.needs_clarification = False
+        self.clarification_question = None
+
     def get_response(self):
         """Return the expert's response. Returns all responses if multiple matches."""
         if len(self.all_responses) > 1:
@@ -36,9 +47,11 @@ class ChemistryExpert(KnowledgeEngine):
     
     def add_response(self, response_dict):
         """Add a response to the collection of all matching rules."""
-        self.all_responses.append(response_dict)
+        # Shared, immutable record for this topic (created once per process)
+        record = KBRecord.shared(response_dict)
+        self.all_responses.append(record)
         # Keep the last response as the primary one
-        self.response = response_dict
+        self.response = record
     
     def requires_clarification(self):
         """Check if expert needs more information."""
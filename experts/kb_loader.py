@@ -0,0 +1,203 @@
+"""
+Knowledge Base Loader
+---------------------
+Process-wide cache of parsed knowledge base JSON files.
+
+Every StudyGuideExpert used to open and parse ``study_guide_kb.json`` in its
+constructor, once per Streamlit session and once per diagnostic session.
+``load_knowledge_base`` parses a file once per process into read-only
+structures (``MappingProxyType`` for objects, tuples for arrays) that all
+instances share, and pre-indexes each category's rules and keywords.
+
+The file is only re-read when its modification time changes, and only
+re-parsed when its content hash changes too. Load time and memory size of
+each cached knowledge base are available from ``get_kb_stats()``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Tuple
+
+from utils.metrics import METRICS
+
+# Words of a query as matched against KB keywords (keeps "can't")
+KEYWORD_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _freeze(obj, seen_sizes: Dict[int, int]):
+    """Recursively convert parsed JSON into read-only structures, recording object sizes."""
+    if isinstance(obj, dict):
+        frozen = {key: _freeze(value, seen_sizes) for key, value in obj.items()}
+        for key in frozen:
+            seen_sizes.setdefault(id(key), sys.getsizeof(key))
+        seen_sizes[id(frozen)] = sys.getsizeof(frozen)
+        return MappingProxyType(frozen)
+    if isinstance(obj, list):
+        frozen = tuple(_freeze(value, seen_sizes) for value in obj)
+        seen_sizes[id(frozen)] = sys.getsizeof(frozen)
+        return frozen
+    seen_sizes.setdefault(id(obj), sys.getsizeof(obj))
+    return obj
+
+
+class LoadedKnowledgeBase:
+    """
+    One parsed, read-only knowledge base plus its indexes.
+
+    Attributes:
+        data: Category name -> read-only category entry
+        rules_by_category: Category name -> tuple of rule entries
+        keyword_index: Lower-cased keyword -> tuple of categories listing it
+        max_keyword_words: Words in the longest keyword phrase
+        load_time: Seconds spent parsing, freezing and indexing the file
+        size_bytes: Approximate memory held by the frozen structures
+    """
+
+    def __init__(self, path: str, raw: bytes, mtime_ns: int):
+        start = time.perf_counter()
+        sizes: Dict[int, int] = {}
+
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.sha256 = hashlib.sha256(raw).hexdigest()
+        self.data = _freeze(json.loads(raw.decode("utf-8")), sizes)
+
+        rules_by_category = {}
+        keyword_index: Dict[str, list] = {}
+        for category, entry in self.data.items():
+            if not isinstance(entry, MappingProxyType):
+                continue
+            rules = entry.get("rules")
+            if rules is not None:
+                rules_by_category[category] = rules
+            for keyword in entry.get("keywords", ()):
+                keyword_index.setdefault(keyword.lower(), []).append(category)
+        self.rules_by_category = MappingProxyType(rules_by_category)
+        self.keyword_index = MappingProxyType({k: tuple(v) for k, v in keyword_index.items()})
+        self.max_keyword_words = max((len(k.split()) for k in keyword_index), default=0)
+
+        self.size_bytes = sum(sizes.values())
+        self.loaded_at = time.time()
+        self.load_time = time.perf_counter() - start
+
+    def rules_for(self, category: str) -> Tuple:
+        """Rules of a category (empty tuple if unknown)."""
+        return self.rules_by_category.get(category, ())
+
+    def categories_for_keyword(self, keyword: str) -> Tuple[str, ...]:
+        """Categories whose keyword list contains the given keyword."""
+        return self.keyword_index.get(keyword.lower(), ())
+
+    def match_categories(self, text: str) -> Tuple[str, ...]:
+        """
+        Categories whose keywords occur in a text, most keyword hits first.
+
+        Every word n-gram up to the longest keyword phrase is one index
+        lookup, so the cost does not grow with the number of keywords.
+        """
+        words = KEYWORD_TOKEN_PATTERN.findall(text.lower())
+        hits: Dict[str, int] = {}
+        for size in range(1, self.max_keyword_words + 1):
+            for start in range(len(words) - size + 1):
+                for category in self.keyword_index.get(" ".join(words[start:start + size]), ()):
+                    hits[category] = hits.get(category, 0) + 1
+        # Stable sort keeps KB order between equally matched categories
+        order = {category: i for i, category in enumerate(self.data)}
+        return tuple(sorted(hits, key=lambda category: (-hits[category], order[category])))
+
+    def stats(self) -> Dict:
+        """Load statistics for reporting."""
+        return {
+            'path': self.path,
+            'categories': len(self.rules_by_category),
+            'rules': sum(len(rules) for rules in self.rules_by_category.values()),
+            'keywords': len(self.keyword_index),
+            'load_time_ms': self.load_time * 1000,
+            'size_bytes': self.size_bytes,
+            'sha256': self.sha256,
+            'loaded_at': self.loaded_at
+        }
+
+
+class KnowledgeBaseLoader:
+    """
+    Thread-safe, process-wide cache of LoadedKnowledgeBase objects keyed by path.
+
+    ``get()`` costs one ``os.stat`` when the file is unchanged. A changed
+    mtime triggers a re-read; the file is re-parsed only if its SHA-256 differs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Dict[str, LoadedKnowledgeBase] = {}
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, path: str) -> LoadedKnowledgeBase:
+        """
+        Get the knowledge base at ``path``, parsing it only if needed.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not valid JSON
+        """
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        cached = self._cache.get(path)
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                self.hits += 1
+                return cached
+
+            with open(path, "rb") as f:
+                raw = f.read()
+            if cached is not None and cached.sha256 == hashlib.sha256(raw).hexdigest():
+                # Touched but not changed
+                cached.mtime_ns = mtime_ns
+                self.hits += 1
+                return cached
+
+            loaded = LoadedKnowledgeBase(path, raw, mtime_ns)
+            self._cache[path] = loaded
+            self.loads += 1
+            return loaded
+
+    def stats(self) -> Dict:
+        """Statistics for every cached knowledge base."""
+        return {
+            'loads': self.loads,
+            'hits': self.hits,
+            'knowledge_bases': [kb.stats() for kb in list(self._cache.values())]
+        }
+
+    def clear(self):
+        """Drop all cached knowledge bases."""
+        with self._lock:
+            self._cache = {}
+
+
+# Process-wide loader shared by all expert instances
+KB_LOADER = KnowledgeBaseLoader()
+METRICS.register_collector('kb_loader', KB_LOADER.stats, counters=('loads', 'hits'))
+
+
+def load_knowledge_base(path: str) -> LoadedKnowledgeBase:
+    """Get the shared, read-only knowledge base for a JSON file (see KnowledgeBaseLoader.get)."""
+    return KB_LOADER.get(path)
+
+
+def get_kb_stats() -> Dict:
+    """Load time, memory size and cache counters of the process-wide loader."""
+    return KB_LOADER.stats()
@@ -0,0 +1,184 @@
+"""
+Knowledge Base Records
+----------------------
+Compact, immutable response records shared by every expert engine instance.
+
+Rules build their response as a dict literal on every firing. ``KBRecord.shared``
+turns that payload into a ``__slots__`` record (interned topic/subtopic strings,
+examples as a tuple) that is created once per topic and then reused by all
+sessions. Per-request data such as certainty factors lives in a thin
+``ScoredResponse`` wrapper instead of being written into the shared record.
+
+Both classes are read-only Mappings, so existing ``response.get('concept')`` /
+``response['examples']`` call sites keep working.
+
+``rule_records`` reads the payloads of an engine's ``rule_*`` methods from its
+source (the dict literals passed to ``add_response``) into shared records,
+for code that needs the KB content without running rules outside inference.
+"""
+
+import ast
+import inspect
+import sys
+import warnings
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Tuple
+
+
+class KBRecord(Mapping):
+    """Immutable knowledge base entry: concept, explanation, topic, subtopic, examples."""
+
+    __slots__ = ('concept', 'explanation', 'topic', 'subtopic', 'examples', '_hash')
+
+    FIELDS = ('concept', 'explanation', 'topic', 'subtopic', 'examples')
+
+    # Process-wide registry: one record per distinct payload
+    _registry: Dict['KBRecord', 'KBRecord'] = {}
+
+    def __init__(self, concept: str, explanation: str, topic: str, subtopic: str, examples=()):
+        set_field = object.__setattr__
+        set_field(self, 'concept', concept)
+        set_field(self, 'explanation', explanation)
+        set_field(self, 'topic', sys.intern(topic) if topic else topic)
+        set_field(self, 'subtopic', sys.intern(subtopic) if subtopic else subtopic)
+        set_field(self, 'examples', tuple(examples or ()))
+        set_field(self, '_hash', hash((concept, explanation, self.topic, self.subtopic, self.examples)))
+
+    @classmethod
+    def shared(cls, response_dict) -> 'KBRecord':
+        """
+        Get the shared record for a rule's response payload.
+
+        The first call for a payload creates the record; later calls (from any
+        engine instance or session) return that same object.
+        """
+        if isinstance(response_dict, KBRecord):
+            return response_dict
+        candidate = cls(
+            response_dict.get('concept', ''),
+            response_dict.get('explanation', ''),
+            response_dict.get('topic', ''),
+            response_dict.get('subtopic', ''),
+            response_dict.get('examples', ())
+        )
+        return cls._registry.setdefault(candidate, candidate)
+
+    @classmethod
+    def registry_size(cls) -> int:
+        """Number of distinct records created in this process."""
+        return len(cls._registry)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KBRecord is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("KBRecord is immutable")
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, KBRecord):
+            return (self._hash == other._hash
+                    and self.concept == other.concept
+                    and self.explanation == other.explanation
+                    and self.topic == other.topic
+                    and self.subtopic == other.subtopic
+                    and self.examples == other.examples)
+        return Mapping.__eq__(self, other)
+
+    def __reduce__(self):
+        return (self.__class__, (self.concept, self.explanation, self.topic, self.subtopic, self.examples))
+
+    def __repr__(self):
+        return f"KBRecord(concept={self.concept!r}, topic={self.topic!r}, subtopic={self.subtopic!r})"
+
+
+class ScoredResponse(Mapping):
+    """
+    Per-request view of a shared KBRecord with its certainty factor.
+
+    Reads fall through to the record; ``certainty_factor`` and
+    ``confidence_level`` belong to this wrapper only.
+    """
+
+    __slots__ = ('record', 'certainty_factor', 'confidence_level')
+
+    FIELDS = KBRecord.FIELDS + ('certainty_factor', 'confidence_level')
+
+    def __init__(self, record: KBRecord, certainty_factor: float, confidence_level: str):
+        set_field = object.__setattr__
+        set_field(self, 'record', record)
+        set_field(self, 'certainty_factor', certainty_factor)
+        set_field(self, 'confidence_level', confidence_level)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScoredResponse is immutable")
+
+    def __getitem__(self, key):
+        if key == 'certainty_factor':
+            return self.certainty_factor
+        if key == 'confidence_level':
+            return self.confidence_level
+        return self.record[key]
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __reduce__(self):
+        return (self.__class__, (self.record, self.certainty_factor, self.confidence_level))
+
+    def __repr__(self):
+        return (f"ScoredResponse(concept={self.record.concept!r}, "
+                f"certainty_factor={self.certainty_factor!r}, confidence_level={self.confidence_level!r})")
+
+
+@lru_cache(maxsize=None)
+def rule_records(engine_class) -> Dict[str, Tuple[KBRecord, ...]]:
+    """
+    Records added by each ``rule_*`` method of an engine class, read from its source.
+
+    Only dict literals passed to ``self.add_response`` are read; the rule
+    bodies are not run. Records are the shared ones ``add_response`` gets.
+
+    Returns:
+        Rule method name -> its records (empty for rules without a literal payload)
+    """
+    records = {}
+    for klass in reversed(engine_class.__mro__):
+        if not any(name.startswith('rule_') for name in vars(klass)):
+            continue
+        with warnings.catch_warnings():
+            # The module was already compiled on import; don't repeat its escape-sequence warnings
+            warnings.simplefilter('ignore')
+            tree = ast.parse(inspect.getsource(sys.modules[klass.__module__]))
+        class_node = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == klass.__name__)
+        for node in class_node.body:
+            if not isinstance(node, ast.FunctionDef) or not node.name.startswith('rule_'):
+                continue
+            payloads = []
+            for call in ast.walk(node):
+                if (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute)
+                        and call.func.attr == 'add_response' and call.args):
+                    try:
+                        payloads.append(ast.literal_eval(call.args[0]))
+                    except ValueError:
+                        continue
+            records[node.name] = tuple(KBRecord.shared(payload) for payload in payloads
+                                       if isinstance(payload, dict))
+    return records
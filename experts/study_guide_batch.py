@@ -0,0 +1,473 @@
+"""
+Study Guide Cohort Analysis
+---------------------------
+Vectorized study-guide diagnosis for a whole class roster.
+
+``StudyGuideExpert.process_query_with_inputs`` handles one student per call.
+``CohortAnalyzer`` takes column arrays (category, study hours, stress, sleep,
+learning style, exam flag) and evaluates the StudyGuideExpert inference rules
+with NumPy across all students at once:
+
+* each rule pattern is evaluated once per *distinct* column value and mapped
+  back to the students with ``np.unique(..., return_inverse=True)``;
+* derived conditions (``Fact(condition=...)``) are boolean columns, and rules
+  that depend on them are re-evaluated until no new condition appears;
+* the effects of a rule body (conditions declared, inferred facts, confidence
+  penalties) are recorded once per distinct binding and scattered to students.
+
+The result holds per-student condition flags, confidence and KB
+recommendation IDs, plus cohort aggregates. Counsellors can run it offline::
+
+    python -m experts.study_guide_batch roster.csv -o results.csv --summary summary.json
+"""
+
+import csv
+import json
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+from experta import Fact
+
+from experts.study_guide_compiled import CONDITION_FIELD, get_compiled_rules
+from experts.study_guide_expert import MISSING_INPUT_PENALTIES, StudyGuideExpert
+
+# Rule that turns the inferred state into the final recommendations
+RECOMMENDATION_RULE = "reason_with_category"
+
+# Optional inputs in the order StudyGuideExpert declares them
+INPUT_FIELDS = ("study_hours", "stress_level", "learning_style", "has_upcoming_exam", "sleep_hours")
+NUMERIC_FIELDS = ("study_hours", "stress_level", "sleep_hours")
+
+# Inferred facts that move the confidence (see StudyGuideExpert._calculate_confidence_adjustment)
+PATTERN_BONUS_FACT = "optimal_learning_state"
+RISK_PENALTY_FACT = "burnout_risk"
+
+ROSTER_COLUMNS = ("category",) + INPUT_FIELDS
+
+
+def _numeric_column(values, n: int) -> np.ndarray:
+    """Float column with NaN for missing values (None or empty string)."""
+    if values is None:
+        return np.full(n, np.nan)
+    arr = np.asarray(values)
+    if arr.dtype.kind in "fiub":
+        return arr.astype(float)
+    arr = arr.astype(object)
+    missing = np.equal(arr, None) | np.equal(arr, "")
+    out = np.full(n, np.nan)
+    out[~missing] = arr[~missing].astype(float)
+    return out
+
+
+def _text_column(values, n: int) -> np.ndarray:
+    """Lower-cased string column with '' for missing values."""
+    if values is None:
+        return np.full(n, "", dtype=object)
+    arr = np.asarray(values, dtype=object)
+    arr = np.where(np.equal(arr, None), "", arr)
+    return np.char.lower(arr.astype(str)).astype(object)
+
+
+def _exam_column(values, n: int) -> np.ndarray:
+    """Exam flag as 1.0 / 0.0 with NaN for missing, accepting yes/no/true/false strings."""
+    if values is None:
+        return np.full(n, np.nan)
+    arr = np.asarray(values)
+    if arr.dtype.kind in "fiub":
+        return arr.astype(float)
+    text = _text_column(arr, n)
+    out = np.full(n, np.nan)
+    out[np.isin(text, ("true", "yes", "y", "1"))] = 1.0
+    out[np.isin(text, ("false", "no", "n", "0"))] = 0.0
+    return out
+
+
+def normalize_category(values) -> np.ndarray:
+    """Vectorized form of StudyGuideExpert's category normalization."""
+    text = np.char.lower(np.asarray(values, dtype=str))
+    return np.char.replace(np.char.replace(text, " ", "_"), "preparation", "prep").astype(object)
+
+
+class _EffectProbe:
+    """Records what an inference rule body does, without an engine."""
+
+    def __init__(self, rule_name: str):
+        self.rule_name = rule_name
+        self.conditions = []
+        self.inferred_facts = []
+        self.reasoning_trace = []
+        self.uncertainty_factors = []
+
+    def declare(self, *facts):
+        for fact in facts:
+            if set(fact.keys()) != {CONDITION_FIELD}:
+                raise ValueError(f"Rule {self.rule_name} declares an unsupported fact: {fact!r}")
+            self.conditions.append(fact[CONDITION_FIELD])
+
+    def __getattr__(self, name):
+        raise AttributeError(f"Rule {self.rule_name} uses '{name}', which cohort analysis does not support")
+
+
+class CohortResult:
+    """Per-student outputs of a cohort analysis plus cohort aggregates."""
+
+    def __init__(self, categories: np.ndarray, condition_names: List[str], condition_flags: np.ndarray,
+                 confidence: np.ndarray, recommendation_ids: List[tuple], missing: Dict[str, np.ndarray]):
+        self.categories = categories
+        self.condition_names = condition_names
+        self.condition_flags = condition_flags
+        self.confidence = confidence
+        self.recommendation_ids = recommendation_ids
+        self.missing = missing
+
+    def __len__(self):
+        return len(self.categories)
+
+    def conditions_for(self, index: int) -> List[str]:
+        """Derived conditions of one student."""
+        return [name for name, flag in zip(self.condition_names, self.condition_flags[index]) if flag]
+
+    def summary(self) -> Dict:
+        """
+        Cohort aggregates.
+
+        Returns:
+            {
+                'students': int,
+                'conditions': {name: {'count': int, 'rate': float}},
+                'confidence': {'mean', 'median', 'p10', 'p90', 'min', 'max'},
+                'categories': {category: {'students': int, 'mean_confidence': float}},
+                'missing_inputs': {field: rate}
+            }
+        """
+        n = len(self)
+        counts = self.condition_flags.sum(axis=0) if n else np.zeros(len(self.condition_names))
+        order = np.argsort(-counts, kind="stable")
+
+        scored = self.confidence[~np.isnan(self.confidence)]
+        if scored.size:
+            p10, median, p90 = np.percentile(scored, [10, 50, 90])
+            confidence = {
+                'mean': float(scored.mean()),
+                'median': float(median),
+                'p10': float(p10),
+                'p90': float(p90),
+                'min': float(scored.min()),
+                'max': float(scored.max())
+            }
+        else:
+            confidence = {}
+
+        categories = {}
+        unique, inverse = np.unique(self.categories.astype(str), return_inverse=True)
+        for code, category in enumerate(unique):
+            members = self.confidence[inverse == code]
+            members = members[~np.isnan(members)]
+            categories[str(category)] = {
+                'students': int((inverse == code).sum()),
+                'mean_confidence': float(members.mean()) if members.size else None
+            }
+
+        return {
+            'students': n,
+            'conditions': {
+                self.condition_names[i]: {'count': int(counts[i]), 'rate': float(counts[i] / n) if n else 0.0}
+                for i in order if counts[i]
+            },
+            'confidence': confidence,
+            'categories': categories,
+            'missing_inputs': {field: float(mask.mean()) if n else 0.0 for field, mask in self.missing.items()}
+        }
+
+    def rows(self, extra_columns: Optional[Dict[str, list]] = None):
+        """Yield one output dict per student (used for CSV export)."""
+        extra_columns = extra_columns or {}
+        for i in range(len(self)):
+            row = {name: values[i] for name, values in extra_columns.items()}
+            row['category'] = self.categories[i]
+            row['confidence'] = "" if np.isnan(self.confidence[i]) else round(float(self.confidence[i]), 4)
+            row['conditions'] = ";".join(self.conditions_for(i))
+            row['recommendation_ids'] = ";".join(self.recommendation_ids[i])
+            for name, flag in zip(self.condition_names, self.condition_flags[i]):
+                row[f"cond_{name}"] = int(flag)
+            yield row
+
+
+class CohortAnalyzer:
+    """
+    Vectorized StudyGuideExpert inference over column arrays.
+
+    Args:
+        kb_path: Study guide knowledge base (default: experts/study_guide_kb.json)
+        engine_class: Engine whose rules are evaluated (default: StudyGuideExpert)
+    """
+
+    def __init__(self, kb_path: Optional[str] = None, engine_class=StudyGuideExpert):
+        self.expert = engine_class(kb_path, evaluator="compiled", use_cube=False)
+        self.ruleset = get_compiled_rules(engine_class)
+        self.rules = [rule for rule in self.ruleset.rules if rule.name != RECOMMENDATION_RULE]
+        # Rules with confidence penalties fire in salience order; keep that order when summing
+        self.rules.sort(key=lambda rule: -rule.salience)
+        self._effects: Dict[tuple, tuple] = {}
+
+    def _rule_effects(self, rule, bindings: Dict) -> tuple:
+        """Run a rule body once on a probe: (conditions, inferred facts, confidence penalty)."""
+        key = (rule.name, tuple(sorted(bindings.items())))
+        effects = self._effects.get(key)
+        if effects is None:
+            probe = _EffectProbe(rule.name)
+            kwargs = {k: v for k, v in bindings.items() if k in rule.args} if rule.args else bindings
+            rule.rhs(probe, **kwargs)
+            penalty = 0.0
+            for _, value in probe.uncertainty_factors:
+                penalty += value
+            effects = self._effects[key] = (tuple(probe.conditions), tuple(probe.inferred_facts), penalty)
+        return effects
+
+    def analyze(self, category, study_hours=None, stress_level=None, sleep_hours=None,
+                learning_style=None, has_upcoming_exam=None) -> CohortResult:
+        """
+        Diagnose every student in the given columns.
+
+        Args:
+            category: Topic category per student (UI names such as "Exam Preparation" or KB keys)
+            study_hours: Study hours per day (None/NaN/'' = not provided)
+            stress_level: Stress level 1-10
+            sleep_hours: Sleep hours per night
+            learning_style: Visual / Auditory / Kinesthetic / Reading Writing
+            has_upcoming_exam: Exam flag (bool, 0/1 or yes/no)
+
+        Returns:
+            CohortResult
+        """
+        categories = normalize_category(category)
+        n = len(categories)
+
+        columns = {
+            "category": categories,
+            "study_hours": _numeric_column(study_hours, n),
+            "stress_level": _numeric_column(stress_level, n),
+            "learning_style": _text_column(learning_style, n),
+            "has_upcoming_exam": _exam_column(has_upcoming_exam, n),
+            "sleep_hours": _numeric_column(sleep_hours, n),
+        }
+        present = {
+            name: (values != "") if values.dtype == object else ~np.isnan(values)
+            for name, values in columns.items()
+        }
+
+        # Distinct values per column, evaluated once per pattern
+        distinct = {}
+        for name, values in columns.items():
+            unique, inverse = np.unique(values[present[name]].astype(str if values.dtype == object else float),
+                                        return_inverse=True)
+            codes = np.full(n, -1)
+            codes[present[name]] = inverse
+            distinct[name] = (unique.tolist(), codes)
+
+        def pattern_mask(pattern):
+            if pattern.field not in distinct:
+                return np.zeros(n, dtype=bool)
+            unique, codes = distinct[pattern.field]
+            lookup = np.array([pattern.matches(value) for value in unique] + [False], dtype=bool)
+            return lookup[codes]
+
+        input_masks = {}
+        for rule in self.rules:
+            mask = np.ones(n, dtype=bool)
+            for pattern in rule.field_patterns:
+                mask &= pattern_mask(pattern)
+            input_masks[rule.name] = mask
+
+        # Forward chaining over boolean columns until no rule fires for new students
+        condition_flags: Dict[str, np.ndarray] = {}
+        inferred: Dict[str, np.ndarray] = {}
+        rule_penalty = np.zeros(n)
+        fired = {rule.name: np.zeros(n, dtype=bool) for rule in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for rule in self.rules:
+                mask = input_masks[rule.name].copy()
+                for condition in self.ruleset.condition_names(rule.condition_mask):
+                    mask &= condition_flags.get(condition, np.zeros(n, dtype=bool))
+                new = mask & ~fired[rule.name]
+                if not new.any():
+                    continue
+                fired[rule.name] |= new
+                changed = True
+
+                bound = [pattern for pattern in rule.field_patterns if pattern.binding or pattern.fact_binding]
+                if bound:
+                    stacked = np.stack([distinct[pattern.field][1][new] for pattern in bound], axis=1)
+                    combos, combo_index = np.unique(stacked, axis=0, return_inverse=True)
+                    combo_index = combo_index.reshape(-1)
+                else:
+                    combos, combo_index = np.zeros((1, 0), dtype=int), np.zeros(int(new.sum()), dtype=int)
+
+                rows = np.flatnonzero(new)
+                for combo_id, combo in enumerate(combos):
+                    bindings = {}
+                    for pattern, code in zip(bound, combo):
+                        value = distinct[pattern.field][0][code]
+                        if pattern.binding:
+                            bindings[pattern.binding] = value
+                        if pattern.fact_binding:
+                            bindings[pattern.fact_binding] = Fact(**{pattern.field: value})
+                    for bit, fact_binding in rule.condition_bindings:
+                        if fact_binding:
+                            bindings[fact_binding] = Fact(**{CONDITION_FIELD: self.ruleset.condition_names(bit)[0]})
+                    targets = rows[combo_index == combo_id]
+                    conditions, facts, penalty = self._rule_effects(rule, bindings)
+                    for condition in conditions:
+                        condition_flags.setdefault(condition, np.zeros(n, dtype=bool))[targets] = True
+                    for fact in facts:
+                        inferred.setdefault(fact, np.zeros(n, dtype=bool))[targets] = True
+                    if penalty:
+                        rule_penalty[targets] += penalty
+
+        # Recommendation stage: KB rules and confidence per category
+        kb = self.expert.kb
+        unique_categories, category_codes = np.unique(categories.astype(str), return_inverse=True)
+        base = np.full(len(unique_categories), np.nan)
+        recommendation_ids = []
+        for code, cat in enumerate(unique_categories):
+            data = kb.get(cat, {})
+            rules = self.expert.kb_index.rules_for(cat) if data else ()
+            if data:
+                base[code] = max(rule.get("confidence", 0.8) for rule in rules) if rules else 0.85
+            recommendation_ids.append(tuple(rule["id"] for rule in rules))
+
+        # Same accumulation order as StudyGuideExpert._calculate_confidence_adjustment
+        input_count = 1 + sum(present[name].astype(int) for name in INPUT_FIELDS)
+        adjustment = input_count * 0.02
+        for name in INPUT_FIELDS:
+            adjustment = adjustment - np.where(present[name], 0.0, MISSING_INPUT_PENALTIES[name])
+        adjustment = adjustment - rule_penalty
+        adjustment = adjustment + np.where(inferred.get(PATTERN_BONUS_FACT, np.zeros(n, dtype=bool)), 0.05, 0.0)
+        adjustment = adjustment - np.where(inferred.get(RISK_PENALTY_FACT, np.zeros(n, dtype=bool)), 0.03, 0.0)
+        confidence = np.minimum(0.99, np.maximum(0.60, base[category_codes] + adjustment))
+
+        condition_names = sorted(condition_flags)
+        flags = (np.stack([condition_flags[name] for name in condition_names], axis=1)
+                 if condition_names else np.zeros((n, 0), dtype=bool))
+
+        return CohortResult(
+            categories=categories,
+            condition_names=condition_names,
+            condition_flags=flags,
+            confidence=confidence,
+            recommendation_ids=[recommendation_ids[code] for code in category_codes],
+            missing={name: ~present[name] for name in INPUT_FIELDS}
+        )
+
+    def verify(self, result: CohortResult, columns: Dict[str, list], sample: Optional[int] = None) -> List[Dict]:
+        """
+        Check batch results against the per-student engine.
+
+        Args:
+            result: Output of analyze()
+            columns: The raw input columns passed to analyze()
+            sample: Only check the first N students
+
+        Returns:
+            List of mismatches in confidence, derived conditions or recommendation
+            IDs (empty when the batch agrees with the engine)
+        """
+        numeric = {name: _numeric_column(columns.get(name), len(result)) for name in NUMERIC_FIELDS}
+        exam = _exam_column(columns.get("has_upcoming_exam"), len(result))
+        styles = columns.get("learning_style") or [None] * len(result)
+
+        mismatches = []
+        for i in range(len(result) if sample is None else min(sample, len(result))):
+            inputs = {name: (None if np.isnan(numeric[name][i]) else numeric[name][i]) for name in NUMERIC_FIELDS}
+            inputs["has_upcoming_exam"] = None if np.isnan(exam[i]) else bool(exam[i])
+            inputs["learning_style"] = styles[i] or None
+            response = self.expert.process_query_with_inputs(columns["category"][i], "", **inputs)
+
+            expected_conf = response.get("confidence") if response else None
+            actual_conf = None if np.isnan(result.confidence[i]) else float(result.confidence[i])
+            expected = (tuple(self.expert.get_derived_conditions()), tuple(self.expert.fired_rules))
+            actual = (tuple(result.conditions_for(i)), result.recommendation_ids[i])
+            if ((expected_conf is None) != (actual_conf is None)
+                    or (expected_conf is not None and abs(expected_conf - actual_conf) > 1e-9)
+                    or expected != actual):
+                mismatches.append({'row': i, 'inputs': inputs,
+                                   'expected': (expected_conf,) + expected,
+                                   'actual': (actual_conf,) + actual})
+        return mismatches
+
+
+def read_roster_csv(path: str) -> Dict[str, list]:
+    """Read a roster CSV into columns (missing columns become None)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        records = list(reader)
+        fieldnames = reader.fieldnames or []
+    if "category" not in fieldnames:
+        raise ValueError(f"{path}: roster needs a 'category' column")
+    columns = {name: [record.get(name) for record in records] for name in fieldnames}
+    for name in ROSTER_COLUMNS:
+        columns.setdefault(name, None)
+    return columns
+
+
+def write_results_csv(path: Optional[str], result: CohortResult, passthrough: Dict[str, list]):
+    """
+    Write per-student results, keeping any non-input roster columns (e.g. student_id) first.
+
+    Args:
+        path: Output CSV path (None = stdout)
+        result: Output of CohortAnalyzer.analyze()
+        passthrough: Extra roster columns to copy into the output
+    """
+    fieldnames = (list(passthrough) + ["category", "confidence", "conditions", "recommendation_ids"]
+                  + [f"cond_{name}" for name in result.condition_names])
+    f = open(path, "w", newline="", encoding="utf-8") if path else sys.stdout
+    try:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(result.rows(passthrough))
+    finally:
+        if path:
+            f.close()
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the study guide diagnosis over a roster CSV")
+    parser.add_argument("roster", help="CSV with category, study_hours, stress_level, learning_style, "
+                                       "has_upcoming_exam, sleep_hours (one row per student)")
+    parser.add_argument("-o", "--output", help="Per-student results CSV (default: stdout)")
+    parser.add_argument("--summary", help="Write cohort aggregates to this JSON file")
+    parser.add_argument("--kb", help="Study guide knowledge base JSON")
+    parser.add_argument("--verify", type=int, metavar="N",
+                        help="Check the first N students against the per-student engine")
+    args = parser.parse_args(argv)
+
+    columns = read_roster_csv(args.roster)
+    analyzer = CohortAnalyzer(args.kb)
+    result = analyzer.analyze(**{name: columns[name] for name in ROSTER_COLUMNS})
+
+    passthrough = {name: values for name, values in columns.items()
+                   if name not in ROSTER_COLUMNS and values is not None}
+    write_results_csv(args.output, result, passthrough)
+
+    summary = result.summary()
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    print(f"Analyzed {summary['students']} students", file=sys.stderr)
+
+    if args.verify:
+        mismatches = analyzer.verify(result, columns, args.verify)
+        print(f"Verified {min(args.verify, len(result))} students: {len(mismatches)} mismatches", file=sys.stderr)
+        if mismatches:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
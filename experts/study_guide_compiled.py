@@ -0,0 +1,439 @@
+"""
+Compiled Study Guide Rules
+--------------------------
+Native forward-chaining evaluator for StudyGuideExpert.
+
+The Experta path rebuilds its Rete network on every ``reset()`` and pushes each
+input fact through it, although the study guide rules are small and flat: every
+pattern either tests one input field (study hours, stress, sleep, ...) or
+requires a derived ``condition`` fact.
+
+``CompiledRuleSet`` reads the ``@Rule`` declarations of the engine class once.
+Input patterns become plain literal/predicate checks, derived conditions become
+bits of an integer mask, and rules are fired in exactly the order Experta's
+DepthStrategy would use (highest salience first, then the activation with the
+most recent facts). Rule bodies are the original methods, so recommendations,
+diagnosis, confidence and reasoning trace are identical to the Experta path.
+
+Select it with ``STUDY_GUIDE_EVALUATOR = "compiled"`` in config.py. The
+differential check against the Experta engine runs over the whole UI input
+grid (``--sample N`` checks a random subset; tests/test_study_guide_compiled.py
+runs a sampled check)::
+
+    python -m experts.study_guide_compiled
+"""
+
+import bisect
+import inspect
+import itertools
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from experta import Fact, Rule
+from experta.fieldconstraint import ANDFC, FieldConstraint, L, P, W
+
+from utils.rule_profiler import PROCESS_PROFILER, RunProfile
+
+# Field of the facts declared by rule bodies (Fact(condition="..."))
+CONDITION_FIELD = "condition"
+
+
+class _FieldPattern:
+    """Compiled test for one pattern over a single input fact."""
+
+    __slots__ = ('field', 'literals', 'predicates', 'binding', 'fact_binding')
+
+    def __init__(self, field: str, fact_binding: Optional[str]):
+        self.field = field
+        self.literals = []
+        self.predicates = []
+        self.binding = None
+        self.fact_binding = fact_binding
+
+    def matches(self, value) -> bool:
+        for literal in self.literals:
+            if not literal == value:
+                return False
+        for predicate in self.predicates:
+            if not predicate(value):
+                return False
+        return True
+
+
+class CompiledRule:
+    """A StudyGuideExpert rule reduced to input tests plus a condition mask."""
+
+    __slots__ = ('name', 'salience', 'rhs', 'args',
+                 'field_patterns', 'condition_mask', 'condition_bindings')
+
+    def __init__(self, name: str, salience: int, rhs, args):
+        self.name = name
+        self.salience = salience
+        self.rhs = rhs
+        self.args = args
+        self.field_patterns: List[_FieldPattern] = []
+        self.condition_mask = 0
+        # (bit, fact binding name) for each required condition fact
+        self.condition_bindings = []
+
+
+class _RuleScope:
+    """
+    Stand-in for ``self`` inside a rule body.
+
+    Attribute reads and writes go to the expert; ``declare()`` goes to the
+    running evaluation instead of the Experta fact list, and ``condition_mask()``
+    returns the evaluation's condition bits instead of scanning Experta facts.
+    """
+
+    __slots__ = ('_expert', '_evaluation')
+
+    def __init__(self, expert, evaluation: '_Evaluation'):
+        object.__setattr__(self, '_expert', expert)
+        object.__setattr__(self, '_evaluation', evaluation)
+
+    def declare(self, *facts):
+        return self._evaluation.declare(*facts)
+
+    def condition_mask(self) -> int:
+        return self._evaluation.conditions
+
+    def __getattr__(self, name):
+        return getattr(self._expert, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._expert, name, value)
+
+
+class _Evaluation:
+    """State of one evaluation: fact ids, condition bits and the agenda."""
+
+    def __init__(self, ruleset: 'CompiledRuleSet', profile: Optional[RunProfile]):
+        self.ruleset = ruleset
+        self.profile = profile
+        # Fact id 0 is Experta's InitialFact
+        self.next_fact_id = 1
+        self.inputs: Dict[str, tuple] = {}
+        self.conditions = 0
+        self.condition_facts: Dict[int, tuple] = {}
+        self.agenda = []
+        self.sequence = itertools.count()
+        self.activated = set()
+
+    def declare_input(self, fact: Fact):
+        (field, value), = fact.items()
+        self.inputs[field] = (self.next_fact_id, value, fact)
+        self.next_fact_id += 1
+
+    def declare(self, *facts):
+        last = None
+        for fact in facts:
+            if set(fact.keys()) != {CONDITION_FIELD}:
+                raise ValueError(f"Compiled evaluator only supports Fact(condition=...) from rule bodies, got {fact!r}")
+            bit = self.ruleset.condition_bit(fact[CONDITION_FIELD])
+            if self.conditions & bit:
+                # Experta ignores duplicate facts
+                continue
+            self.conditions |= bit
+            self.condition_facts[bit] = (self.next_fact_id, fact)
+            self.next_fact_id += 1
+            last = fact
+            for rule in self.ruleset.rules_by_condition.get(bit, ()):
+                self.activate(rule)
+        return last
+
+    def activate(self, rule: CompiledRule):
+        """Put the rule on the agenda if all of its patterns are satisfied."""
+        if rule.name in self.activated or (rule.condition_mask & ~self.conditions):
+            return
+
+        context = {}
+        fact_ids = []
+        for pattern in rule.field_patterns:
+            entry = self.inputs.get(pattern.field)
+            if entry is None or not pattern.matches(entry[1]):
+                return
+            fact_id, value, fact = entry
+            fact_ids.append(fact_id)
+            if pattern.binding:
+                context[pattern.binding] = value
+            if pattern.fact_binding:
+                context[pattern.fact_binding] = fact
+        for bit, fact_binding in rule.condition_bindings:
+            fact_id, fact = self.condition_facts[bit]
+            fact_ids.append(fact_id)
+            if fact_binding:
+                context[fact_binding] = fact
+
+        self.activated.add(rule.name)
+        if self.profile is not None:
+            self.profile.rule(rule.name).activations += 1
+
+        # Same ordering as DepthStrategy + bisect.insort: the rightmost entry
+        # fires next, and among equal keys the latest insertion wins
+        key = (rule.salience, sorted(fact_ids, reverse=True), next(self.sequence))
+        bisect.insort(self.agenda, (key, rule, context))
+        if self.profile is not None and len(self.agenda) > self.profile.peak_agenda_size:
+            self.profile.peak_agenda_size = len(self.agenda)
+
+    def run(self, expert):
+        scope = _RuleScope(expert, self)
+        for rule in self.ruleset.input_rules:
+            self.activate(rule)
+        if self.profile is not None:
+            self.profile.initial_agenda_size = len(self.agenda)
+
+        while self.agenda:
+            _, rule, context = self.agenda.pop()
+            kwargs = {k: v for k, v in context.items() if k in rule.args} if rule.args else context
+            if self.profile is None:
+                rule.rhs(scope, **kwargs)
+                continue
+            rhs_start = time.perf_counter()
+            try:
+                rule.rhs(scope, **kwargs)
+            finally:
+                stats = self.profile.rule(rule.name)
+                stats.firings += 1
+                stats.rhs_time += time.perf_counter() - rhs_start
+
+
+class CompiledRuleSet:
+    """
+    The ``@Rule`` methods of an engine class compiled for native evaluation.
+
+    Args:
+        engine_class: KnowledgeEngine subclass whose rules should be compiled
+
+    Raises:
+        ValueError: If a rule uses a construct the evaluator does not support
+            (anything beyond Fact patterns with literals, MATCH bindings and P()
+            predicates, or non-literal condition patterns)
+    """
+
+    def __init__(self, engine_class):
+        self.engine_name = engine_class.__name__
+        self._condition_bits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.rules: List[CompiledRule] = []
+        # Rules that only test input facts: activated at the start of every run
+        self.input_rules: List[CompiledRule] = []
+        # Rules waiting on derived conditions, indexed by condition bit
+        self.rules_by_condition: Dict[int, List[CompiledRule]] = {}
+
+        for name, rule in inspect.getmembers(engine_class):
+            if not isinstance(rule, Rule):
+                continue
+            compiled = self._compile_rule(name, rule)
+            self.rules.append(compiled)
+            if compiled.condition_mask:
+                for bit, _ in compiled.condition_bindings:
+                    self.rules_by_condition.setdefault(bit, []).append(compiled)
+            else:
+                self.input_rules.append(compiled)
+
+    def condition_names(self, mask: int) -> List[str]:
+        """Get the derived conditions set in a condition mask."""
+        return [name for name, bit in self._condition_bits.items() if mask & bit]
+
+    def condition_bit(self, condition: str) -> int:
+        """Get the bit assigned to a derived condition, allocating one if new."""
+        bit = self._condition_bits.get(condition)
+        if bit is None:
+            with self._lock:
+                bit = self._condition_bits.setdefault(condition, 1 << len(self._condition_bits))
+        return bit
+
+    def _compile_rule(self, name: str, rule: Rule) -> CompiledRule:
+        compiled = CompiledRule(name, rule.salience, rule._wrapped, rule._wrapped_args)
+
+        for pattern in rule:
+            if type(pattern) is not Fact:
+                raise ValueError(f"Rule {name}: unsupported pattern {pattern!r}")
+            fields = {k: v for k, v in pattern.items() if not Fact.is_special(k)}
+            if len(fields) != 1:
+                raise ValueError(f"Rule {name}: patterns must test exactly one field")
+            (field, constraint), = fields.items()
+            fact_binding = pattern.__bind__
+
+            if field == CONDITION_FIELD:
+                if isinstance(constraint, L):
+                    constraint = constraint.value
+                if isinstance(constraint, FieldConstraint):
+                    raise ValueError(f"Rule {name}: condition patterns must use a literal value")
+                bit = self.condition_bit(constraint)
+                compiled.condition_mask |= bit
+                compiled.condition_bindings.append((bit, fact_binding))
+                continue
+
+            field_pattern = _FieldPattern(field, fact_binding)
+            self._compile_constraint(name, constraint, field_pattern)
+            compiled.field_patterns.append(field_pattern)
+
+        return compiled
+
+    def _compile_constraint(self, name: str, constraint, field_pattern: _FieldPattern):
+        if isinstance(constraint, ANDFC):
+            for part in constraint:
+                self._compile_constraint(name, part, field_pattern)
+            return
+        if not isinstance(constraint, FieldConstraint):
+            field_pattern.literals.append(constraint)
+            return
+        if isinstance(constraint, L):
+            field_pattern.literals.append(constraint.value)
+        elif isinstance(constraint, P):
+            field_pattern.predicates.append(constraint.match)
+        elif not isinstance(constraint, W):
+            raise ValueError(f"Rule {name}: unsupported field constraint {constraint!r}")
+        if constraint.__bind__:
+            if field_pattern.binding and field_pattern.binding != constraint.__bind__:
+                raise ValueError(f"Rule {name}: field {field_pattern.field} bound twice")
+            field_pattern.binding = constraint.__bind__
+
+    def run(self, expert, facts: List[Fact]) -> int:
+        """
+        Evaluate the rules for one request, firing rule bodies against ``expert``.
+
+        Args:
+            expert: Engine instance whose state the rule bodies update
+            facts: Input facts, in the order the Experta path would declare them
+
+        Returns:
+            Mask of the derived conditions (see condition_names)
+        """
+        profile = None
+        if expert.profiling_enabled:
+            profile = RunProfile(f"{self.engine_name}[compiled]")
+            run_start = time.perf_counter()
+
+        evaluation = _Evaluation(self, profile)
+        for fact in facts:
+            evaluation.declare_input(fact)
+        evaluation.run(expert)
+
+        if profile is not None:
+            profile.final_agenda_size = 0
+            profile.fact_count = evaluation.next_fact_id
+            profile.total_time = time.perf_counter() - run_start
+            PROCESS_PROFILER.record(profile)
+        expert.last_run_profile = profile
+        return evaluation.conditions
+
+
+_COMPILED: Dict[type, CompiledRuleSet] = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+def get_compiled_rules(engine_class) -> CompiledRuleSet:
+    """Get the process-wide compiled rule set for an engine class (compiled on first use)."""
+    ruleset = _COMPILED.get(engine_class)
+    if ruleset is None:
+        with _COMPILED_LOCK:
+            ruleset = _COMPILED.get(engine_class)
+            if ruleset is None:
+                ruleset = _COMPILED[engine_class] = CompiledRuleSet(engine_class)
+    return ruleset
+
+
+# Input grid of the Study Guide tab (main.py)
+GRID_CATEGORIES = ["Memory", "Focus", "Stress", "Time Management", "Sleep",
+                   "Motivation", "Exam Preparation", "Confidence"]
+GRID_STUDY_HOURS = [None] + list(range(0, 13))
+GRID_STRESS_LEVELS = [None] + list(range(1, 11))
+GRID_SLEEP_HOURS = [None] + list(range(1, 13))
+GRID_LEARNING_STYLES = [None, "Visual", "Auditory", "Kinesthetic", "Reading Writing"]
+GRID_EXAM = [None, True, False]
+
+_COMPARED_STATE = ('fired_rules', 'inferred_facts', 'reasoning_trace',
+                   'uncertainty_factors', 'confidence_breakdown', 'active_conditions')
+
+
+def verify_against_engine(categories: Optional[List[str]] = None, limit: Optional[int] = None,
+                          verbose: bool = False, sample: Optional[int] = None, seed: int = 0) -> Dict:
+    """
+    Differential check: run every input combination through both evaluators.
+
+    Compares the full response (recommendations, diagnosis, confidence, trace,
+    ...) and the expert's reasoning state after each request.
+
+    Args:
+        categories: Categories to check (default: all Study Guide categories)
+        limit: Stop after this many combinations (default: whole grid)
+        verbose: Print progress
+        sample: Check this many random combinations instead of the grid in order
+        seed: Random seed for the sample
+
+    Returns:
+        {'checked': int, 'mismatches': [...], 'experta_time': s, 'compiled_time': s}
+    """
+    from experts.study_guide_expert import StudyGuideExpert
+
+    reference = StudyGuideExpert(evaluator="experta", use_cube=False)
+    compiled = StudyGuideExpert(evaluator="compiled", use_cube=False)
+    reference.enable_profiling(False)
+    compiled.enable_profiling(False)
+
+    grid = itertools.product(categories or GRID_CATEGORIES, GRID_STUDY_HOURS, GRID_STRESS_LEVELS,
+                             GRID_LEARNING_STYLES, GRID_EXAM, GRID_SLEEP_HOURS)
+    if sample is not None:
+        grid = list(grid)
+        grid = random.Random(seed).sample(grid, min(sample, len(grid)))
+    if limit is not None:
+        grid = itertools.islice(grid, limit)
+
+    checked = 0
+    mismatches = []
+    experta_time = compiled_time = 0.0
+    for category, study, stress, style, exam, sleep in grid:
+        inputs = dict(category=category, question=f"How can I improve my {category.lower()}?",
+                      study_hours=study, stress_level=stress, learning_style=style,
+                      has_upcoming_exam=exam, sleep_hours=sleep)
+
+        start = time.perf_counter()
+        expected = reference.process_query_with_inputs(**inputs)
+        experta_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = compiled.process_query_with_inputs(**inputs)
+        compiled_time += time.perf_counter() - start
+
+        checked += 1
+        differences = [key for key in set(expected) | set(actual) if expected.get(key) != actual.get(key)]
+        differences += [name for name in _COMPARED_STATE
+                        if getattr(reference, name) != getattr(compiled, name)]
+        if differences:
+            mismatches.append({'inputs': inputs, 'fields': sorted(set(differences))})
+
+        if verbose and checked % 10000 == 0:
+            print(f"  {checked} combinations checked, {len(mismatches)} mismatches")
+
+    return {
+        'checked': checked,
+        'mismatches': mismatches,
+        'experta_time': experta_time,
+        'compiled_time': compiled_time
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check the compiled study guide evaluator against Experta")
+    parser.add_argument("--category", action="append", help="Restrict to a category (repeatable)")
+    parser.add_argument("--limit", type=int, default=None, help="Check at most N combinations")
+    parser.add_argument("--sample", type=int, default=None, help="Check N random combinations")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --sample")
+    args = parser.parse_args()
+
+    result = verify_against_engine(args.category, args.limit, verbose=True, sample=args.sample, seed=args.seed)
+    print(f"Checked {result['checked']} combinations: {len(result['mismatches'])} mismatches")
+    if result['checked']:
+        print(f"Experta:  {result['experta_time'] * 1000 / result['checked']:.3f} ms/request")
+        print(f"Compiled: {result['compiled_time'] * 1000 / result['checked']:.3f} ms/request")
+    for mismatch in result['mismatches'][:10]:
+        print(f"  MISMATCH {mismatch['fields']}: {mismatch['inputs']}")
+    sys.exit(1 if result['mismatches'] else 0)
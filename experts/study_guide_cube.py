@@ -0,0 +1,460 @@
+"""
+Study Guide Decision Cube
+-------------------------
+Precomputed study-guide outcomes for every quantized input combination.
+
+The Study Guide tab only produces a small, discrete set of inputs: nine KB
+categories, study hours 0-12, stress 1-10, sleep hours 1-12, the four UI
+learning styles and a yes/no exam flag, each of which may also be "not provided".
+``DecisionCube.build()`` runs the rules once for every combination offline and
+stores the outcome in flat NumPy arrays:
+
+* derived conditions as a bitmask,
+* inferred facts and the rules' reasoning trace lines as ragged index arrays,
+* recommendation indices into a table of recommendation texts,
+* the diagnosis, explanation, rule uncertainty factors and confidence
+  breakdown as indices into text tables,
+* the final confidence.
+
+At runtime ``lookup()`` is an index computation into those arrays, with no
+engine run. ``StudyGuideExpert.process_query_with_inputs`` answers from the
+cube when one is built (``STUDY_GUIDE_DECISION_CUBE`` in config.py) and
+restores the full response and reasoning state a live run would leave; inputs
+outside the grid (e.g. 6.5 sleep hours) fall back to live inference. The cube
+records the KB hash and the engine source hash it was built from and refuses
+to load when either changed.
+
+Build and check it with::
+
+    python -m experts.study_guide_cube build
+    python -m experts.study_guide_cube verify --sample 5000
+"""
+
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from experts import study_guide_expert
+from experts.kb_loader import load_knowledge_base
+from experts.study_guide_expert import INFERENCE_TRACE_MARKER, StudyGuideExpert, format_recommendations
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_CUBE_PATH = os.path.join(os.path.dirname(__file__), "study_guide_cube.npz")
+DEFAULT_KB_PATH = os.path.join(os.path.dirname(__file__), "study_guide_kb.json")
+
+# Quantized input axes; None means "not provided"
+STUDY_HOURS_AXIS = [None] + list(range(0, 13))
+STRESS_AXIS = [None] + list(range(1, 11))
+# Learning styles as main.py sends them; the explanation text depends on the exact casing
+LEARNING_STYLE_AXIS = [None, "Visual", "Auditory", "Kinesthetic", "Reading Writing"]
+EXAM_AXIS = [None, True, False]
+SLEEP_HOURS_AXIS = [None] + list(range(1, 13))
+
+# Recommendations shown per response (StudyGuideExpert.reason_with_category)
+MAX_RECOMMENDATIONS = 6
+
+# Expert state compared by verify() besides the response
+_COMPARED_STATE = ('fired_rules', 'inferred_facts', 'reasoning_trace', 'uncertainty_factors',
+                   'confidence_breakdown', 'active_conditions', 'recommendations')
+
+
+def _axis_position(axis: list, value) -> Optional[int]:
+    """Position of a value on a quantized axis, or None if it is off the grid."""
+    if value is None:
+        return 0
+    if isinstance(value, bool) or axis is EXAM_AXIS:
+        return axis.index(value) if isinstance(value, bool) else None
+    if isinstance(value, str):
+        return axis.index(value) if value in axis else None
+    if value != int(value):
+        return None
+    value = int(value)
+    return axis.index(value) if value in axis else None
+
+
+def _engine_fingerprint() -> str:
+    """Hash of the StudyGuideExpert source; a rule change invalidates the cube."""
+    return hashlib.sha256(inspect.getsource(study_guide_expert).encode("utf-8")).hexdigest()
+
+
+class _TextTable:
+    """Append-only table of distinct strings with stable indices."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, text: str) -> int:
+        position = self.index.get(text)
+        if position is None:
+            position = self.index[text] = len(self.values)
+            self.values.append(text)
+        return position
+
+
+class _RaggedColumn:
+    """Variable-length index lists per cell, stored as one flat array plus offsets."""
+
+    def __init__(self, cells: int):
+        self.values: List[int] = []
+        self.offsets = np.zeros(cells + 1, dtype=np.int64)
+
+    def set(self, cell: int, indices: List[int]):
+        # Cells are filled in order, so each one starts where the previous ended
+        self.values.extend(indices)
+        self.offsets[cell + 1] = len(self.values)
+
+    def arrays(self, dtype) -> tuple:
+        if self.values and max(self.values) > np.iinfo(dtype).max:
+            raise ValueError(f"Too many distinct entries for a {np.dtype(dtype).name} cube column")
+        return np.array(self.values, dtype=dtype), self.offsets.astype(np.uint32)
+
+
+class DecisionCube:
+    """
+    Array-backed table of study-guide outcomes over the quantized input grid.
+
+    Use ``build()`` (offline) or ``load()`` to create one.
+    """
+
+    ARRAYS = ("conditions", "inferred", "inferred_offsets", "trace", "trace_offsets",
+              "uncertainty", "breakdown", "recommendations", "diagnosis", "explanation", "confidence")
+    TABLES = ("categories", "condition_names", "inferred_names", "trace_lines", "uncertainty_texts",
+              "breakdown_texts", "recommendation_texts", "diagnosis_texts", "explanation_texts")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], tables: Dict[str, List[str]], meta: Dict[str, str]):
+        self.arrays = arrays
+        self.tables = tables
+        self.meta = meta
+        self.shape = (len(tables["categories"]), len(STUDY_HOURS_AXIS), len(STRESS_AXIS),
+                      len(LEARNING_STYLE_AXIS), len(EXAM_AXIS), len(SLEEP_HOURS_AXIS))
+        self._category_positions = {name: i for i, name in enumerate(tables["categories"])}
+        # Row-major strides for the flat index
+        self._strides = tuple(int(np.prod(self.shape[i + 1:])) for i in range(len(self.shape)))
+        # The JSON tables hold a few hundred distinct values: parse them once
+        self._uncertainty = [[tuple(factor) for factor in json.loads(text)] for text in tables["uncertainty_texts"]]
+        self._breakdowns = [json.loads(text) for text in tables["breakdown_texts"]]
+
+    @property
+    def cells(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def size_bytes(self) -> int:
+        """Memory held by the outcome arrays."""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, kb_path: Optional[str] = None, evaluator: str = "compiled",
+              categories: Optional[List[str]] = None, verbose: bool = False) -> 'DecisionCube':
+        """
+        Evaluate every input combination and collect the outcomes.
+
+        Args:
+            kb_path: Study guide knowledge base (default: experts/study_guide_kb.json)
+            evaluator: Live evaluator used for the build ("compiled" or "experta")
+            categories: KB categories to cover (default: all); other categories
+                are answered by live inference
+            verbose: Print progress
+        """
+        expert = StudyGuideExpert(kb_path, evaluator=evaluator, use_cube=False)
+        expert.enable_profiling(False)
+        known = list(expert.kb_index.rules_by_category) if expert.kb_index else []
+        categories = [name for name in known if categories is None or name in categories]
+
+        cube_shape = (len(categories), len(STUDY_HOURS_AXIS), len(STRESS_AXIS),
+                      len(LEARNING_STYLE_AXIS), len(EXAM_AXIS), len(SLEEP_HOURS_AXIS))
+        cells = int(np.prod(cube_shape))
+
+        conditions = np.zeros(cells, dtype=np.uint32)
+        inferred, trace = _RaggedColumn(cells), _RaggedColumn(cells)
+        uncertainty = np.zeros(cells, dtype=np.int32)
+        breakdown = np.zeros(cells, dtype=np.int32)
+        recommendations = np.full((cells, MAX_RECOMMENDATIONS), -1, dtype=np.int16)
+        diagnosis = np.zeros(cells, dtype=np.int32)
+        explanation = np.zeros(cells, dtype=np.int32)
+        confidence = np.zeros(cells, dtype=np.float64)
+
+        condition_names, inferred_names, trace_lines = _TextTable(), _TextTable(), _TextTable()
+        uncertainty_texts, breakdown_texts = _TextTable(), _TextTable()
+        recommendation_texts, diagnosis_texts, explanation_texts = _TextTable(), _TextTable(), _TextTable()
+
+        start = time.perf_counter()
+        grid = itertools.product(categories, STUDY_HOURS_AXIS, STRESS_AXIS,
+                                 LEARNING_STYLE_AXIS, EXAM_AXIS, SLEEP_HOURS_AXIS)
+        for cell, (category, study, stress, style, exam, sleep) in enumerate(grid):
+            response = expert.process_query_with_inputs(category, "", study, stress, style, exam, sleep)
+
+            mask = 0
+            for name in expert.get_derived_conditions():
+                mask |= 1 << condition_names.add(name)
+            conditions[cell] = mask
+
+            inferred.set(cell, [inferred_names.add(name) for name in expert.inferred_facts])
+            # Only the rules' part of the trace: the input analysis is rebuilt per request
+            rules_trace = expert.reasoning_trace[expert.reasoning_trace.index(INFERENCE_TRACE_MARKER) + 1:]
+            trace.set(cell, [trace_lines.add(line) for line in rules_trace])
+            # Likewise, one uncertainty factor per missing input comes first
+            rule_factors = expert.uncertainty_factors[len(expert.missing_info_warnings):]
+            uncertainty[cell] = uncertainty_texts.add(json.dumps(rule_factors))
+            breakdown[cell] = breakdown_texts.add(json.dumps(expert.confidence_breakdown))
+
+            for i, text in enumerate(expert.recommendations):
+                recommendations[cell, i] = recommendation_texts.add(text)
+            diagnosis[cell] = diagnosis_texts.add(response.get("diagnosis", ""))
+            explanation[cell] = explanation_texts.add(response.get("explanation", ""))
+            confidence[cell] = response.get("confidence", np.nan)
+
+            if verbose and (cell + 1) % 20000 == 0:
+                print(f"  {cell + 1}/{cells} cells ({time.perf_counter() - start:.0f}s)")
+
+        if len(condition_names.values) > 32:
+            raise ValueError("Too many distinct conditions for the cube bitmask")
+
+        inferred_values, inferred_offsets = inferred.arrays(np.uint8)
+        trace_values, trace_offsets = trace.arrays(np.uint16)
+        arrays = {
+            "conditions": conditions,
+            "inferred": inferred_values,
+            "inferred_offsets": inferred_offsets,
+            "trace": trace_values,
+            "trace_offsets": trace_offsets,
+            "uncertainty": uncertainty,
+            "breakdown": breakdown,
+            "recommendations": recommendations,
+            "diagnosis": diagnosis,
+            "explanation": explanation,
+            "confidence": confidence,
+        }
+        tables = {
+            "categories": categories,
+            "condition_names": condition_names.values,
+            "inferred_names": inferred_names.values,
+            "trace_lines": trace_lines.values,
+            "uncertainty_texts": uncertainty_texts.values,
+            "breakdown_texts": breakdown_texts.values,
+            "recommendation_texts": recommendation_texts.values,
+            "diagnosis_texts": diagnosis_texts.values,
+            "explanation_texts": explanation_texts.values,
+        }
+        meta = {
+            "kb_sha256": expert.kb_index.sha256 if expert.kb_index else "",
+            "engine_sha256": _engine_fingerprint(),
+            "build_seconds": f"{time.perf_counter() - start:.1f}",
+        }
+        return cls(arrays, tables, meta)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: str = DEFAULT_CUBE_PATH):
+        """Write the cube to a compressed .npz file."""
+        payload = dict(self.arrays)
+        for name, values in self.tables.items():
+            payload[f"table_{name}"] = np.array(values, dtype=str)
+        for name, value in self.meta.items():
+            payload[f"meta_{name}"] = np.array(value)
+        np.savez_compressed(path, **payload)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CUBE_PATH, kb_path: Optional[str] = None) -> 'DecisionCube':
+        """
+        Load a cube built by ``build()``.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the cube was built from a different KB or engine version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if any(name not in data.files for name in cls.ARRAYS):
+                raise ValueError(f"{path} was built by an older cube format; rebuild the cube")
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            tables = {name: data[f"table_{name}"].tolist() for name in cls.TABLES}
+            meta = {key[len("meta_"):]: str(data[key]) for key in data.files if key.startswith("meta_")}
+
+        if meta.get("engine_sha256") != _engine_fingerprint():
+            raise ValueError(f"{path} was built from a different StudyGuideExpert; rebuild the cube")
+        kb = load_knowledge_base(kb_path or DEFAULT_KB_PATH)
+        if meta.get("kb_sha256") != kb.sha256:
+            raise ValueError(f"{path} was built from a different knowledge base; rebuild the cube")
+        return cls(arrays, tables, meta)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def cell_index(self, category, study_hours=None, stress_level=None, learning_style=None,
+                   has_upcoming_exam=None, sleep_hours=None) -> Optional[int]:
+        """Flat cell index for the inputs, or None if any input is off the grid."""
+        category = category.lower().replace(" ", "_").replace("preparation", "prep")
+        positions = (
+            self._category_positions.get(category),
+            _axis_position(STUDY_HOURS_AXIS, study_hours),
+            _axis_position(STRESS_AXIS, stress_level),
+            _axis_position(LEARNING_STYLE_AXIS, learning_style or None),
+            _axis_position(EXAM_AXIS, has_upcoming_exam),
+            _axis_position(SLEEP_HOURS_AXIS, sleep_hours),
+        )
+        if any(position is None for position in positions):
+            return None
+        return sum(position * stride for position, stride in zip(positions, self._strides))
+
+    def _names(self, table: str, mask: int) -> List[str]:
+        return [name for bit, name in enumerate(self.tables[table]) if mask >> bit & 1]
+
+    def _ragged(self, column: str, table: str, cell: int) -> List[str]:
+        offsets = self.arrays[f"{column}_offsets"]
+        names = self.tables[table]
+        return [names[i] for i in self.arrays[column][offsets[cell]:offsets[cell + 1]]]
+
+    def lookup(self, category, study_hours=None, stress_level=None, learning_style=None,
+               has_upcoming_exam=None, sleep_hours=None) -> Optional[Dict]:
+        """
+        Precomputed outcome for one set of inputs.
+
+        Returns:
+            {'conditions', 'inferred_facts', 'reasoning_trace' (the rules' part),
+             'uncertainty_factors' (added by rules), 'confidence_breakdown',
+             'recommendations', 'recommendation', 'diagnosis', 'explanation',
+             'confidence'} or None if the inputs are off the grid
+        """
+        cell = self.cell_index(category, study_hours, stress_level, learning_style,
+                               has_upcoming_exam, sleep_hours)
+        if cell is None:
+            return None
+
+        recommendations = [self.tables["recommendation_texts"][i]
+                           for i in self.arrays["recommendations"][cell] if i >= 0]
+        return {
+            "conditions": self._names("condition_names", int(self.arrays["conditions"][cell])),
+            "inferred_facts": self._ragged("inferred", "inferred_names", cell),
+            "reasoning_trace": self._ragged("trace", "trace_lines", cell),
+            "uncertainty_factors": list(self._uncertainty[self.arrays["uncertainty"][cell]]),
+            "confidence_breakdown": dict(self._breakdowns[self.arrays["breakdown"][cell]]),
+            "recommendations": recommendations,
+            "recommendation": format_recommendations(recommendations),
+            "diagnosis": self.tables["diagnosis_texts"][self.arrays["diagnosis"][cell]],
+            "explanation": self.tables["explanation_texts"][self.arrays["explanation"][cell]],
+            "confidence": float(self.arrays["confidence"][cell]),
+        }
+
+    # ------------------------------------------------------------------
+    # Regression check
+    # ------------------------------------------------------------------
+
+    def verify(self, sample: Optional[int] = None, evaluator: str = "compiled", seed: int = 0) -> List[Dict]:
+        """
+        Compare answers served from the cube with live inference.
+
+        Both experts answer the same question; the full response and the
+        reasoning state the expert keeps afterwards must be identical.
+
+        Args:
+            sample: Number of random cells to check (default: every cell)
+            evaluator: Live evaluator to compare against ("compiled" or "experta")
+            seed: Random seed for the sample
+
+        Returns:
+            List of mismatches (empty when the cube agrees with live inference)
+        """
+        live = StudyGuideExpert(evaluator=evaluator, use_cube=False)
+        served = StudyGuideExpert(evaluator=evaluator, use_cube=True)
+        served.decision_cube = self
+        live.enable_profiling(False)
+        served.enable_profiling(False)
+
+        cells = range(self.cells)
+        if sample is not None and sample < self.cells:
+            cells = np.random.default_rng(seed).choice(self.cells, size=sample, replace=False)
+
+        axes = (self.tables["categories"], STUDY_HOURS_AXIS, STRESS_AXIS,
+                LEARNING_STYLE_AXIS, EXAM_AXIS, SLEEP_HOURS_AXIS)
+        mismatches = []
+        for cell in cells:
+            positions = np.unravel_index(int(cell), self.shape)
+            inputs = [axis[position] for axis, position in zip(axes, positions)]
+            if self.lookup(*inputs) is None:
+                mismatches.append({"inputs": inputs, "fields": ["off_grid"]})
+                continue
+
+            question = f"How can I improve my {inputs[0].replace('_', ' ')}?"
+            expected = live.process_query_with_inputs(inputs[0], question, *inputs[1:])
+            actual = served.process_query_with_inputs(inputs[0], question, *inputs[1:])
+
+            fields = [key for key in set(expected) | set(actual) if expected.get(key) != actual.get(key)]
+            fields += [name for name in _COMPARED_STATE if getattr(live, name) != getattr(served, name)]
+            if live.get_derived_conditions() != served.get_derived_conditions():
+                fields.append("derived_conditions")
+            if fields:
+                mismatches.append({"inputs": inputs, "fields": sorted(fields)})
+        return mismatches
+
+
+# Loaded cubes by path; None records a missing or stale cube so it is not retried
+_CUBES: Dict[str, Optional[DecisionCube]] = {}
+_CUBES_LOCK = threading.Lock()
+
+
+def get_decision_cube(path: str = DEFAULT_CUBE_PATH) -> Optional[DecisionCube]:
+    """Process-wide cube, or None if it has not been built (or is stale)."""
+    if path not in _CUBES:
+        with _CUBES_LOCK:
+            if path not in _CUBES:
+                cube = None
+                try:
+                    cube = DecisionCube.load(path)
+                    log.info("decision_cube_loaded", path=path, cells=cube.cells)
+                except OSError:
+                    pass
+                except ValueError as e:
+                    log.warning("decision_cube_stale", path=path, error=str(e))
+                _CUBES[path] = cube
+    return _CUBES[path]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or check the study guide decision cube")
+    parser.add_argument("command", choices=["build", "verify", "info"])
+    parser.add_argument("--path", default=DEFAULT_CUBE_PATH, help="Cube file (.npz)")
+    parser.add_argument("--sample", type=int, default=None, help="verify: number of random cells (default: all)")
+    parser.add_argument("--evaluator", default="compiled", choices=["compiled", "experta"],
+                        help="Live evaluator used for build/verify")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        cube = DecisionCube.build(evaluator=args.evaluator, verbose=True)
+        cube.save(args.path)
+        print(f"Built {cube.cells} cells in {cube.meta['build_seconds']}s "
+              f"({cube.size_bytes / 1024:.0f} KB in memory, {os.path.getsize(args.path) / 1024:.0f} KB on disk)")
+        sys.exit(0)
+
+    cube = DecisionCube.load(args.path)
+    if args.command == "info":
+        print(f"{cube.cells} cells, shape {cube.shape}, {cube.size_bytes / 1024:.0f} KB in memory")
+        for name in DecisionCube.TABLES:
+            print(f"  {name}: {len(cube.tables[name])}")
+        sys.exit(0)
+
+    mismatches = cube.verify(args.sample, args.evaluator)
+    checked = cube.cells if args.sample is None else min(args.sample, cube.cells)
+    print(f"Verified {checked} cells against live inference: {len(mismatches)} mismatches")
+    for mismatch in mismatches[:10]:
+        print(f"  MISMATCH {mismatch['fields']}: {mismatch['inputs']}")
+    sys.exit(1 if mismatches else 0)
@@ -3,15 +3,46 @@ import json, os
 from typing import Dict, List, Optional
 from experta import *
 
-class StudyGuideExpert(KnowledgeEngine):
-    def __init__(self, kb_path=None):
+from config import STUDY_GUIDE_EVALUATOR, STUDY_GUIDE_DECISION_CUBE
+from experts.kb_loader import load_knowledge_base
+from experts.study_guide_compiled import CONDITION_FIELD, get_compiled_rules
+from utils.rule_profiler import ProfiledKnowledgeEngine
+
+EVALUATORS = ("experta", "compiled")
+
+# Reasoning trace line after the input analysis; the rules' trace follows it
+INFERENCE_TRACE_MARKER = "\n🔍 Inference Engine Running..."
+
+# Confidence penalty for each optional input that is not provided
+MISSING_INPUT_PENALTIES = {
+    "study_hours": 0.08,
+    "stress_level": 0.10,
+    "learning_style": 0.06,
+    "has_upcoming_exam": 0.04,
+    "sleep_hours": 0.07,
+}
+
+def format_recommendations(recs):
+    """Numbered markdown list of the recommendations shown to the user"""
+    return "\n\n".join([f"**{i+1}.** {r}" for i, r in enumerate(recs)])
+
+class StudyGuideExpert(ProfiledKnowledgeEngine):
+    def __init__(self, kb_path=None, evaluator=None, use_cube=None):
         super().__init__()
+        self.evaluator = evaluator or STUDY_GUIDE_EVALUATOR
+        # Precomputed answers (experts/study_guide_cube.py), loaded on the first query
+        self.use_cube = STUDY_GUIDE_DECISION_CUBE if use_cube is None else use_cube
+        self.decision_cube = None
+        if self.evaluator not in EVALUATORS:
+            raise ValueError(f"Unknown study guide evaluator: {self.evaluator!r} (expected one of {EVALUATORS})")
         if kb_path is None:
             kb_path = os.path.join(os.path.dirname(__file__), "study_guide_kb.json")
+        # Parsed once per process and shared read-only by all instances
         try:
-            with open(kb_path, "r", encoding="utf-8") as f:
-                self.kb = json.load(f)
-        except:
+            self.kb_index = load_knowledge_base(kb_path)
+            self.kb = self.kb_index.data
+        except (OSError, ValueError):
+            self.kb_index = None
             self.kb = {}
         self.kb_path = kb_path
         self.user_profile = {}
@@ -23,6 +54,10 @@ class StudyGuideExpert(KnowledgeEngine):
         self.uncertainty_factors = []
         self.missing_info_warnings = []
         self.confidence_breakdown = {}
+        self.derived_conditions = []
+        # Conditions derived before the recommendation stage, as a bitmask (see _has_condition)
+        self.active_conditions = 0
+        self.recommendations = []
     
     def process_query_with_inputs(self, category, question, study_hours=None, stress_level=None, 
                                    learning_style=None, has_upcoming_exam=None, sleep_hours=None):
@@ -38,7 +73,6 @@ class StudyGuideExpert(KnowledgeEngine):
             has_upcoming_exam: Boolean indicating if exam is soon
             sleep_hours: Hours of sleep per night (numeric, 0-24)
         """
-        self.reset()
         self.response = None
         self.fired_rules = []
         self.reasoning_trace = []
@@ -47,6 +81,7 @@ class StudyGuideExpert(KnowledgeEngine):
         self.uncertainty_factors = []
         self.missing_info_warnings = []
         self.confidence_breakdown = {}
+        self.recommendations = []
         
         # Analyze data completeness
         total_inputs = 5  # study_hours, stress_level, learning_style, has_upcoming_exam, sleep_hours
@@ -70,31 +105,31 @@ class StudyGuideExpert(KnowledgeEngine):
             self.reasoning_trace.append(f"  • Study Hours/Day: {study_hours}")
         else:
             self.missing_info_warnings.append("study_hours")
-            self.uncertainty_factors.append(("missing_study_hours", 0.08))
+            self.uncertainty_factors.append(("missing_study_hours", MISSING_INPUT_PENALTIES["study_hours"]))
             
         if stress_level is not None:
             self.reasoning_trace.append(f"  • Stress Level: {stress_level}/10")
         else:
             self.missing_info_warnings.append("stress_level")
-            self.uncertainty_factors.append(("missing_stress_level", 0.10))
+            self.uncertainty_factors.append(("missing_stress_level", MISSING_INPUT_PENALTIES["stress_level"]))
             
         if learning_style:
             self.reasoning_trace.append(f"  • Learning Style: {learning_style}")
         else:
             self.missing_info_warnings.append("learning_style")
-            self.uncertainty_factors.append(("missing_learning_style", 0.06))
+            self.uncertainty_factors.append(("missing_learning_style", MISSING_INPUT_PENALTIES["learning_style"]))
             
         if has_upcoming_exam is not None:
             self.reasoning_trace.append(f"  • Upcoming Exam: {'Yes' if has_upcoming_exam else 'No'}")
         else:
             self.missing_info_warnings.append("has_upcoming_exam")
-            self.uncertainty_factors.append(("missing_exam_info", 0.04))
+            self.uncertainty_factors.append(("missing_exam_info", MISSING_INPUT_PENALTIES["has_upcoming_exam"]))
             
         if sleep_hours is not None:
             self.reasoning_trace.append(f"  • Sleep Hours: {sleep_hours}")
         else:
             self.missing_info_warnings.append("sleep_hours")
-            self.uncertainty_factors.append(("missing_sleep_hours", 0.07))
+            self.uncertainty_factors.append(("missing_sleep_hours", MISSING_INPUT_PENALTIES["sleep_hours"]))
         
         # Update user profile
         self.update_user_profile(
@@ -110,27 +145,78 @@ class StudyGuideExpert(KnowledgeEngine):
         category_normalized = category.lower().replace(" ", "_").replace("preparation", "prep")
         
         # Declare facts
-        self.declare(Fact(category=category_normalized))
-        self.declare(Fact(user_query=question.lower()))
+        facts = [Fact(category=category_normalized), Fact(user_query=question.lower())]
         
         if study_hours is not None:
-            self.declare(Fact(study_hours=study_hours))
+            facts.append(Fact(study_hours=study_hours))
         if stress_level is not None:
-            self.declare(Fact(stress_level=stress_level))
+            facts.append(Fact(stress_level=stress_level))
         if learning_style:
-            self.declare(Fact(learning_style=learning_style.lower()))
+            facts.append(Fact(learning_style=learning_style.lower()))
         if has_upcoming_exam is not None:
-            self.declare(Fact(has_upcoming_exam=has_upcoming_exam))
+            facts.append(Fact(has_upcoming_exam=has_upcoming_exam))
         if sleep_hours is not None:
-            self.declare(Fact(sleep_hours=sleep_hours))
-        
-        self.reasoning_trace.append("\n🔍 Inference Engine Running...")
-        self.run()
-        
+            facts.append(Fact(sleep_hours=sleep_hours))
+        
+        self.reasoning_trace.append(INFERENCE_TRACE_MARKER)
+        outcome = self._cube_outcome(category, study_hours, stress_level, learning_style,
+                                     has_upcoming_exam, sleep_hours)
+        if outcome is not None:
+            self._answer_from_cube(category_normalized, outcome)
+            return self.response
+        if self.evaluator == "compiled":
+            ruleset = get_compiled_rules(type(self))
+            self.derived_conditions = ruleset.condition_names(ruleset.run(self, facts))
+        else:
+            self.reset()
+            self.declare(*facts)
+            self.run()
+            self.derived_conditions = [fact["condition"] for fact in self.facts.values() if "condition" in fact]
+
+        # Attach per-request rule profile for the diagnostics page (opt-in)
+        if self.response is not None and self.last_run_profile is not None:
+            self.response["rule_profile"] = self.get_last_run_profile()
+
         return self.response
     
+    def _cube_outcome(self, category, study_hours, stress_level, learning_style, has_upcoming_exam, sleep_hours):
+        """Precomputed outcome for the inputs, or None (no cube built, stale cube or inputs off the grid)"""
+        if not self.use_cube:
+            return None
+        if self.decision_cube is None:
+            # Imported here: the cube module imports this one
+            from experts.study_guide_cube import get_decision_cube
+            self.decision_cube = get_decision_cube()
+            if self.decision_cube is None:
+                self.use_cube = False
+                return None
+        return self.decision_cube.lookup(category, study_hours, stress_level, learning_style,
+                                         has_upcoming_exam, sleep_hours)
+    
+    def _answer_from_cube(self, cat, outcome):
+        """Restore the state and response a live run would leave, from a cube outcome"""
+        ruleset = get_compiled_rules(type(self))
+        self.derived_conditions = outcome["conditions"]
+        self.active_conditions = 0
+        for condition in outcome["conditions"]:
+            self.active_conditions |= ruleset.condition_bit(condition)
+        self.inferred_facts = outcome["inferred_facts"]
+        self.uncertainty_factors.extend(outcome["uncertainty_factors"])
+        self.reasoning_trace.extend(outcome["reasoning_trace"])
+        self.confidence_breakdown = outcome["confidence_breakdown"]
+        for rule in self.kb_index.rules_for(cat):
+            self.fired_rules.append(rule["id"])
+            self.confidence_scores.append(rule.get("confidence", 0.8))
+        self.recommendations = outcome["recommendations"]
+        self.last_run_profile = None
+        self._build_response(cat, self.kb[cat], outcome["diagnosis"], outcome["explanation"], outcome["confidence"])
+    
     def process_query(self, query):
-        """Legacy method for backward compatibility - simplified version without NLP"""
+        """Legacy method for backward compatibility - picks the category from the KB keywords in the query"""
+        categories = self.kb_index.match_categories(query) if self.kb_index else ()
+        if categories:
+            return self.process_query_with_inputs(categories[0], query)
+        
         self.reset()
         self.response = None
         self.fired_rules = []
@@ -499,6 +585,9 @@ class StudyGuideExpert(KnowledgeEngine):
         """Main reasoning engine that combines all inputs for personalized advice"""
         self.reasoning_trace.append(f"\n🎯 Generating Recommendations for: {cat.upper()}")
         
+        # Every inference rule has a higher salience, so all conditions are derived by now
+        self.active_conditions = self.condition_mask()
+        
         # Get category data from KB
         data = self.kb.get(cat, {})
         if not data:
@@ -513,8 +602,8 @@ class StudyGuideExpert(KnowledgeEngine):
         recs = []
         explanations = []
         
-        # Get base recommendations from KB
-        for rule in data.get("rules", []):
+        # Get base recommendations from KB (pre-indexed by the loader)
+        for rule in self.kb_index.rules_for(cat):
             recs.append(rule["recommend"])
             self.fired_rules.append(rule["id"])
             self.confidence_scores.append(rule.get("confidence", 0.8))
@@ -536,31 +625,43 @@ class StudyGuideExpert(KnowledgeEngine):
         
         self.reasoning_trace.append(f"\n📊 Confidence: {final_confidence:.0%} (Base: {base_conf:.0%}, Adjustment: {adjustment:+.0%})")
         
-        # Generate missing information suggestions
-        missing_info_suggestions = self._generate_missing_info_suggestions()
-        
-        # Generate uncertainty explanation
-        uncertainty_explanation = self._generate_uncertainty_explanation(final_confidence)
-        
+        self.recommendations = recs[:6]
+        self._build_response(cat, data, diagnosis, explanation, final_confidence)
+    
+    def _build_response(self, cat, data, diagnosis, explanation, final_confidence):
+        """Assemble self.response from the recommendation stage (live run or decision cube)"""
         self.response = {
             "concept": data.get("concept", "Study Guide"),
             "diagnosis": diagnosis,
             "explanation": explanation,
-            "recommendation": "\n\n".join([f"**{i+1}.** {r}" for i, r in enumerate(recs[:6])]),
-            "examples": data.get("examples", [])[:5],
-            "resources": data.get("resources", [])[:5],
+            "recommendation": format_recommendations(self.recommendations),
+            "examples": list(data.get("examples", [])[:5]),
+            "resources": list(data.get("resources", [])[:5]),
             "confidence": final_confidence,
             "confidence_breakdown": self.confidence_breakdown,
-            "uncertainty_explanation": uncertainty_explanation,
+            "uncertainty_explanation": self._generate_uncertainty_explanation(final_confidence),
             "missing_info_warnings": self.missing_info_warnings,
-            "missing_info_suggestions": missing_info_suggestions,
+            "missing_info_suggestions": self._generate_missing_info_suggestions(),
             "reasoning_trace": self.reasoning_trace.copy(),
             "fired_rules": self.fired_rules.copy(),
             "inferred_facts": self.inferred_facts.copy(),
             "topic": cat,
-            "user_profile": profile
+            "user_profile": self.user_profile
         }
     
+    def condition_mask(self):
+        """Bitmask of the conditions declared so far in the running Experta engine"""
+        ruleset = get_compiled_rules(type(self))
+        mask = 0
+        for fact in self.facts.values():
+            if CONDITION_FIELD in fact:
+                mask |= ruleset.condition_bit(fact[CONDITION_FIELD])
+        return mask
+    
+    def _has_condition(self, condition):
+        """Whether the current run derived a condition (one bit test instead of a list scan)"""
+        return bool(self.active_conditions & get_compiled_rules(type(self)).condition_bit(condition))
+    
     def _generate_adaptive_recommendations(self, category, profile):
         """Generate personalized recommendations based on user inputs and inferred conditions"""
         recs = []
@@ -571,14 +672,14 @@ class StudyGuideExpert(KnowledgeEngine):
         upcoming_exam = profile.get("has_upcoming_exam")
         
         # Critical burnout state (highest priority)
-        if "critical_burnout_warning" in self.inferred_facts:
+        if self._has_condition("critical_burnout_imminent"):
             recs.append("🚨 **CRITICAL: IMMEDIATE ACTION REQUIRED** - Your combination of high stress, excessive study hours, and insufficient sleep puts you at severe burnout risk. STOP studying for 24 hours and prioritize rest.")
             recs.append("**Emergency Recovery Plan**: Sleep 8+ hours tonight, take tomorrow off completely, schedule urgent meeting with academic counselor or therapist.")
             recs.append("**Long-term Intervention**: Your current approach is unsustainable. Shift to quality over quantity - study 4-5 hours max with proper breaks.")
             return recs  # Return immediately - this overrides everything else
         
         # Peak performance zone (encourage optimization)
-        if "optimal_conditions_detected" in self.inferred_facts:
+        if self._has_condition("peak_performance_zone"):
             recs.append("⭐ **OPTIMAL STATE DETECTED** - You're in peak learning conditions! Your balanced stress, good sleep, and sufficient study hours create ideal cognitive performance.")
             if category == "memory":
                 recs.append("**Maximize This Window**: Use advanced memory techniques like the method of loci, interleaving practice, and elaborative interrogation.")
@@ -589,20 +690,20 @@ class StudyGuideExpert(KnowledgeEngine):
             recs.append("**Maintain Excellence**: Keep this routine - track what's working and replicate it daily.")
         
         # Urgent exam crisis
-        if "urgent_exam_preparation_needed" in self.inferred_facts:
+        if self._has_condition("exam_crisis"):
             recs.append(f"⏰ **EXAM CRISIS MODE** - With only {study_hrs}h/day and an exam approaching, you need emergency triage strategies.")
             recs.append("**Priority Triage**: Focus ONLY on high-weightage topics (use 80/20 rule). Skip minor details completely.")
             recs.append("**Intensive Study Protocol**: 3 x 90-min sessions daily with Pomodoro breaks. Use active recall and past papers only - no passive reading.")
             recs.append("**Night-Before Strategy**: Light review only, 8 hours sleep mandatory (sacrificing sleep for cramming reduces performance 40%).")
         
         # Overpreparation warning
-        if "balance_needed" in self.inferred_facts:
+        if self._has_condition("possible_overpreparation"):
             recs.append(f"⚖️ **BALANCE CHECK** - You're studying {study_hrs}h/day without an immediate exam. This intensity may lead to diminishing returns.")
             recs.append("**Optimization Advice**: Reduce to 5-6 hours of focused study. Quality > Quantity. Your brain needs rest for consolidation.")
             recs.append("**Schedule Downtime**: Add deliberate breaks for hobbies, exercise, socializing. Burnout prevention is key for long-term success.")
         
         # Stable baseline (room for optimization)
-        if "room_for_optimization" in self.inferred_facts:
+        if self._has_condition("stable_baseline"):
             recs.append("✓ **SOLID FOUNDATION** - Your metrics show balance, but there's room for improvement to reach peak performance.")
             if stress and 4 <= stress <= 6:
                 recs.append("**Stress Optimization**: You're in the moderate zone. Try meditation (10 min/day) to drop to optimal range (2-4).")
@@ -618,26 +719,26 @@ class StudyGuideExpert(KnowledgeEngine):
             recs.append("**Stress Reduction**: Moderate stress detected. Daily 20-min walk + 10-min meditation can significantly improve focus and retention.")
         
         # Sleep-specific interventions
-        if "critical_sleep_crisis" in self.inferred_facts:
+        if self._has_condition("severe_sleep_deprivation"):
             # Severe sleep deprivation (1-2 hours) - Rule 18
             recs.append(f"🚨 **EMERGENCY: SEVERE SLEEP DEPRIVATION** - {sleep_hrs}h is a critical health risk. Normal cognitive function is impossible at this level.")
             recs.append("**IMMEDIATE ACTION REQUIRED**: 1) Cancel all non-essential activities today, 2) Take a 90-minute nap NOW if possible, 3) Go to bed at least 2 hours earlier tonight, 4) Seek medical attention if this is chronic.")
             recs.append("**Health Warning**: Sleep deprivation at this level impairs judgment worse than alcohol intoxication. Academic performance will be near zero. Recovery must be your only priority.")
             recs.append("**Crisis Resources**: Contact university health services immediately. This level indicates possible crisis situation requiring professional support.")
-        elif "severe_sleep_debt" in self.inferred_facts:
+        elif self._has_condition("critical_sleep_deficit"):
             # Critical sleep deficit (3-4 hours) - Rule 19
             recs.append(f"🚨 **CRITICAL SLEEP DEFICIT** - {sleep_hrs}h/night causes 40-60% performance degradation. You're operating in crisis mode.")
             recs.append("**Recovery Protocol**: Tonight: Sleep 8+ hours (set hard bedtime). This week: Build back to 7h minimum. Cancel non-essential commitments.")
             recs.append("**Performance Reality Check**: Your current study efforts are 50% less effective than they would be with proper sleep. Sleeping IS studying.")
             if category == "memory":
                 recs.append("**Memory Impact**: Memory consolidation requires REM sleep - you're getting almost none. Information studied now won't stick.")
-        elif "sleep_optimization_needed" in self.inferred_facts:
+        elif self._has_condition("suboptimal_sleep"):
             # Suboptimal sleep (5-6 hours) - Rule 20
             recs.append(f"⚠️ **SUBOPTIMAL SLEEP** - {sleep_hrs}h reduces performance by 20-30%. Aiming for 7-8h will significantly boost results.")
             recs.append("**Sleep Extension Plan**: Move bedtime 30 min earlier this week, then another 30 min next week. Use the 10-3-2-1-0 rule: No caffeine 10h before bed, no food 3h before, no work 2h before, no screens 1h before, 0 times hitting snooze.")
             if category == "focus":
                 recs.append("**Focus Impact**: That afternoon brain fog you feel? It's directly from insufficient sleep. Add 1-2h sleep to regain sharp focus.")
-        elif "sleep_quality_good" in self.inferred_facts:
+        elif self._has_condition("optimal_sleep"):
             # Optimal sleep (7-9 hours) - Rule 21
             recs.append(f"✓ **OPTIMAL SLEEP** - {sleep_hrs}h is excellent! Your cognitive performance is at maximum capacity.")
             recs.append("**Maintain Excellence**: Keep consistent sleep/wake times (even weekends). Monitor sleep quality using apps like Sleep Cycle. Focus on REM and deep sleep optimization.")
@@ -651,55 +752,55 @@ class StudyGuideExpert(KnowledgeEngine):
             recs.append("**If Data Error**: Please re-enter with actual sleep hours. Normal healthy range is 7-9 hours per night.")
         
         # Stress-specific interventions by level
-        if "mental_health_crisis" in self.inferred_facts:
+        if self._has_condition("extreme_stress"):
             # Extreme stress (9-10) - Rule 25
             recs.append(f"🚨 **CRISIS-LEVEL STRESS** - {stress}/10 stress indicates severe distress. Your wellbeing is more important than any deadline.")
             recs.append("**URGENT: Seek Support Immediately**: 1) University Counseling Center (same-day appointments), 2) Crisis hotline: 988 (USA) / 116 123 (UK), 3) Trusted friend/family member, 4) Academic advisor for deadline extensions.")
             recs.append("**Emergency Stress Relief**: 4-7-8 breathing (Inhale 4s, Hold 7s, Exhale 8s) x 4 rounds. Cold water on face. Progressive muscle relaxation. These activate parasympathetic nervous system.")
             recs.append("**Academic Pause Needed**: Consider requesting incomplete grade or medical withdrawal. Your mental health must come first.")
-        elif "intervention_needed" in self.inferred_facts:
+        elif self._has_condition("moderate_high_stress"):
             # Moderate-high stress (6-7) - Rule 24
             recs.append(f"⚠️ **ELEVATED STRESS** - {stress}/10 is approaching burnout territory. Active intervention needed now to prevent crisis.")
             recs.append("**Intervention Plan**: 1) Daily 20-min walk outside (proven stress reducer), 2) Box breathing 3x daily (4s in, 4s hold, 4s out, 4s hold), 3) Reduce study hours by 25% to prevent escalation.")
             recs.append("**Schedule Relief Activities**: Block calendar time for stress management - it's not optional. Consider yoga, exercise, hobbies, social connection.")
             if category == "focus":
                 recs.append("**Focus Recovery**: High stress kills concentration. Take frequent breaks (Pomodoro). Meditate 10 min before study sessions.")
-        elif "proactive_management_zone" in self.inferred_facts:
+        elif self._has_condition("low_stress"):
             # Low stress (3-4) - Rule 23
             recs.append(f"✓ **LOW STRESS** - {stress}/10 is a healthy baseline. Proactive management will keep you here.")
             recs.append("**Maintain This State**: Daily stress check-ins. Keep stress diary to identify triggers. Continue current wellness practices.")
             recs.append("**Stress Prevention**: Build buffer time in schedule. Practice saying 'no' to overcommitment. Weekly stress-relief activities.")
-        elif "peak_performance_state" in self.inferred_facts:
+        elif self._has_condition("minimal_stress"):
             # Minimal stress (1-2) - Rule 22
             recs.append(f"⭐ **PEAK MENTAL STATE** - {stress}/10 stress is optimal! You're in the zone for maximum learning and creativity.")
             recs.append("**Maximize This Advantage**: Tackle your hardest, most complex material now. Your brain is primed for deep understanding and problem-solving.")
             recs.append("**Maintain Peak Performance**: Track what's keeping stress low (sleep, exercise, social support). Replicate these conditions daily.")
         
         # Study hours interventions by level
-        if "burnout_imminent" in self.inferred_facts:
+        if self._has_condition("extreme_study"):
             # Extreme study (11-12 hours) - Rule 30
             recs.append(f"🚨 **BURNOUT IMMINENT** - {study_hrs}h/day is unsustainable and counterproductive. You're past the point of diminishing returns.")
             recs.append("**MANDATORY REDUCTION**: Cut to 6h max tomorrow. Your brain needs recovery time to consolidate learning. More hours = less retention at this point.")
             recs.append("**Quality Over Quantity**: 4 hours of focused, strategic study beats 12 hours of exhausted cramming. Prioritize sleep and breaks.")
             recs.append("**Schedule Intervention**: Meet with academic advisor about workload. Consider dropping a course if possible. Your health matters more than grades.")
-        elif "diminishing_returns" in self.inferred_facts:
+        elif self._has_condition("excessive_study"):
             # Excessive study (9-10 hours) - Rule 29
             recs.append(f"⚠️ **DIMINISHING RETURNS ZONE** - {study_hrs}h/day approaches the limit of productive study. Efficiency is dropping.")
             recs.append("**Optimization Advice**: Research shows 6-8h is the sweet spot. Beyond that, fatigue reduces retention significantly. Consider reducing by 2-3 hours.")
             recs.append("**Quality Focus**: Instead of longer hours, improve technique: Active recall testing, spaced repetition, teaching concepts to others.")
-        elif "sustainable_study_pattern" in self.inferred_facts:
+        elif self._has_condition("optimal_study"):
             # Optimal study (4-6 hours) - Rule 28
             recs.append(f"✓ **OPTIMAL STUDY VOLUME** - {study_hrs}h/day is sustainable and effective. Focus on study quality now.")
             recs.append("**Maximize Effectiveness**: Use proven techniques: Pomodoro (25 min work, 5 min break), active recall, elaborative interrogation, spaced repetition.")
             recs.append("**Quality Indicators**: If you're staying in this range, focus on deep work vs. shallow work. Minimize distractions, use time-blocking.")
-        elif "efficiency_focus_needed" in self.inferred_facts:
+        elif self._has_condition("low_study"):
             # Low study (2-3 hours) - Rule 27
             recs.append(f"⚠️ **LIMITED STUDY TIME** - {study_hrs}h/day may be insufficient depending on your goals. Focus on maximum efficiency.")
             recs.append("**Efficiency Protocol**: Use Pareto principle (80/20 rule) - focus on high-yield material. Eliminate passive reading. Use active recall exclusively.")
             recs.append("**Time Expansion**: If possible, find 1-2 more hours. Morning slots are most effective. Audit time-wasters (social media, TV).")
             if category == "time_management":
                 recs.append("**Time Management**: Use time-blocking. Schedule study sessions like appointments. Track where time goes with app like RescueTime.")
-        elif "motivation_crisis" in self.inferred_facts:
+        elif self._has_condition("minimal_study"):
             # Minimal study (0-1 hours) - Rule 26
             recs.append(f"🚨 **ACADEMIC ENGAGEMENT CRISIS** - {study_hrs}h/day indicates possible motivation or time management breakdown.")
             recs.append("**Root Cause Analysis**: Is this: 1) Motivation issue (don't want to), 2) Time issue (don't have time), or 3) Mental health (can't focus)? Each needs different solution.")
@@ -754,45 +855,45 @@ class StudyGuideExpert(KnowledgeEngine):
         study_hrs = profile.get("study_hours")
         
         # Critical patterns (highest priority)
-        if "critical_sleep_crisis" in self.inferred_facts:
+        if self._has_condition("severe_sleep_deprivation"):
             parts.append(f"🚨 EMERGENCY: Severe sleep deprivation ({sleep_hrs}h) - immediate health risk.")
-        elif "mental_health_crisis" in self.inferred_facts:
+        elif self._has_condition("extreme_stress"):
             parts.append(f"🚨 CRISIS: Extreme stress ({stress}/10) - urgent professional support needed.")
-        elif "burnout_imminent" in self.inferred_facts:
+        elif self._has_condition("extreme_study"):
             parts.append(f"🚨 CRITICAL: Burnout imminent with {study_hrs}h/day study - immediate reduction required.")
         
         # Sleep patterns
-        elif "severe_sleep_debt" in self.inferred_facts:
+        elif self._has_condition("critical_sleep_deficit"):
             parts.append(f"Critical sleep deficit ({sleep_hrs}h) causing 40-60% performance loss.")
-        elif "sleep_optimization_needed" in self.inferred_facts:
+        elif self._has_condition("suboptimal_sleep"):
             parts.append(f"Suboptimal sleep ({sleep_hrs}h) reducing {category} performance by 20-30%.")
-        elif "sleep_quality_good" in self.inferred_facts:
+        elif self._has_condition("optimal_sleep"):
             parts.append(f"Optimal sleep ({sleep_hrs}h) supporting peak cognitive function.")
         elif sleep_hrs and sleep_hrs > 10:
             parts.append(f"Unusual sleep pattern ({sleep_hrs}h) - health check recommended.")
         
         # Stress patterns
-        if "intervention_needed" in self.inferred_facts:
+        if self._has_condition("moderate_high_stress"):
             parts.append(f"Elevated stress ({stress}/10) approaching burnout zone - active intervention needed.")
-        elif "proactive_management_zone" in self.inferred_facts:
+        elif self._has_condition("low_stress"):
             parts.append(f"Low-moderate stress ({stress}/10) - good baseline with room for prevention.")
-        elif "peak_performance_state" in self.inferred_facts:
+        elif self._has_condition("minimal_stress"):
             parts.append(f"Minimal stress ({stress}/10) - optimal state for peak {category}.")
         
         # Study hours patterns
-        if "motivation_crisis" in self.inferred_facts:
+        if self._has_condition("minimal_study"):
             parts.append(f"Minimal study engagement ({study_hrs}h/day) - motivation/time management concern.")
-        elif "efficiency_focus_needed" in self.inferred_facts:
+        elif self._has_condition("low_study"):
             parts.append(f"Limited study time ({study_hrs}h/day) - efficiency optimization critical.")
-        elif "sustainable_study_pattern" in self.inferred_facts:
+        elif self._has_condition("optimal_study"):
             parts.append(f"Optimal study volume ({study_hrs}h/day) - focus on quality techniques.")
-        elif "diminishing_returns" in self.inferred_facts:
+        elif self._has_condition("excessive_study"):
             parts.append(f"Excessive study ({study_hrs}h/day) entering diminishing returns zone.")
         
         # Compound patterns
-        if "critical_burnout_warning" in self.inferred_facts:
+        if self._has_condition("critical_burnout_imminent"):
             parts.append("CRITICAL BURNOUT: High stress + excessive study + insufficient sleep.")
-        elif "optimal_conditions_detected" in self.inferred_facts:
+        elif self._has_condition("peak_performance_zone"):
             parts.append("OPTIMAL STATE: Balanced stress, good sleep, and adequate study creating peak conditions.")
         
         return " ".join(parts) if parts else f"Analyzing your {category} concerns..."
@@ -805,7 +906,7 @@ class StudyGuideExpert(KnowledgeEngine):
         if learning:
             parts.append(f"\n\n**For {learning.capitalize()} Learners:** Your learning style is well-suited for {self._get_learning_style_strengths(learning)}.")
         
-        if "burnout_risk" in self.inferred_facts:
+        if self._has_condition("burnout_risk"):
             parts.append("\n\n⚠️ **Important:** Your current pattern shows burnout risk. Balance is crucial for sustainable learning.")
         
         return " ".join(parts)
@@ -833,19 +934,19 @@ class StudyGuideExpert(KnowledgeEngine):
             adjustment -= penalty
         
         # Consistent patterns boost confidence
-        if "optimal_learning_state" in self.inferred_facts:
+        if self._has_condition("optimal_learning_state"):
             adjustment += 0.05
         
         # Warning conditions slightly reduce confidence (more uncertainty)
-        if "burnout_risk" in self.inferred_facts:
+        if self._has_condition("burnout_risk"):
             adjustment -= 0.03
         
         # Track confidence breakdown for transparency
         self.confidence_breakdown = {
             "base_inputs": input_count * 0.02,
             "missing_data_penalty": -sum(p for _, p in self.uncertainty_factors),
-            "pattern_bonus": 0.05 if "optimal_learning_state" in self.inferred_facts else 0.0,
-            "risk_penalty": -0.03 if "burnout_risk" in self.inferred_facts else 0.0
+            "pattern_bonus": 0.05 if self._has_condition("optimal_learning_state") else 0.0,
+            "risk_penalty": -0.03 if self._has_condition("burnout_risk") else 0.0
         }
         
         return adjustment
@@ -893,5 +994,9 @@ class StudyGuideExpert(KnowledgeEngine):
     def get_explanation(self):
         return "\n".join(self.reasoning_trace)
     
+    def get_derived_conditions(self):
+        """Conditions inferred by the last run (Fact(condition=...)), sorted by name"""
+        return sorted(self.derived_conditions)
+    
     def get_confidence(self):
         return self.response.get("confidence", 0.0) if self.response else 0.0
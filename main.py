@@ -4,13 +4,51 @@ EduMentor - O/L Multi-Subject Tutor Expert System
 AGENT ARCHITECTURE: Expert Agent using Expert Systems as Tools
 """
 
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 import streamlit as st
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+from config import ENABLE_AGENT_STATISTICS, ENABLE_MEMORY_DIAGNOSTICS
+from utils.memory_diagnostics import MEMORY_DIAGNOSTICS
+
+# Opt-in allocation tracing, started before the engines and KBs are loaded
+if ENABLE_MEMORY_DIAGNOSTICS:
+    MEMORY_DIAGNOSTICS.start()
+
 from agents.expert_agent import ExpertAgent
+from agents.agent_pool import get_agent_pool
+from config import STUDY_GUIDE_PROMPT_VERSION, STUDY_GUIDE_LLM_TIMEOUT, CHAT_PAGE_SIZE
+from utils.llm_cache import LLM_CACHE
+from utils.llm_client import get_openai_client
+from utils.log import get_logger, request_context
+from utils.metrics import METRICS, start_metrics_server
+from utils.token_usage import TOKEN_USAGE, budget_exhausted, record_usage
+from utils.tracing import TRACE_HISTOGRAMS
+
+log = get_logger(__name__)
+
+MEMORY_DIAGNOSTICS.register_cache('llm_cache', lambda: LLM_CACHE)
+MEMORY_DIAGNOSTICS.register_cache('token_usage', lambda: TOKEN_USAGE)
+MEMORY_DIAGNOSTICS.register_cache('trace_histograms', lambda: TRACE_HISTOGRAMS)
+MEMORY_DIAGNOSTICS.register_cache('metrics', lambda: METRICS)
+
+# Prometheus endpoint on METRICS_PORT (no-op when unset; started once per process)
+start_metrics_server()
+
+# Response fields each study guide prompt is built from (LLM cache fingerprint)
+REFINEMENT_FIELDS = ('concept', 'diagnosis', 'explanation', 'recommendation', 'user_profile')
+REASONING_FIELDS = ('fired_rules', 'inferred_facts', 'reasoning_trace', 'user_profile', 'diagnosis', 'confidence')
+
+# Worker threads for the study guide LLM calls. Shared across reruns so a call
+# that outlives the timeout finishes in the background without blocking the page.
+STUDY_GUIDE_LLM_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="study-guide-llm")
 
 # Page configuration
 st.set_page_config(
@@ -80,186 +118,229 @@ def initialize_system():
     return ExpertAgent()
 
 
-def get_agent():
-    """Get or create Expert Agent for this session."""
-    if 'agent' not in st.session_state:
-        st.session_state.agent = ExpertAgent()
-    return st.session_state.agent
+CONFIDENCE_STYLES = {
+    'HIGH': ('#4CAF50', '🟢'),  # Green
+    'MEDIUM': ('#FF9800', '🟡'),  # Orange
+    'LOW': ('#F44336', '🔴'),  # Red
+}
 
 
-def display_response(result: dict):
-    """Display the system's response based on type."""
+def build_response_view(result: dict) -> dict:
+    """
+    Pre-format everything display_response shows for a result.
     
-    # Check if this is a clarification request
+    Built once per chat message and kept next to it in session state, so reruns
+    only re-emit widgets instead of re-formatting every answer in the history.
+    
+    Args:
+        result: Result dictionary from ExpertAgent.process_query
+        
+    Returns:
+        View dictionary consumed by display_response
+    """
+    # Clarification request
     if result.get('needs_clarification'):
+        return {'kind': 'clarification', 'response': result['response']}
+    
+    # Study guide diagnosis (complete)
+    if result.get('tool_used') == 'study_guide_expert' and isinstance(result.get('response'), dict):
+        diagnosis = result['response']
+        return {
+            'kind': 'diagnosis',
+            'title': f"### 🎯 {diagnosis.get('concept', 'Diagnosis')}",
+            'diagnosis': f"**📋 Diagnosis:** {diagnosis.get('diagnosis', 'N/A')}",
+            'explanation': diagnosis.get('explanation'),
+            'recommendation': diagnosis.get('recommendation'),
+            'tips': "\n".join(f"- {ex}" for ex in diagnosis.get('examples') or [])
+        }
+    
+    tool_used = result.get('tool_used', 'Unknown')
+    confidence_data = result.get('confidence_metrics')
+    view = {
+        'kind': 'answer',
+        'tool': f"**🔧 Tool Used:** {tool_used.replace('_', ' ').title()}",
+        'confidence_html': None,
+        'metrics': None,
+        'distribution': None,
+        'expert_details': None,
+        'analysis': None,
+        'corrections': None,
+        'response': result['response']
+    }
+    
+    if result.get('spelling_corrections'):
+        view['corrections'] = "✏️ Searched for: " + ", ".join(
+            f"*{c['corrected']}* (you typed *{c['original']}*)" for c in result['spelling_corrections'])
+    
+    if confidence_data:
+        cf = confidence_data.get('aggregate_certainty', 0)
+        level = confidence_data.get('confidence_level', 'UNKNOWN')
+        color, emoji = CONFIDENCE_STYLES.get(level, ('#9E9E9E', '⚪'))  # Gray
+        view['confidence_html'] = f"""
+            <div style="background-color: {color}20; padding: 10px; border-radius: 5px; border-left: 4px solid {color};">
+                <div style="font-size: 12px; color: #666;">Confidence</div>
+                <div style="font-size: 20px; font-weight: bold; color: {color};">
+                    {emoji} {cf:.1%} <span style="font-size: 14px;">({level})</span>
+                </div>
+            </div>
+            """
+        
+        if confidence_data.get('num_rules_fired', 0) > 0:
+            view['metrics'] = (
+                [("Aggregate Certainty", f"{confidence_data.get('aggregate_certainty', 0):.3f}"),
+                 ("Average Certainty", f"{confidence_data.get('average_certainty', 0):.3f}"),
+                 ("Rules Fired", confidence_data.get('num_rules_fired', 0))],
+                [("Max Certainty", f"{confidence_data.get('max_certainty', 0):.3f}"),
+                 ("Min Certainty", f"{confidence_data.get('min_certainty', 0):.3f}"),
+                 ("Confidence Level", confidence_data.get('confidence_level', 'N/A'))]
+            )
+            if confidence_data.get('certainty_distribution'):
+                view['distribution'] = [(i, level, count) for i, (level, count)
+                                        in enumerate(confidence_data['certainty_distribution'].items()) if count > 0]
+    
+    # Expert system details as a single markdown block
+    expert_data = result.get('raw_expert_response')
+    if expert_data:
+        lines = []
+        if isinstance(expert_data, dict):
+            if expert_data.get('concept'):
+                lines.append(f"**Concept:** {expert_data['concept']}")
+            if expert_data.get('topic'):
+                lines.append(f"**Topic:** {expert_data['topic']}")
+            if expert_data.get('certainty_factor'):
+                lines.append(f"**Certainty Factor:** {expert_data['certainty_factor']:.3f}")
+            if expert_data.get('explanation'):
+                lines.append("**Expert Explanation:**")
+                lines.append(expert_data['explanation'])
+            if expert_data.get('examples'):
+                lines.append("**Examples:**")
+                lines.append("\n".join(f"- {ex}" for ex in expert_data['examples']))
+        elif isinstance(expert_data, list):
+            # Multiple responses in a flat structure (no nested expanders)
+            lines.append(f"**{len(expert_data)} rules matched:**")
+            for i, data in enumerate(expert_data, 1):
+                lines.append("---")
+                lines.append(f"### Response {i}: {data.get('concept', 'N/A')}")
+                if data.get('certainty_factor'):
+                    cf = data['certainty_factor']
+                    level = data.get('confidence_level', 'N/A')
+                    color = CONFIDENCE_STYLES.get(level, CONFIDENCE_STYLES['LOW'])[0]
+                    lines.append(f"**Certainty Factor:** <span style='color: {color}; font-weight: bold;'>{cf:.3f} ({level})</span>")
+                if data.get('explanation'):
+                    lines.append("**Explanation:**")
+                    lines.append(data['explanation'][:300] + "..." if len(data['explanation']) > 300 else data['explanation'])
+                if data.get('examples') and len(data['examples']) > 0:
+                    lines.append("**Examples:**")
+                    lines.append("\n".join(f"- {ex}" for ex in data['examples'][:3]))  # First 3 examples
+        view['expert_details'] = "\n\n".join(lines)
+    
+    # Analysis details
+    if result.get('analysis'):
+        analysis = result['analysis']
+        lines = []
+        # Handle both old (query_topic) and new (topics) format
+        topics = result.get('query_topics', [analysis.get('query_topic')]) if analysis.get('query_topic') else result.get('query_topics', [])
+        if topics and topics != [None]:
+            lines.append(f"**Query Topic(s):** {', '.join(topics)}")
+        lines.append(f"**Reasoning:** {analysis.get('reasoning', 'N/A')}")
+        view['analysis'] = "\n\n".join(lines)
+    
+    return view
+
+
+def display_response(result: dict, view: dict = None):
+    """
+    Display the system's response based on type.
+    
+    Args:
+        result: Result dictionary from ExpertAgent.process_query
+        view: Pre-formatted view from build_response_view (built here if omitted)
+    """
+    if view is None:
+        view = build_response_view(result)
+    
+    # Clarification request
+    if view['kind'] == 'clarification':
         st.markdown('<div class="clarification-box">', unsafe_allow_html=True)
         st.markdown("### 🤔 Let me understand better...")
-        st.markdown(result['response'])
+        st.markdown(view['response'])
         st.markdown('</div>', unsafe_allow_html=True)
         return
     
-    # Check if this is a study guide diagnosis (complete)
-    if result.get('tool_used') == 'study_guide_expert' and isinstance(result.get('response'), dict):
-        diagnosis = result['response']
+    # Study guide diagnosis (complete)
+    if view['kind'] == 'diagnosis':
         st.markdown('<div class="diagnosis-box">', unsafe_allow_html=True)
-        st.markdown(f"### 🎯 {diagnosis.get('concept', 'Diagnosis')}")
-        st.markdown(f"**📋 Diagnosis:** {diagnosis.get('diagnosis', 'N/A')}")
+        st.markdown(view['title'])
+        st.markdown(view['diagnosis'])
         
-        if diagnosis.get('explanation'):
+        if view['explanation']:
             with st.expander("📖 Why This Happens", expanded=True):
-                st.markdown(diagnosis['explanation'])
+                st.markdown(view['explanation'])
         
-        if diagnosis.get('recommendation'):
+        if view['recommendation']:
             with st.expander("💡 Recommended Action Plan", expanded=True):
-                st.markdown(diagnosis['recommendation'])
+                st.markdown(view['recommendation'])
         
-        if diagnosis.get('examples'):
+        if view['tips']:
             with st.expander("✅ Quick Tips", expanded=False):
-                for ex in diagnosis['examples']:
-                    st.markdown(f"- {ex}")
+                st.markdown(view['tips'])
         
         st.markdown('</div>', unsafe_allow_html=True)
         return
     
-    # Display tool used and confidence metrics
-    tool_used = result.get('tool_used', 'Unknown')
-    confidence_data = result.get('confidence_metrics')
-    
-    # Create header with tool and confidence
+    # Header with tool and confidence
     col1, col2 = st.columns([2, 1])
     with col1:
-        st.info(f"**🔧 Tool Used:** {tool_used.replace('_', ' ').title()}")
+        st.info(view['tool'])
     with col2:
-        if confidence_data:
-            cf = confidence_data.get('aggregate_certainty', 0)
-            level = confidence_data.get('confidence_level', 'UNKNOWN')
-            
-            # Color code based on confidence level
-            if level == 'HIGH':
-                color = '#4CAF50'  # Green
-                emoji = '🟢'
-            elif level == 'MEDIUM':
-                color = '#FF9800'  # Orange
-                emoji = '🟡'
-            elif level == 'LOW':
-                color = '#F44336'  # Red
-                emoji = '🔴'
-            else:
-                color = '#9E9E9E'  # Gray
-                emoji = '⚪'
-            
-            st.markdown(f"""
-            <div style="background-color: {color}20; padding: 10px; border-radius: 5px; border-left: 4px solid {color};">
-                <div style="font-size: 12px; color: #666;">Confidence</div>
-                <div style="font-size: 20px; font-weight: bold; color: {color};">
-                    {emoji} {cf:.1%} <span style="font-size: 14px;">({level})</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        if view['confidence_html']:
+            st.markdown(view['confidence_html'], unsafe_allow_html=True)
     
     # Display the enhanced response
     st.markdown("### 💡 Answer")
-    st.markdown(result['response'])
+    if view.get('corrections'):
+        st.caption(view['corrections'])
+    st.markdown(view['response'])
     
     # Show confidence details in expander
-    if confidence_data and confidence_data.get('num_rules_fired', 0) > 0:
+    if view['metrics']:
         with st.expander("📊 Confidence Metrics", expanded=False):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.metric("Aggregate Certainty", f"{confidence_data.get('aggregate_certainty', 0):.3f}")
-                st.metric("Average Certainty", f"{confidence_data.get('average_certainty', 0):.3f}")
-                st.metric("Rules Fired", confidence_data.get('num_rules_fired', 0))
-            
-            with col2:
-                st.metric("Max Certainty", f"{confidence_data.get('max_certainty', 0):.3f}")
-                st.metric("Min Certainty", f"{confidence_data.get('min_certainty', 0):.3f}")
-                st.metric("Confidence Level", confidence_data.get('confidence_level', 'N/A'))
+            for column, metrics in zip(st.columns(2), view['metrics']):
+                with column:
+                    for label, value in metrics:
+                        st.metric(label, value)
             
             # Show distribution if available
-            if confidence_data.get('certainty_distribution'):
+            if view['distribution'] is not None:
                 st.markdown("**Certainty Distribution:**")
-                dist = confidence_data['certainty_distribution']
                 cols = st.columns(4)
-                for i, (level, count) in enumerate(dist.items()):
-                    if count > 0:
-                        with cols[i]:
-                            st.metric(level, count)
+                for i, level, count in view['distribution']:
+                    with cols[i]:
+                        st.metric(level, count)
     
     # Show expert system details in expander
-    if result.get('raw_expert_response'):
+    if view['expert_details']:
         with st.expander("🔍 Expert System Details", expanded=False):
-            expert_data = result['raw_expert_response']
-            
-            if isinstance(expert_data, dict):
-                if expert_data.get('concept'):
-                    st.markdown(f"**Concept:** {expert_data['concept']}")
-                if expert_data.get('topic'):
-                    st.markdown(f"**Topic:** {expert_data['topic']}")
-                if expert_data.get('certainty_factor'):
-                    st.markdown(f"**Certainty Factor:** {expert_data['certainty_factor']:.3f}")
-                if expert_data.get('explanation'):
-                    st.markdown("**Expert Explanation:**")
-                    st.markdown(expert_data['explanation'])
-                if expert_data.get('examples'):
-                    st.markdown("**Examples:**")
-                    for ex in expert_data['examples']:
-                        st.markdown(f"- {ex}")
-            elif isinstance(expert_data, list):
-                # Display multiple responses in a flat structure (no nested expanders)
-                st.markdown(f"**{len(expert_data)} rules matched:**")
-                for i, data in enumerate(expert_data, 1):
-                    st.markdown("---")
-                    st.markdown(f"### Response {i}: {data.get('concept', 'N/A')}")
-                    if data.get('certainty_factor'):
-                        cf = data['certainty_factor']
-                        level = data.get('confidence_level', 'N/A')
-                        # Color code the CF
-                        if level == 'HIGH':
-                            color = '#4CAF50'
-                        elif level == 'MEDIUM':
-                            color = '#FF9800'
-                        else:
-                            color = '#F44336'
-                        st.markdown(f"**Certainty Factor:** <span style='color: {color}; font-weight: bold;'>{cf:.3f} ({level})</span>", unsafe_allow_html=True)
-                    if data.get('explanation'):
-                        st.markdown("**Explanation:**")
-                        st.markdown(data['explanation'][:300] + "..." if len(data['explanation']) > 300 else data['explanation'])
-                    if data.get('examples') and len(data['examples']) > 0:
-                        st.markdown("**Examples:**")
-                        for ex in data['examples'][:3]:  # Show first 3 examples
-                            st.markdown(f"- {ex}")
+            st.markdown(view['expert_details'], unsafe_allow_html=True)
     
     # Show analysis details
-    if result.get('analysis'):
+    if view['analysis']:
         with st.expander("🧠 Agent Analysis", expanded=False):
-            analysis = result['analysis']
-            # Handle both old (query_topic) and new (topics) format
-            topics = result.get('query_topics', [analysis.get('query_topic')]) if analysis.get('query_topic') else result.get('query_topics', [])
-            if topics and topics != [None]:
-                st.markdown(f"**Query Topic(s):** {', '.join(topics)}")
-            st.markdown(f"**Reasoning:** {analysis.get('reasoning', 'N/A')}")
+            st.markdown(view['analysis'])
 
 
 def main():
     """Main application."""
     
-    # Initialize session state for agent if not exists
-    if 'agent' not in st.session_state:
-        st.session_state.agent = ExpertAgent()
-    
-    agent = st.session_state.agent
+    # Tutoring state (history, clarification mode, offered topic) lives in the
+    # session store; the Streamlit session only keeps its ID and the rendered chat
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     
     # Initialize messages if not exists
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     
-    # Track if we're in clarification mode
-    if 'awaiting_clarification' not in st.session_state:
-        st.session_state.awaiting_clarification = False
-    if 'clarification_tool' not in st.session_state:
-        st.session_state.clarification_tool = None
-    
     # Initialize study guide messages separately
     if 'study_guide_messages' not in st.session_state:
         st.session_state.study_guide_messages = []
@@ -272,13 +353,14 @@ def main():
     tab1, tab2 = st.tabs(["📚 Subject Tutor", "🧠 Study Guide & Wellness"])
     
     with tab1:
-        subject_tutor_tab(agent)
+        subject_tutor_tab(st.session_state.session_id)
     
     with tab2:
         study_guide_tab()
 
-def subject_tutor_tab(agent):
+def subject_tutor_tab(session_id: str):
     """Subject-specific tutoring tab (Biology, Physics, Chemistry)."""
+    pool = get_agent_pool()
     
     # Sidebar
     with st.sidebar:
@@ -311,12 +393,29 @@ def subject_tutor_tab(agent):
         
         # Stats
         if st.button("📊 View Conversation Stats"):
-            st.info(f"**Conversations:** {len(agent.conversation_history)}")
-            st.info(f"**Available Tools:** {', '.join(agent.tools.keys())}")
+            with pool.session(session_id) as session:
+                history_stats = session.agent.get_history_stats()
+                tool_names = list(session.agent.tools.keys())
+            st.info(f"**Conversations:** {history_stats['total_turns']}")
+            usage = TOKEN_USAGE.session_usage(session_id)
+            budget = f" of {usage['budget']:,}" if usage['budget'] else ""
+            st.info(f"**LLM Tokens:** {usage['total_tokens']:,}{budget} (≈ ${usage['cost_usd']:.4f})")
+            if usage['over_budget']:
+                st.warning("Token budget reached: answers now use the expert system text and cached replies.")
+            if history_stats['top_topics']:
+                st.info(f"**Top Topics:** {', '.join(topic for topic, _ in history_stats['top_topics'])}")
+            st.info(f"**Available Tools:** {', '.join(tool_names)}")
+        
+        if ENABLE_AGENT_STATISTICS:
+            metrics_panel()
+        
+        if ENABLE_MEMORY_DIAGNOSTICS:
+            memory_diagnostics_panel(session_id)
         
         if st.button("🗑️ Clear History"):
-            agent.reset()
+            pool.clear_session(session_id)
             st.session_state.messages = []
+            st.session_state.chat_visible_messages = CHAT_PAGE_SIZE
             st.success("Conversation cleared!")
             st.rerun()
         
@@ -334,11 +433,22 @@ def subject_tutor_tab(agent):
     # Main content area
     st.markdown("---")
     
-    # Display chat history FIRST
-    for message in st.session_state.messages:
+    # Display chat history FIRST (only the most recent turns; views are formatted once per message)
+    if 'chat_visible_messages' not in st.session_state:
+        st.session_state.chat_visible_messages = CHAT_PAGE_SIZE
+    messages = st.session_state.messages
+    hidden = max(0, len(messages) - st.session_state.chat_visible_messages)
+    if hidden:
+        if st.button(f"⬆️ Load earlier messages ({hidden} hidden)"):
+            st.session_state.chat_visible_messages += CHAT_PAGE_SIZE
+            st.rerun()
+    
+    for message in messages[hidden:]:
         with st.chat_message(message["role"]):
             if message["role"] == "assistant":
-                display_response(message["content"])
+                if "view" not in message:
+                    message["view"] = build_response_view(message["content"])
+                display_response(message["content"], message["view"])
             else:
                 st.markdown(message["content"])
     
@@ -347,18 +457,19 @@ def subject_tutor_tab(agent):
         # Add user message to chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
         
-        # Debug: Show current state
-        print(f"\n🔍 DEBUG: Processing '{prompt}'")
-        print(f"   Awaiting clarification: {st.session_state.awaiting_clarification}")
-        print(f"   Clarification tool: {st.session_state.clarification_tool}")
-        
-        # Process query with spinner
-        with st.spinner("🤔 Thinking..."):
+        # Process query with spinner (on a pooled agent restored to this session)
+        with st.spinner("🤔 Thinking..."), request_context(session_id=session_id), \
+                pool.session(session_id) as session:
+            agent = session.agent
+            state = session.state
+            
+            log.debug("chat_message", awaiting_clarification=state.awaiting_clarification,
+                      clarification_tool=state.clarification_tool, sampled=True)
+            
             # Check if we're responding to a clarification question
-            if st.session_state.awaiting_clarification:
-                print(f"   → Handling as clarification response")
+            if state.awaiting_clarification:
                 # Handle clarification response for study guide
-                if st.session_state.clarification_tool == 'study_guide_expert':
+                if state.clarification_tool == 'study_guide_expert':
                     expert = agent.tools['study_guide_expert']
                     
                     # Use the built-in method to declare user's response
@@ -376,9 +487,9 @@ def subject_tutor_tab(agent):
                             'success': True
                         }
                         # Keep awaiting_clarification True for next response
-                        st.session_state.awaiting_clarification = True
-                        st.session_state.clarification_tool = 'study_guide_expert'
-                        print(f"   → Still needs clarification (keeping state)")
+                        state.awaiting_clarification = True
+                        state.clarification_tool = 'study_guide_expert'
+                        log.debug("clarification_pending", sampled=True)
                     elif expert.is_diagnosis_complete():
                         result = {
                             'response': expert.get_response(),
@@ -387,9 +498,9 @@ def subject_tutor_tab(agent):
                             'success': True
                         }
                         # Clear clarification state - diagnosis complete
-                        st.session_state.awaiting_clarification = False
-                        st.session_state.clarification_tool = None
-                        print(f"   → Diagnosis complete! (clearing state)")
+                        state.awaiting_clarification = False
+                        state.clarification_tool = None
+                        log.debug("diagnosis_complete", sampled=True)
                     else:
                         result = {
                             'response': "Let me help you with that...",
@@ -398,24 +509,23 @@ def subject_tutor_tab(agent):
                             'success': False
                         }
                         # Clear clarification state - something went wrong
-                        st.session_state.awaiting_clarification = False
-                        st.session_state.clarification_tool = None
-                        print(f"   → Unknown state (clearing state)")
+                        state.awaiting_clarification = False
+                        state.clarification_tool = None
+                        log.warning("clarification_state_unknown")
                 else:
                     # Other clarification handlers can go here
                     result = agent.process_query(prompt)
-                    st.session_state.awaiting_clarification = False
-                    st.session_state.clarification_tool = None
+                    state.awaiting_clarification = False
+                    state.clarification_tool = None
             else:
-                print(f"   → Handling as new query")
                 # Normal query processing
                 result = agent.process_query(prompt)
                 
                 # Check if result needs clarification
                 if result.get('needs_clarification'):
-                    st.session_state.awaiting_clarification = True
-                    st.session_state.clarification_tool = result.get('tool_used')
-                    print(f"   → Set awaiting_clarification=True for {result.get('tool_used')}")
+                    state.awaiting_clarification = True
+                    state.clarification_tool = result.get('tool_used')
+                    log.debug("clarification_requested", tool=result.get('tool_used'), sampled=True)
             
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": result})
@@ -423,6 +533,97 @@ def subject_tutor_tab(agent):
         # Rerun to display the new messages
         st.rerun()
 
+def metrics_panel():
+    """Sidebar view of the process metrics (queries, stage latencies, caches, LLM errors, pool waits)."""
+    with st.expander("📈 Metrics"):
+        snapshot = METRICS.snapshot()
+        counters = snapshot['counters']
+        collected = snapshot['collected']
+        
+        queries = counters.get('queries_total', [])
+        st.markdown(f"**Queries:** {sum(row['value'] for row in queries):,.0f}")
+        if queries:
+            st.table([{**row['labels'], 'count': int(row['value'])} for row in queries])
+        
+        stages = snapshot['stage_latency_ms']
+        if stages:
+            st.markdown("**Stage latency** (ms)")
+            st.table([{'stage': key, 'count': h['count'], 'p50': round(h['p50_ms'], 1), 'p95': round(h['p95_ms'], 1)}
+                      for key, h in stages.items()])
+        
+        cache = collected.get('llm_cache', {})
+        kb = collected.get('kb_loader', {})
+        pool = collected.get('agent_pool', {})
+        waits = snapshot['histograms'].get('agent_pool_wait_ms', [])
+        st.markdown(f"**LLM cache:** {cache.get('hits', 0)} hits / {cache.get('misses', 0)} misses "
+                    f"({cache.get('hit_rate', 0.0):.0%})")
+        st.markdown(f"**KB loader:** {kb.get('hits', 0)} hits / {kb.get('loads', 0)} loads")
+        st.markdown(f"**Agent pool:** {pool.get('checkouts', 0)} checkouts, {pool.get('waits', 0)} waits"
+                    + (f" (p95 {waits[0]['p95_ms']:.0f} ms)" if waits else ""))
+        
+        errors = counters.get('llm_errors_total', [])
+        fallbacks = collected.get('token_usage', {}).get('budget_fallbacks', {})
+        if errors:
+            st.markdown("**LLM errors**")
+            st.table([{**row['labels'], 'count': int(row['value'])} for row in errors])
+        if fallbacks:
+            st.markdown("**Token budget fallbacks**")
+            st.table([{'stage': stage, 'count': count} for stage, count in fallbacks.items()])
+        
+        st.download_button("⬇️ JSON snapshot", json.dumps(snapshot, indent=2, default=str),
+                           file_name="edumentor_metrics.json", mime="application/json")
+
+
+def memory_diagnostics_panel(session_id: str):
+    """Sidebar memory report: sizes per session, engine and cache, top allocation sites and growth."""
+    with st.expander("🧪 Memory Diagnostics"):
+        col1, col2 = st.columns(2)
+        if col1.button("📸 Snapshot"):
+            MEMORY_DIAGNOSTICS.snapshot(label=time.strftime('%H:%M:%S'))
+        if not col2.button("📋 Report"):
+            st.caption("Take a snapshot, use the tutor, then snapshot again to see what grew.")
+            return
+        
+        pool = get_agent_pool()
+        session = {
+            'chat_messages': st.session_state.get('messages'),
+            'study_guide_messages': st.session_state.get('study_guide_messages'),
+            'study_guide_expert': st.session_state.get('study_guide_expert'),
+            'stored_state': pool.store.load(session_id).to_dict()
+        }
+        report = MEMORY_DIAGNOSTICS.report(
+            agents=pool.idle_agents(),
+            session={name: obj for name, obj in session.items() if obj is not None},
+            session_id=session_id
+        )
+        
+        if report['rss_mb'] is not None:
+            st.metric("Process RSS", f"{report['rss_mb']:.0f} MiB")
+        if report['tracing']:
+            st.caption(f"Traced: {report['traced_kib'] / 1024:.1f} MiB (peak {report['traced_peak_kib'] / 1024:.1f} MiB)")
+        
+        this_session = report['sessions'].get(session_id, {})
+        st.markdown(f"**This session:** {this_session.get('total_kib', 0):.0f} KiB")
+        st.table([{'component': name, 'KiB': round(size['kib'], 1)} for name, size in this_session.get('components', {}).items()])
+        st.markdown("**Engines** (pooled agents)")
+        st.table([{'engine': name, 'KiB': round(size['kib']), 'objects': size['objects']} for name, size in report['engines'].items()])
+        st.markdown("**Caches**")
+        st.table([{'cache': name, 'KiB': round(size['kib'], 1)} for name, size in report['caches'].items()])
+        if len(report['sessions']) > 1:
+            st.markdown("**Recent sessions**")
+            st.table([{'session': sid[:8], 'KiB': round(record['total_kib'])} for sid, record in report['sessions'].items()])
+        
+        if report['top_allocations']:
+            st.markdown("**Top allocation sites** (latest snapshot)")
+            st.table([{'site': row['site'], 'KiB': round(row['size_kib']), 'blocks': row['blocks']} for row in report['top_allocations']])
+        if report['growth']:
+            growth = report['growth']
+            st.markdown(f"**Growth** {growth['from']} → {growth['to']}: {growth['total_kib']:+.0f} KiB")
+            st.table([{'site': row['site'], 'KiB': round(row['size_diff_kib'], 1), 'blocks': row['blocks_diff']} for row in growth['sites']])
+        elif report['tracing']:
+            st.caption("Take two snapshots to see growth.")
+
+
 def study_guide_tab():
     """Comprehensive study guide and wellness tab."""
     from experts.study_guide_expert import StudyGuideExpert
@@ -596,6 +797,8 @@ def study_guide_tab():
 def display_study_guide_response(response):
     """Display study guide response with proper formatting and LLM refinement."""
     if isinstance(response, dict):
+        # LLM-generated sections: name -> (placeholder, render method), filled concurrently below
+        llm_sections = {}
         
         # Display uncertainty explanation (prominent)
         if response.get('uncertainty_explanation'):
@@ -624,52 +827,51 @@ def display_study_guide_response(response):
             st.markdown("### 🤔 Why These Recommendations?")
             st.markdown("*Understanding how the expert system analyzed your profile*")
             
-            with st.spinner("🧠 Analyzing inference process..."):
-                reasoning = generate_reasoning_explanation(response)
+            # Display step-by-step reasoning (filled in once the LLM call completes)
+            st.markdown("#### 📊 Step-by-Step Reasoning Process")
+            reasoning_placeholder = st.empty()
+            reasoning_placeholder.caption("🧠 Analyzing inference process...")
+            llm_sections['reasoning'] = (reasoning_placeholder, 'info')
+            
+            # Show detailed rule firing in expandable section
+            with st.expander("🔍 View Detailed Rule Firing Sequence", expanded=False):
+                st.markdown("**How the inference engine analyzed your data:**")
                 
-                # Display step-by-step reasoning
-                st.markdown("#### 📊 Step-by-Step Reasoning Process")
-                st.info(reasoning)
+                # Organize rules by category
+                critical_rules = [r for r in response['reasoning_trace'] if r.strip() and ("🚨" in r or "CRITICAL" in r)]
+                warning_rules = [r for r in response['reasoning_trace'] if r.strip() and "⚠️" in r and "🚨" not in r]
+                optimal_rules = [r for r in response['reasoning_trace'] if r.strip() and ("✓" in r or "✅" in r)]
+                other_rules = [r for r in response['reasoning_trace'] if r.strip() and r not in critical_rules + warning_rules + optimal_rules]
                 
-                # Show detailed rule firing in expandable section
-                with st.expander("🔍 View Detailed Rule Firing Sequence", expanded=False):
-                    st.markdown("**How the inference engine analyzed your data:**")
-                    
-                    # Organize rules by category
-                    critical_rules = [r for r in response['reasoning_trace'] if r.strip() and ("🚨" in r or "CRITICAL" in r)]
-                    warning_rules = [r for r in response['reasoning_trace'] if r.strip() and "⚠️" in r and "🚨" not in r]
-                    optimal_rules = [r for r in response['reasoning_trace'] if r.strip() and ("✓" in r or "✅" in r)]
-                    other_rules = [r for r in response['reasoning_trace'] if r.strip() and r not in critical_rules + warning_rules + optimal_rules]
-                    
-                    if critical_rules:
-                        st.markdown("**🚨 Critical Patterns Detected:**")
-                        for rule in critical_rules:
-                            st.markdown(f"- {rule}")
-                        st.markdown("")
-                    
-                    if warning_rules:
-                        st.markdown("**⚠️ Warning Patterns Detected:**")
-                        for rule in warning_rules:
-                            st.markdown(f"- {rule}")
-                        st.markdown("")
-                    
-                    if optimal_rules:
-                        st.markdown("**✅ Positive Patterns Detected:**")
-                        for rule in optimal_rules:
-                            st.markdown(f"- {rule}")
-                        st.markdown("")
-                    
-                    if other_rules:
-                        st.markdown("**🔍 Additional Inferences:**")
-                        for rule in other_rules:
-                            st.markdown(f"- {rule}")
-                    
-                    # Show inferred facts
-                    if response.get('inferred_facts'):
-                        st.markdown("---")
-                        st.markdown("**🎯 Patterns Identified:**")
-                        for fact in response['inferred_facts']:
-                            st.markdown(f"✓ `{fact}`")
+                if critical_rules:
+                    st.markdown("**🚨 Critical Patterns Detected:**")
+                    for rule in critical_rules:
+                        st.markdown(f"- {rule}")
+                    st.markdown("")
+                
+                if warning_rules:
+                    st.markdown("**⚠️ Warning Patterns Detected:**")
+                    for rule in warning_rules:
+                        st.markdown(f"- {rule}")
+                    st.markdown("")
+                
+                if optimal_rules:
+                    st.markdown("**✅ Positive Patterns Detected:**")
+                    for rule in optimal_rules:
+                        st.markdown(f"- {rule}")
+                    st.markdown("")
+                
+                if other_rules:
+                    st.markdown("**🔍 Additional Inferences:**")
+                    for rule in other_rules:
+                        st.markdown(f"- {rule}")
+                
+                # Show inferred facts
+                if response.get('inferred_facts'):
+                    st.markdown("---")
+                    st.markdown("**🎯 Patterns Identified:**")
+                    for fact in response['inferred_facts']:
+                        st.markdown(f"✓ `{fact}`")
         
         # Display explanation
         if response.get('explanation'):
@@ -679,11 +881,10 @@ def display_study_guide_response(response):
         if response.get('recommendation'):
             st.markdown("### ✅ Personalized Recommendations")
             
-            # Show original expert system recommendations
-            with st.spinner("🤖 Refining recommendations with AI..."):
-                # Refine with LLM
-                refined = refine_study_guide_with_llm(response)
-                st.markdown(refined)
+            # Refined with LLM (filled in once the call completes)
+            refined_placeholder = st.empty()
+            refined_placeholder.caption("🤖 Refining recommendations with AI...")
+            llm_sections['refinement'] = (refined_placeholder, 'markdown')
         
         # Display examples
         if response.get('examples') and len(response['examples']) > 0:
@@ -703,6 +904,10 @@ def display_study_guide_response(response):
                 st.markdown("**How the system arrived at this conclusion:**")
                 for step in response['reasoning_trace']:
                     st.markdown(f"- {step}")
+        
+        # Run both LLM calls at once; each placeholder is filled as its call completes
+        if llm_sections:
+            run_study_guide_llm_calls(response, llm_sections)
     else:
         st.markdown(str(response))
         if st.button("How does respiration work?"):
@@ -710,21 +915,35 @@ def display_study_guide_response(response):
             st.rerun()
 
 
-def refine_study_guide_with_llm(response: dict) -> str:
+def refine_study_guide_with_llm(response: dict, warnings: list = None, session_id: str = None) -> str:
     """
     Refine study guide recommendations using LLM to make them more personalized and actionable.
     
     Args:
         response: The expert system response dictionary
+        warnings: If given, failure messages are appended here instead of shown with
+            st.warning (required when called from a worker thread)
+        session_id: Session the call's tokens are counted against (its budget
+            spent: the expert system recommendations are returned as they are)
         
     Returns:
         Refined recommendation text
     """
-    from openai import OpenAI
-    import os
+    # Reuse text already refined for an identical expert response (any session)
+    cache_key = LLM_CACHE.fingerprint(
+        "study_guide_refinement",
+        {field: response.get(field) for field in REFINEMENT_FIELDS},
+        STUDY_GUIDE_PROMPT_VERSION
+    )
+    cached = LLM_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    if budget_exhausted('study_guide_refinement', session_id):
+        return response.get('recommendation', '')
     
-    # Get OpenAI client
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    # Shared, connection-pooled OpenAI client
+    client = get_openai_client()
     
     # Extract information from response
     category = response.get('concept', 'Study Guidance')
@@ -799,32 +1018,50 @@ Refined Recommendations:"""
             temperature=0.7,
             max_tokens=800
         )
+        record_usage('study_guide_refinement', completion, session_id=session_id)
         
         refined_text = completion.choices[0].message.content.strip()
+        LLM_CACHE.put(cache_key, refined_text)
         return refined_text
         
     except Exception as e:
         # Fallback to original recommendations if LLM fails
-        st.warning(f"Could not refine recommendations with AI: {str(e)}")
+        METRICS.inc('llm_errors_total', stage='study_guide_refinement', error=type(e).__name__)
+        message = f"Could not refine recommendations with AI: {str(e)}"
+        if warnings is None:
+            st.warning(message)
+        else:
+            warnings.append(message)
         return recommendations
 
 
-def generate_reasoning_explanation(response: dict) -> str:
+def generate_reasoning_explanation(response: dict, session_id: str = None) -> str:
     """
     Generate LLM-powered step-by-step explanation of the inference process.
     Shows which rules fired and why specific recommendations were chosen.
     
     Args:
         response: The expert system response dictionary
+        session_id: Session the call's tokens are counted against (its budget
+            spent: the structured explanation is returned)
         
     Returns:
         Detailed step-by-step reasoning explanation
     """
-    from openai import OpenAI
-    import os
+    cache_key = LLM_CACHE.fingerprint(
+        "study_guide_reasoning",
+        {field: response.get(field) for field in REASONING_FIELDS},
+        STUDY_GUIDE_PROMPT_VERSION
+    )
+    cached = LLM_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # Get OpenAI client
-    client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    if budget_exhausted('reasoning_explanation', session_id):
+        return fallback_reasoning_explanation(response)
+    
+    # Shared, connection-pooled OpenAI client
+    client = get_openai_client()
     
     # Extract analysis information
     fired_rules = response.get('fired_rules', [])
@@ -929,19 +1166,115 @@ Present as a flowing narrative that connects: Input Data → Rules Fired → Pat
             temperature=0.3,  # Lower temperature for factual explanation
             max_tokens=400  # Increased for detailed explanation
         )
+        record_usage('reasoning_explanation', completion, session_id=session_id)
         
-        return completion.choices[0].message.content.strip()
+        reasoning = completion.choices[0].message.content.strip()
+        LLM_CACHE.put(cache_key, reasoning)
+        return reasoning
     
     except Exception as e:
         # Fallback to structured explanation if LLM fails
-        fallback = f"**Analysis of Your Profile:**\n\n"
-        fallback += f"Your input data: {', '.join([f'{k}={v}' for k, v in user_profile.items() if v is not None])}\n\n"
-        fallback += f"**Rules Triggered:**\n"
-        for rule in reasoning_trace[:5]:
-            if rule.strip():
-                fallback += f"• {rule}\n"
-        fallback += f"\n**Result:** {diagnosis}"
-        return fallback
+        METRICS.inc('llm_errors_total', stage='reasoning_explanation', error=type(e).__name__)
+        return fallback_reasoning_explanation(response)
+
+
+def fallback_reasoning_explanation(response: dict) -> str:
+    """Structured reasoning explanation built from the expert system response alone (no LLM)."""
+    user_profile = response.get('user_profile', {})
+    reasoning_trace = response.get('reasoning_trace', [])
+    diagnosis = response.get('diagnosis', '')
+    
+    fallback = f"**Analysis of Your Profile:**\n\n"
+    fallback += f"Your input data: {', '.join([f'{k}={v}' for k, v in user_profile.items() if v is not None])}\n\n"
+    fallback += f"**Rules Triggered:**\n"
+    for rule in reasoning_trace[:5]:
+        if rule.strip():
+            fallback += f"• {rule}\n"
+    fallback += f"\n**Result:** {diagnosis}"
+    return fallback
+
+
+def _timed_llm_call(func, response: dict, session_id: str, **kwargs):
+    """Worker-thread body: run one study guide LLM call and measure it (no Streamlit calls here)."""
+    start = time.perf_counter()
+    text = func(response, session_id=session_id, **kwargs)
+    return text, time.perf_counter() - start
+
+
+def run_study_guide_llm_calls(response: dict, sections: dict, timeout: float = STUDY_GUIDE_LLM_TIMEOUT) -> dict:
+    """
+    Run the study guide LLM calls concurrently and render each one as soon as it completes.
+    
+    The calls run on STUDY_GUIDE_LLM_EXECUTOR and never touch Streamlit; their
+    results are written into the placeholders from the script thread. Calls
+    still running when the shared timeout expires are shown with their expert
+    system fallback (a late result still reaches LLM_CACHE for the next rerun).
+    
+    Args:
+        response: The expert system response dictionary
+        sections: Call name ('reasoning' / 'refinement') -> (placeholder, render method name)
+        timeout: Shared deadline in seconds for all calls
+        
+    Returns:
+        Timing record: concurrent wall time, per-call times and their sum (the sequential equivalent)
+    """
+    # name -> (LLM call, expert system fallback, token usage/metrics stage, call reports failures as warnings)
+    calls = {
+        'reasoning': (generate_reasoning_explanation, fallback_reasoning_explanation, 'reasoning_explanation', False),
+        'refinement': (refine_study_guide_with_llm, lambda r: r.get('recommendation', ''), 'study_guide_refinement', True)
+    }
+    
+    start = time.perf_counter()
+    deadline = start + timeout
+    session_id = st.session_state.get('session_id')
+    warnings = {name: [] for name in sections}
+    pending = {
+        STUDY_GUIDE_LLM_EXECUTOR.submit(_timed_llm_call, calls[name][0], response, session_id,
+                                        **({'warnings': warnings[name]} if calls[name][3] else {})): name
+        for name in sections
+    }
+    
+    def render(name, text):
+        placeholder, method = sections[name]
+        with placeholder.container():
+            for message in warnings[name]:
+                st.warning(message)
+            getattr(st, method)(text)
+    
+    call_times = {}
+    while pending:
+        done, _ = wait(pending, timeout=max(0.0, deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            name = pending.pop(future)
+            try:
+                text, call_times[name] = future.result()
+            except Exception as e:
+                warnings[name].append(f"AI {name} failed: {str(e)}")
+                METRICS.inc('llm_errors_total', stage=calls[name][2], error=type(e).__name__)
+                text, call_times[name] = calls[name][1](response), time.perf_counter() - start
+            render(name, text)
+    
+    # Shared timeout expired: show the expert system output for the remaining calls
+    timed_out = sorted(pending.values())
+    for name in timed_out:
+        warnings[name].append(f"AI {name} timed out after {timeout:.0f}s; showing the expert system output.")
+        call_times[name] = timeout
+        METRICS.inc('llm_errors_total', stage=calls[name][2], error='timeout')
+        render(name, calls[name][1](response))
+    
+    timing = {
+        'wall_time': time.perf_counter() - start,
+        'sequential_time': sum(call_times.values()),
+        'call_times': call_times,
+        'timed_out': timed_out
+    }
+    st.session_state.study_guide_llm_timing = timing
+    log.info("study_guide_llm_calls", wall_s=timing['wall_time'], sequential_s=timing['sequential_time'],
+             timed_out=",".join(timed_out) or None,
+             **{f"{name}_s": seconds for name, seconds in call_times.items()})
+    return timing
 
 
 if __name__ == "__main__":
@@ -0,0 +1,32 @@
+"""
+Test Configuration
+------------------
+Puts the repository root on ``sys.path`` (the modules are imported as
+top-level packages, like ``python -m``) and keeps test output quiet.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.log import set_log_level  # noqa: E402
+
+set_log_level("WARNING")
+
+
+import pytest  # noqa: E402
+
+from benchmarks.fake_llm import install_fake_llm  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_llm():
+    """Offline OpenAI client (benchmarks/fake_llm.py) for every get_openai_client() caller."""
+    return install_fake_llm(latency=0)
+
+
+@pytest.fixture
+def expert_agent(fake_llm):
+    from agents.expert_agent import ExpertAgent
+    return ExpertAgent()
@@ -0,0 +1,48 @@
+"""
+Tutoring API Tests
+------------------
+Requests sent straight to the ASGI application (no server) with the offline LLM.
+"""
+
+import asyncio
+import json
+
+from agents.agent_pool import AgentPool
+from api.asgi import TutorAPI, public_result
+from core.session_store import SQLiteSessionStore
+
+QUERY = "What is photosynthesis?"
+
+
+def call(app, method, path, body):
+    """Run one HTTP request through the app and return (status, JSON payload)."""
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode(), 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({'type': 'http', 'method': method, 'path': path, 'headers': []}, receive, send))
+    status = sent[0]['status']
+    payload = b''.join(message.get('body', b'') for message in sent[1:])
+    return status, json.loads(payload)
+
+
+def test_public_result_keeps_concepts(expert_agent):
+    result = expert_agent.process_query(QUERY)
+    expected = [data['concept'] for data in result['raw_expert_response']]
+    assert expected
+    assert public_result(result, None)['concepts'] == expected
+
+
+def test_tutor_query_returns_concepts(fake_llm, expert_agent):
+    pool = AgentPool(size=1, store=SQLiteSessionStore(":memory:"), factory=lambda: expert_agent)
+    app = TutorAPI(pool=pool, max_workers=1)
+
+    status, payload = call(app, 'POST', '/v1/tutor/query', {'session_id': 'api-test', 'query': QUERY})
+    assert status == 200
+    assert payload['success']
+    assert payload['concepts']
@@ -0,0 +1,56 @@
+"""
+Bulk Runner Tests
+-----------------
+Question IDs of the input file and output records of processed questions.
+"""
+
+import json
+
+from agents.bulk_runner import BulkRunner, read_questions
+
+
+def test_read_questions_keeps_falsy_ids(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    lines = [{'id': 0, 'question': "a"}, {'id': "", 'question': "b"},
+             {'id': None, 'question': "c"}, {'question': "d"}]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n", encoding='utf-8')
+
+    ids = [question_id for question_id, _ in read_questions(str(path), done=set())]
+    assert ids == ["0", "", "line-3", "line-4"]
+    assert [qid for qid, _ in read_questions(str(path), done={"0"})] == ["", "line-3", "line-4"]
+
+
+def test_process_keeps_concepts(expert_agent):
+    runner = BulkRunner(concurrency=1, rate=0, agent_factory=lambda: expert_agent)
+    output = runner.process("q1", {'question': "What is photosynthesis?"})
+    assert output['status'] == 'ok'
+    assert output['concepts']
+
+
+def test_reset_agents_start_a_new_token_budget(expert_agent, monkeypatch):
+    from utils.token_usage import TOKEN_USAGE
+
+    monkeypatch.setattr(TOKEN_USAGE, 'session_budget', 1)
+    runner = BulkRunner(concurrency=1, rate=0, agent_factory=lambda: expert_agent)
+    before = TOKEN_USAGE.process_tokens()
+    runner.process("q1", {'question': "What is photosynthesis?"})
+    spent = TOKEN_USAGE.process_tokens() - before
+    assert spent
+    assert TOKEN_USAGE.over_budget(expert_agent.conversation_history.session_id)
+
+    runner.process("q2", {'question': "What is photosynthesis?"})
+    assert TOKEN_USAGE.process_tokens() - before == 2 * spent
+
+
+def test_read_questions_turns_non_objects_into_errors(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text('42\n[1, 2]\n"What is an atom?"\nnull\n', encoding='utf-8')
+
+    records = dict(read_questions(str(path), done=set()))
+    assert records['line-3'] == {'question': "What is an atom?"}
+    for question_id in ("line-1", "line-2", "line-4"):
+        assert records[question_id]['question'] is None
+        assert 'line' in records[question_id]['error']
+
+    runner = BulkRunner(concurrency=1, rate=0, agent_factory=object)
+    assert runner.process("line-1", records['line-1'])['status'] == 'error'
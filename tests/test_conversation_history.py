@@ -0,0 +1,31 @@
+"""
+Conversation History Tests
+--------------------------
+Turn records built from real ExpertAgent results (offline LLM).
+"""
+
+from agents.conversation_history import ConversationHistory, TurnRecord
+
+QUERY = "What is photosynthesis?"
+
+
+def test_turn_record_keeps_concepts(expert_agent):
+    result = expert_agent.process_query(QUERY)
+    expected = tuple(data['concept'] for data in result['raw_expert_response'])
+    assert expected
+
+    record = TurnRecord.from_result(QUERY, result)
+    assert record.concepts == expected
+    assert TurnRecord.from_dict(record.to_dict()).concepts == expected
+    assert expert_agent.conversation_history.recent(1)[0].concepts == expected
+
+
+def test_spilled_turns_keep_concepts(expert_agent, tmp_path):
+    result = expert_agent.process_query(QUERY)
+    history = ConversationHistory(max_items=1, spill_dir=str(tmp_path))
+    history.add(QUERY, result)
+    history.add(QUERY, result)
+
+    spilled = history.load_spilled()
+    assert len(spilled) == 1
+    assert spilled[0]['concepts'] == [data['concept'] for data in result['raw_expert_response']]
@@ -0,0 +1,52 @@
+"""
+Conversation Memory Tests
+-------------------------
+Size cap of the LLM context built from recent turns (core/memory.py).
+"""
+
+from core.memory import ConversationMemory
+
+
+def memory_with_turns(questions, max_context_chars):
+    memory = ConversationMemory(max_context_chars=max_context_chars)
+    for question in questions:
+        memory.start_turn(question)
+        memory.complete_turn("An answer.", subject="biology")
+    return memory
+
+
+def test_short_context_keeps_every_turn():
+    memory = memory_with_turns(["What is a cell?", "What is DNA?", "What is RNA?"], max_context_chars=10_000)
+    context = memory.get_full_context_for_llm(n=3)
+    assert context.startswith("Previous conversation:")
+    assert all(f"--- Turn {i} ---" in context for i in (1, 2, 3))
+    assert context.index("What is a cell?") < context.index("What is DNA?") < context.index("What is RNA?")
+
+
+def test_oldest_turns_are_dropped_first():
+    questions = [f"Question number {i} about photosynthesis?" for i in range(6)]
+    uncapped = memory_with_turns(questions, max_context_chars=10_000).get_full_context_for_llm(n=6)
+    cap = len(uncapped) // 2
+    context = memory_with_turns(questions, max_context_chars=cap).get_full_context_for_llm(n=6)
+
+    assert len(context) <= cap
+    kept = [q for q in questions if q in context]
+    assert kept and kept == questions[len(questions) - len(kept):]
+    assert questions[0] not in context
+    assert "--- Turn 1 ---" in context  # renumbered from the oldest kept turn
+
+
+def test_newest_turn_is_truncated_when_it_alone_is_too_long():
+    memory = memory_with_turns(["short", "x" * 5_000], max_context_chars=300)
+    context = memory.get_full_context_for_llm(n=2)
+    assert len(context) <= 300
+    assert context.endswith("...")
+    assert "User: xxx" in context and "short" not in context
+
+
+def test_cached_context_is_rebuilt_after_a_turn():
+    memory = memory_with_turns(["What is a cell?"], max_context_chars=10_000)
+    assert "What is DNA?" not in memory.get_full_context_for_llm()
+    memory.start_turn("What is DNA?")
+    memory.complete_turn("An answer.")
+    assert "What is DNA?" in memory.get_full_context_for_llm()
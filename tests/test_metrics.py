@@ -0,0 +1,54 @@
+"""
+Metrics Tests
+-------------
+Prometheus export of registered component stats (utils/metrics.py).
+"""
+
+from utils.metrics import MetricsRegistry
+
+
+def collector_families(text):
+    """Metric name -> (TYPE, sample names in order) of a Prometheus export."""
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, current, kind = line.split()
+            assert current not in families, f"{current} declared twice"
+            families[current] = (kind, [])
+        elif line and not line.startswith('#'):
+            name = line.split('{')[0].split()[0]
+            if families[current][0] == 'histogram':
+                name = name.rsplit('_', 1)[0]  # _bucket/_sum/_count
+            assert name == current, f"{name} sample outside its family"
+            families[current][1].append(name)
+    return families
+
+
+def test_collector_families_are_contiguous_and_typed():
+    stats = {
+        'calls': 3,
+        'hit_rate': 0.5,
+        'by_stage': {'routing': {'calls': 2, 'total_tokens': 20}, 'enhance': {'calls': 1, 'total_tokens': 10}},
+        'budget_fallbacks': {'routing': 1},
+        'path': "ignored",
+    }
+    registry = MetricsRegistry(enabled=True)
+    registry.register_collector('tokens', lambda: stats, labels={'by_stage': 'stage', 'budget_fallbacks': 'stage'},
+                                counters=('calls', 'total_tokens', 'budget_fallbacks'))
+
+    families = collector_families(registry.prometheus_text())
+    assert families['edumentor_tokens_calls'] == ('counter', ['edumentor_tokens_calls'])
+    assert families['edumentor_tokens_hit_rate'][0] == 'untyped'
+    assert families['edumentor_tokens_by_stage_calls'] == ('counter', ['edumentor_tokens_by_stage_calls'] * 2)
+    assert families['edumentor_tokens_by_stage_total_tokens'][0] == 'counter'
+    assert families['edumentor_tokens_budget_fallbacks'][0] == 'counter'
+    assert not any('path' in name for name in families)
+
+
+def test_process_metrics_export_is_well_formed():
+    from utils.metrics import METRICS
+
+    families = collector_families(METRICS.prometheus_text())
+    assert families['edumentor_llm_cache_hits'][0] == 'counter'
+    assert families['edumentor_llm_cache_entries'][0] == 'untyped'
+    assert families['edumentor_token_usage_prompt_tokens'][0] == 'counter'
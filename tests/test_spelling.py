@@ -0,0 +1,81 @@
+"""
+Spelling Correction Tests
+-------------------------
+The SymSpell index (utils/spelling.py) and the query correction of ExpertAgent.
+"""
+
+import pytest
+
+from utils.spelling import SpellingIndex, load_word_list, word_stems
+
+
+def corrected_words(agent, query):
+    return {c['original']: c['corrected'] for c in agent._correct_spelling(query)[1]}
+
+
+def test_english_words_are_known():
+    words = load_word_list()
+    assert {'newton', 'attract', 'compare', 'magnet', 'float', 'france', 'said', 'purr'} <= words
+    assert 'ignored' not in words  # only in the header comment
+
+
+def test_inflected_known_words_are_not_corrected():
+    index = SpellingIndex({'law': 5, 'compared': 1}, known_words={'compare', 'magnet'})
+    assert 'law' in set(word_stems('laws'))
+    for word in ('laws', 'magnets', 'compare', 'compares', 'comparing'):
+        assert index.lookup(word) is None, word
+
+
+def test_non_domain_targets_are_one_edit_away():
+    index = SpellingIndex({'tract': 1, 'mitosis': 1, 'photosynthesis': 1}, domain_words={'photosynthesis'},
+                          same_first_letter=False)
+    assert index.lookup('attract') is None
+    assert index.lookup('mitosys') == ('mitosis', 1)
+    assert index.lookup('fotosynthesis') == ('photosynthesis', 2)
+
+
+def test_targets_keep_the_first_letter():
+    index = SpellingIndex({'range': 1, 'photosynthesis': 1}, domain_words={'range', 'photosynthesis'})
+    assert index.lookup('france') is None
+    assert index.lookup('fotosynthesis') is None
+    assert index.lookup('photosynthesys') == ('photosynthesis', 1)
+
+
+@pytest.mark.parametrize('query', [
+    "explain newton's laws of motion",
+    "why do magnets attract iron",
+    "compare mitosis and meiosis",
+    "why do objects float or sink in water",
+    "what is the capital of france",
+    "who was isaac newton",
+    "how far is mars from the sun",
+    "where is brazil on the map",
+    "why is the arctic cold in winter",
+    "my teacher said enzymes are proteins",
+    "i read that planets orbit the sun",
+    "write notes on the water cycle",
+    "why do cats purr and dogs pant",
+    "what did darwin discover about evolution",
+])
+def test_correct_words_are_left_alone(expert_agent, query):
+    assert expert_agent._correct_spelling(query) == (query, [])
+
+
+def test_misspellings_are_corrected(expert_agent):
+    assert corrected_words(expert_agent, "what is photosynthesys and respiraton") == {
+        'photosynthesys': 'photosynthesis', 'respiraton': 'respiration'}
+    assert corrected_words(expert_agent, "what is the functon of the kidny") == {
+        'functon': 'function', 'kidny': 'kidney'}
+
+
+def test_corrections_only_move_towards_topics(expert_agent):
+    # 'mitosis' is a real word but not a topic word: rewriting 'mitosys' would not score higher
+    assert corrected_words(expert_agent, "what is mitosys") == {}
+
+
+def test_confirmation_result_has_spelling_corrections(expert_agent):
+    expert_agent.last_offered_topic = 'photosynthesis'
+    expert_agent.last_tool_used = 'biology_expert'
+    result = expert_agent.process_query("yes")
+    assert result['analysis']['route'] == 'confirmation'
+    assert result['spelling_corrections'] == []
@@ -0,0 +1,28 @@
+"""
+Compiled Study Guide Evaluator Tests
+------------------------------------
+Differential check of experts/study_guide_compiled.py against the Experta
+engine on a sample of the Study Guide input grid (the whole grid is
+``python -m experts.study_guide_compiled``).
+"""
+
+from experts.study_guide_compiled import get_compiled_rules, verify_against_engine
+from experts.study_guide_expert import StudyGuideExpert
+
+
+def test_sampled_grid_matches_experta():
+    result = verify_against_engine(sample=600, seed=28)
+
+    assert result['checked'] == 600
+    assert result['mismatches'] == []
+
+
+def test_condition_mask_matches_derived_conditions():
+    expert = StudyGuideExpert(evaluator="compiled")
+    expert.process_query_with_inputs("Sleep", "How can I sleep better?", study_hours=11,
+                                     stress_level=9, sleep_hours=3, has_upcoming_exam=True)
+
+    ruleset = get_compiled_rules(StudyGuideExpert)
+    assert sorted(ruleset.condition_names(expert.active_conditions)) == expert.get_derived_conditions()
+    assert expert._has_condition("critical_burnout_imminent")
+    assert not expert._has_condition("optimal_sleep")
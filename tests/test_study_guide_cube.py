@@ -0,0 +1,49 @@
+"""
+Decision Cube Tests
+-------------------
+Answers served from experts/study_guide_cube.py must match live inference.
+The cube is built for one category to keep the test fast; the shipped cube
+is checked with ``python -m experts.study_guide_cube verify``.
+"""
+
+import pytest
+
+from experts.study_guide_cube import DecisionCube
+from experts.study_guide_expert import StudyGuideExpert
+
+
+@pytest.fixture(scope="module")
+def cube():
+    return DecisionCube.build(categories=["sleep"])
+
+
+def _expert(cube=None):
+    expert = StudyGuideExpert(evaluator="compiled", use_cube=cube is not None)
+    expert.decision_cube = cube
+    expert.enable_profiling(False)
+    return expert
+
+
+def test_cube_matches_engine(cube):
+    assert cube.verify(sample=2000, seed=31) == []
+
+
+def test_served_response_has_the_full_shape(cube):
+    inputs = dict(category="Sleep", question="Why am I always tired?", study_hours=9,
+                  stress_level=7, learning_style="Visual", has_upcoming_exam=True, sleep_hours=4)
+    live = _expert().process_query_with_inputs(**inputs)
+
+    assert cube.lookup("Sleep", 9, 7, "Visual", True, 4) is not None
+    served = _expert(cube).process_query_with_inputs(**inputs)
+    assert served == live
+
+
+@pytest.mark.parametrize("inputs", [
+    dict(category="Sleep", sleep_hours=6.5),  # off the hour grid
+    dict(category="Memory", sleep_hours=6),   # category not in this cube
+])
+def test_off_grid_inputs_fall_back_to_live_inference(cube, inputs):
+    assert cube.lookup(inputs["category"], sleep_hours=inputs["sleep_hours"]) is None
+
+    expected = _expert().process_query_with_inputs(question="How can I improve?", **inputs)
+    assert _expert(cube).process_query_with_inputs(question="How can I improve?", **inputs) == expected
@@ -0,0 +1,53 @@
+"""
+Token Usage Tests
+-----------------
+Session and process budgets of the token ledger and merging of stored usage
+(utils/token_usage.py).
+"""
+
+from utils.token_usage import COUNT_FIELDS, TokenLedger
+
+
+def counts(total, prompt=None):
+    prompt = total // 2 if prompt is None else prompt
+    return {'prompt_tokens': prompt, 'completion_tokens': total - prompt, 'total_tokens': total}
+
+
+def test_session_budget_is_per_session():
+    ledger = TokenLedger(session_budget=100, process_budget=0)
+    ledger.record('routing', counts(60), session_id='a')
+    assert not ledger.over_budget('a')
+    ledger.record('enhancement', counts(40), session_id='a')
+    assert ledger.over_budget('a')
+    assert not ledger.over_budget('b')
+    assert not ledger.over_budget(None)
+
+
+def test_process_budget_applies_to_every_session():
+    ledger = TokenLedger(session_budget=0, process_budget=100)
+    ledger.record('routing', counts(100))
+    assert ledger.over_budget('a')
+    assert ledger.over_budget(None)
+
+
+def test_zero_budgets_are_unlimited():
+    ledger = TokenLedger(session_budget=0, process_budget=0)
+    ledger.record('routing', counts(10 ** 9), session_id='a')
+    assert not ledger.over_budget('a')
+
+
+def test_restore_keeps_the_larger_count_per_field():
+    ledger = TokenLedger(session_budget=0, process_budget=0)
+    ledger.record('routing', counts(30, prompt=20), session_id='a')  # recorded here, not saved yet
+    stored = {'routing': {'calls': 3, 'prompt_tokens': 10, 'completion_tokens': 50, 'total_tokens': 60},
+              'synthesis': {'calls': 1, 'prompt_tokens': 5, 'completion_tokens': 5, 'total_tokens': 10}}
+    ledger.restore('a', stored)
+
+    usage = ledger.export('a')
+    assert usage['routing'] == {'calls': 3, 'prompt_tokens': 20, 'completion_tokens': 50, 'total_tokens': 60}
+    assert usage['synthesis'] == stored['synthesis']
+    assert set(usage['routing']) == set(COUNT_FIELDS)
+
+    ledger.restore('a', stored)  # restoring the same state again changes nothing
+    assert ledger.export('a') == usage
+    assert ledger.session_tokens('a') == 70
@@ -0,0 +1,66 @@
+"""
+Tracing Tests
+-------------
+Span nesting and the ``timings`` dict of request traces (utils/tracing.py).
+"""
+
+import time
+
+from utils.tracing import TRACE_HISTOGRAMS, current_trace, span, start_trace
+
+TIMINGS_KEYS = {'total_ms', 'stages_ms', 'spans', 'tokens'}
+TOKEN_KEYS = {'prompt_tokens', 'completion_tokens', 'total_tokens', 'by_stage'}
+
+
+def test_nested_spans_are_contained_and_ordered_by_start():
+    with start_trace('test_nesting') as trace:
+        with span('outer', subject='biology') as outer:
+            time.sleep(0.002)
+            with span('inner'):
+                time.sleep(0.002)
+            outer['tool'] = 'biology_expert'
+    timings = trace.to_dict()
+
+    assert [record['name'] for record in timings['spans']] == ['outer', 'inner']
+    outer, inner = timings['spans']
+    assert outer['subject'] == 'biology' and outer['tool'] == 'biology_expert'
+    assert outer['start_ms'] <= inner['start_ms']
+    assert inner['start_ms'] + inner['duration_ms'] <= outer['start_ms'] + outer['duration_ms']
+    assert outer['duration_ms'] <= timings['total_ms']
+
+
+def test_nested_trace_reuses_the_outer_one():
+    with start_trace('test_outer') as outer:
+        with start_trace('test_inner') as inner:
+            assert inner is outer
+        assert current_trace() is outer
+    assert current_trace() is None
+    snapshot = TRACE_HISTOGRAMS.snapshot()
+    assert snapshot['test_outer.total']['count'] >= 1
+    assert 'test_inner.total' not in snapshot
+
+
+def test_timings_shape_sums_repeated_spans_and_tokens():
+    with start_trace('test_shape') as trace:
+        for _ in range(2):
+            with span('routing'):
+                pass
+        trace.add_tokens('routing', {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15})
+        trace.add_tokens('routing', {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2})
+    timings = trace.to_dict()
+
+    assert set(timings) == TIMINGS_KEYS
+    assert set(timings['stages_ms']) == {'routing'}
+    assert timings['stages_ms']['routing'] == sum(record['duration_ms'] for record in timings['spans'])
+    assert set(timings['tokens']) == TOKEN_KEYS
+    assert timings['tokens']['total_tokens'] == 17
+    assert timings['tokens']['by_stage']['routing'] == {
+        'calls': 2, 'prompt_tokens': 11, 'completion_tokens': 6, 'total_tokens': 17}
+
+
+def test_agent_result_timings(expert_agent):
+    timings = expert_agent.process_query("What is photosynthesis?")['timings']
+    assert set(timings) == TIMINGS_KEYS
+    assert timings['stages_ms'] and all(ms >= 0 for ms in timings['stages_ms'].values())
+    assert set(timings['stages_ms']) == {record['name'] for record in timings['spans']}
+    assert set(timings['tokens']) == TOKEN_KEYS
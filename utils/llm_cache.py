@@ -0,0 +1,95 @@
+"""
+LLM Response Cache
+------------------
+Process-wide, bounded cache for LLM-generated text.
+
+Streamlit reruns the whole script on every widget interaction, so the study
+guide page used to repeat its LLM calls for a response it had already refined.
+Entries are keyed by a fingerprint of the inputs that feed the prompt plus a
+prompt version, so identical student profiles share the refined text across
+sessions and a prompt change invalidates old entries.
+
+Only successful completions should be stored; fallbacks produced when the LLM
+call fails are not cached.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config import LLM_CACHE_MAX_ENTRIES
+
+
+class LLMResponseCache:
+    """
+    Thread-safe LRU cache of LLM outputs.
+
+    Args:
+        max_entries: Maximum number of cached texts (least recently used are evicted)
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def fingerprint(kind: str, payload: Dict, prompt_version) -> str:
+        """
+        Stable key for a prompt's inputs.
+
+        Args:
+            kind: Which prompt the text belongs to (e.g. "study_guide_refinement")
+            payload: The values the prompt is built from (JSON-serializable)
+            prompt_version: Version of the prompt template
+        """
+        canonical = json.dumps([kind, prompt_version, payload], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached text (None on a miss)."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """Store a text, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Cache counters for reporting."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# Process-wide cache shared by all Streamlit sessions
+LLM_CACHE = LLMResponseCache()
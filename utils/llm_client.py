@@ -0,0 +1,222 @@
+"""
+LLM Client
+----------
+Process-wide LLM clients with connection pooling.
+
+The agent, the study guide helpers and the Gemini agents in ``core/`` used to
+build their own clients (the study guide ones on every call), paying a TLS
+handshake per request and never reusing a connection. ``get_openai_client()``
+returns one OpenAI client per process whose HTTP transport keeps connections
+alive and is bounded by the ``LLM_POOL_*`` settings in config.py;
+``configure_gemini()`` configures the Gemini SDK once.
+
+Pool usage (requests, in-flight peak, open and idle connections) is available
+from ``get_llm_client_stats()``.
+"""
+
+import os
+import threading
+import time
+from typing import Dict
+
+from config import LLM_POOL_MAX_CONNECTIONS, LLM_POOL_MAX_KEEPALIVE, LLM_POOL_KEEPALIVE_EXPIRY
+
+
+class PoolMetrics:
+    """Request counters for the pooled transport."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_time = 0.0
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self, elapsed: float, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_time += elapsed
+            if failed:
+                self.errors += 1
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for reporting."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'avg_request_time_ms': (self.total_time * 1000 / self.requests) if self.requests else 0.0
+            }
+
+
+def _build_metered_transport(limits, metrics: PoolMetrics):
+    """HTTP transport with the given pool limits that reports each request to ``metrics``."""
+    import httpx
+
+    class MeteredTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            metrics.started()
+            start = time.perf_counter()
+            failed = True
+            try:
+                response = super().handle_request(request)
+                failed = response.status_code >= 500
+                return response
+            finally:
+                metrics.finished(time.perf_counter() - start, failed)
+
+    return MeteredTransport(limits=limits)
+
+
+class LLMClientFactory:
+    """
+    Thread-safe, lazily created LLM clients shared by every call site.
+
+    Args:
+        max_connections: Upper bound on open connections to the LLM API
+        max_keepalive: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection stays open
+    """
+
+    def __init__(self, max_connections: int = LLM_POOL_MAX_CONNECTIONS,
+                 max_keepalive: int = LLM_POOL_MAX_KEEPALIVE,
+                 keepalive_expiry: float = LLM_POOL_KEEPALIVE_EXPIRY):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.metrics = PoolMetrics()
+        self._lock = threading.Lock()
+        self._openai_client = None
+        self._transport = None
+        self._gemini_configured = False
+        self._gemini_models: Dict[str, object] = {}
+
+    def get_openai_client(self):
+        """
+        Get the shared OpenAI client, creating it on first use.
+
+        Raises:
+            ValueError: If OPENAI_API_KEY is not set
+        """
+        if self._openai_client is not None:
+            return self._openai_client
+
+        with self._lock:
+            if self._openai_client is None:
+                api_key = os.getenv('OPENAI_API_KEY')
+                if not api_key:
+                    raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+                import httpx
+                from openai import OpenAI, DefaultHttpxClient
+
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry
+                )
+                self._transport = _build_metered_transport(limits, self.metrics)
+                self._openai_client = OpenAI(
+                    api_key=api_key,
+                    http_client=DefaultHttpxClient(transport=self._transport)
+                )
+            return self._openai_client
+
+    def set_openai_client(self, client):
+        """Replace the shared OpenAI client (e.g. with a stand-in for offline benchmarks)."""
+        with self._lock:
+            self._openai_client = client
+            self._transport = None
+
+    def configure_gemini(self) -> bool:
+        """
+        Configure the Gemini SDK once per process.
+
+        Returns:
+            True if Gemini is configured (False if GEMINI_API_KEY is missing)
+        """
+        if self._gemini_configured:
+            return True
+
+        with self._lock:
+            if not self._gemini_configured:
+                api_key = os.getenv('GEMINI_API_KEY')
+                if not api_key:
+                    return False
+
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self._gemini_configured = True
+            return True
+
+    def get_gemini_model(self, model_name: str):
+        """
+        Get a shared Gemini model handle, configuring the SDK if needed.
+
+        Raises:
+            ValueError: If GEMINI_API_KEY is not set
+        """
+        model = self._gemini_models.get(model_name)
+        if model is not None:
+            return model
+
+        if not self.configure_gemini():
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+        import google.generativeai as genai
+        with self._lock:
+            model = self._gemini_models.get(model_name)
+            if model is None:
+                model = self._gemini_models[model_name] = genai.GenerativeModel(model_name)
+            return model
+
+    def _pool_snapshot(self) -> Dict:
+        """Open/idle connection counts of the OpenAI transport's connection pool."""
+        pool = getattr(self._transport, '_pool', None)
+        connections = list(getattr(pool, 'connections', ()))
+        return {
+            'open_connections': len(connections),
+            'idle_connections': sum(1 for conn in connections if conn.is_idle())
+        }
+
+    def stats(self) -> Dict:
+        """Pool limits, request counters and current connection usage."""
+        stats = {
+            'openai_client': self._openai_client is not None,
+            'gemini_configured': self._gemini_configured,
+            'gemini_models': sorted(self._gemini_models),
+            'max_connections': self.max_connections,
+            'max_keepalive': self.max_keepalive,
+            'keepalive_expiry': self.keepalive_expiry
+        }
+        stats.update(self.metrics.to_dict())
+        stats.update(self._pool_snapshot())
+        return stats
+
+
+# Process-wide factory shared by every LLM call site
+LLM_CLIENTS = LLMClientFactory()
+
+
+def get_openai_client():
+    """Get the process-wide pooled OpenAI client (see LLMClientFactory.get_openai_client)."""
+    return LLM_CLIENTS.get_openai_client()
+
+
+def get_gemini_model(model_name: str):
+    """Get a shared Gemini model handle (see LLMClientFactory.get_gemini_model)."""
+    return LLM_CLIENTS.get_gemini_model(model_name)
+
+
+def get_llm_client_stats() -> Dict:
+    """Pool usage metrics of the process-wide LLM clients."""
+    return LLM_CLIENTS.stats()
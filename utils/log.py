@@ -0,0 +1,196 @@
+"""
+Structured Logging
+------------------
+Leveled, sampled, structured logging for the request hot paths.
+
+Every message is an event name plus key=value fields::
+
+    log = get_logger(__name__)
+    log.info("query_processed", tool="biology_expert", topics=2, ms=812.4)
+
+Records carry the current request context (session and request ID, set with
+``request_context()``) and are formatted as ``key=value`` text or JSON lines
+(``LOG_FORMAT``). Handlers run on a background thread behind a queue, so a
+request thread only pays for building the record, and disabled levels cost
+one comparison.
+
+The level comes from ``config.LOG_LEVEL`` (``DEBUG_MODE`` forces DEBUG).
+High-volume debug events can be logged with ``sampled=True``. They are then
+kept for a ``LOG_DEBUG_SAMPLE_RATE`` share of requests, which keeps all or none
+of a request's sampled events.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from config import DEBUG_MODE, LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE
+
+ROOT_LOGGER = "edumentor"
+
+_context: contextvars.ContextVar = contextvars.ContextVar('edumentor_log_context', default={})
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_request_id() -> str:
+    """Short random request ID."""
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def request_context(**fields) -> Iterator[Dict[str, Any]]:
+    """
+    Attach fields (e.g. session_id, request_id) to every record logged in the block.
+
+    Nested contexts add to (and may override) the enclosing one.
+    """
+    merged = {**_context.get(), **{k: v for k, v in fields.items() if v is not None}}
+    token = _context.set(merged)
+    try:
+        yield merged
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> Dict[str, Any]:
+    """Fields of the active request context."""
+    return _context.get()
+
+
+def _sampled_in(rate: float) -> bool:
+    """Sampling decision, stable for one request ID (random outside a request)."""
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    request_id = _context.get().get('request_id')
+    if request_id is None:
+        return random.random() < rate
+    return zlib.crc32(str(request_id).encode('utf-8')) % 10000 < rate * 10000
+
+
+class _ContextFilter(logging.Filter):
+    """Copies the request context onto the record (runs on the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _context.get()
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats event records as ``key=value`` text or as JSON lines."""
+
+    def __init__(self, fmt: str = LOG_FORMAT):
+        super().__init__()
+        self.json = fmt == "json"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, 'fields', {})
+        context = getattr(record, 'context', {})
+        if self.json:
+            payload = {
+                'ts': record.created,
+                'level': record.levelname.lower(),
+                'logger': record.name,
+                'event': record.getMessage(),
+                **context,
+                **fields
+            }
+            if record.exc_info:
+                payload['exc'] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str, ensure_ascii=False)
+
+        stamp = time.strftime('%H:%M:%S', time.localtime(record.created))
+        parts = [f"{stamp}.{int(record.msecs):03d}", f"{record.levelname:<7s}", record.name, record.getMessage()]
+        for key, value in {**context, **fields}.items():
+            if value is None:
+                continue
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            text = str(value)
+            parts.append(f"{key}={json.dumps(text, ensure_ascii=False) if ' ' in text or not text else text}")
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level: str = None, stream=None, fmt: str = None):
+    """
+    Install the queue-backed handler on the ``edumentor`` logger (once per process).
+
+    Calling it again changes the level; ``stream``/``fmt`` only apply the first time.
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    with _configure_lock:
+        if _listener is None:
+            handler = logging.StreamHandler(stream or sys.stderr)
+            handler.setFormatter(StructuredFormatter(fmt or LOG_FORMAT))
+            log_queue = queue.SimpleQueue()
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            queue_handler.addFilter(_ContextFilter())
+            root.addHandler(queue_handler)
+            root.propagate = False
+            _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+    root.setLevel((level or ("DEBUG" if DEBUG_MODE else LOG_LEVEL)).upper())
+
+
+def set_log_level(level: str):
+    """Change the level of every EduMentor logger (e.g. 'WARNING' in benchmarks)."""
+    configure_logging(level)
+
+
+class StructuredLogger:
+    """
+    Thin event-style wrapper around a ``logging.Logger``.
+
+    Args:
+        name: Logger name (nested under 'edumentor')
+    """
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def _log(self, level: int, event: str, fields: Dict[str, Any], exc_info=None):
+        if not self._logger.isEnabledFor(level):
+            return
+        self._logger.log(level, event, extra={'fields': fields}, exc_info=exc_info)
+
+    def debug(self, event: str, sampled: bool = False, **fields):
+        """Debug event; with ``sampled=True`` only kept for LOG_DEBUG_SAMPLE_RATE of requests."""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        if sampled and not DEBUG_MODE and not _sampled_in(LOG_DEBUG_SAMPLE_RATE):
+            return
+        self._logger.log(logging.DEBUG, event, extra={'fields': fields})
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Structured logger for a module (configures logging on first use)."""
+    if _listener is None:
+        configure_logging()
+    return StructuredLogger(name)
@@ -0,0 +1,341 @@
+"""
+Memory Diagnostics
+------------------
+Opt-in memory report for sessions, expert engines and process caches.
+
+Two complementary views:
+
+- Object sizing: ``deep_sizeof()`` walks an object graph (containers, instance
+  ``__dict__``/``__slots__``) and sums ``sys.getsizeof``. A report sizes the
+  registered caches, each pooled agent's expert engines and a session's
+  components with one shared "seen" set, so every figure is the memory *not
+  already counted* for an earlier component (shared KB records are counted
+  once, for the first engine that references them).
+- Allocation tracing: while tracing is on (``tracemalloc``, started at startup
+  when ``ENABLE_MEMORY_DIAGNOSTICS`` is set), ``snapshot()`` keeps the last
+  ``MEMORY_SNAPSHOTS_KEPT`` snapshots; the report lists the top allocation sites
+  of the latest one and the growth since the previous one.
+
+Tracing slows allocation-heavy code noticeably, so everything here stays off
+unless enabled. The process-wide ``MEMORY_DIAGNOSTICS`` is rendered in the
+Streamlit sidebar.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from config import MEMORY_TRACE_FRAMES, MEMORY_SNAPSHOTS_KEPT
+
+# Shared by the whole process: never attributed to a component
+_SKIPPED_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType, types.CodeType, types.FrameType
+)
+# Allocation sites left out of the lists (the tracing and import machinery)
+_NOISE_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>",
+                "<frozen importlib._bootstrap_external>", "<unknown>")
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+_SLOTS_BY_TYPE: Dict[type, tuple] = {}
+
+
+def _slots(cls: type) -> tuple:
+    """Slot names of a class and its bases (cached per class)."""
+    slots = _SLOTS_BY_TYPE.get(cls)
+    if slots is None:
+        names = []
+        for klass in cls.__mro__:
+            declared = getattr(klass, '__slots__', ())
+            names.extend([declared] if isinstance(declared, str) else declared)
+        slots = _SLOTS_BY_TYPE[cls] = tuple(name for name in names if name not in ('__dict__', '__weakref__'))
+    return slots
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None, max_objects: int = 2_000_000) -> Dict[str, int]:
+    """
+    Approximate memory reachable from ``obj``.
+
+    Args:
+        obj: Root object
+        seen: IDs already counted (shared between calls to avoid double counting)
+        max_objects: Stop walking after this many objects ('truncated' is then 1)
+
+    Returns:
+        {'bytes', 'objects', 'truncated'}
+    """
+    seen = set() if seen is None else seen
+    stack = [obj]
+    size = count = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIPPED_TYPES):
+            continue
+        seen.add(id(current))
+        count += 1
+        if count > max_objects:
+            return {'bytes': size, 'objects': count - 1, 'truncated': 1}
+        try:
+            size += sys.getsizeof(current)
+        except TypeError:
+            continue
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)) or current is None:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        else:
+            instance_dict = getattr(current, '__dict__', None)
+            if isinstance(instance_dict, dict):
+                stack.append(instance_dict)
+            for slot in _slots(type(current)):
+                value = getattr(current, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return {'bytes': size, 'objects': count, 'truncated': 0}
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MiB (None if unavailable)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return None
+
+
+def _without_noise(stats: list) -> list:
+    return [stat for stat in stats if stat.traceback[0].filename not in _NOISE_FILES]
+
+
+def _site(frame) -> str:
+    """``file:line`` relative to the project or to site-packages."""
+    filename = frame.filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f"{filename}:{frame.lineno}"
+
+
+class MemoryDiagnostics:
+    """
+    tracemalloc snapshots plus object sizes of registered components.
+
+    Args:
+        frames: Stack frames stored per traced allocation
+        snapshots_kept: Snapshots kept for growth comparisons
+    """
+
+    def __init__(self, frames: int = MEMORY_TRACE_FRAMES, snapshots_kept: int = MEMORY_SNAPSHOTS_KEPT):
+        self.frames = frames
+        self._snapshots: deque = deque(maxlen=max(2, snapshots_kept))
+        self._caches: Dict[str, Callable[[], Any]] = {}
+        self._sessions: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------- registration
+
+    def register_cache(self, name: str, getter: Callable[[], Any]):
+        """Size ``getter()`` under ``caches`` in every report (e.g. lambda: LLM_CACHE)."""
+        with self._lock:
+            self._caches[name] = getter
+
+    # ---------------------------------------------------------------- tracing
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Start tracing allocations (no-op if already tracing)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        """Stop tracing and drop the kept snapshots."""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def snapshot(self, label: str = None) -> Dict[str, Any]:
+        """
+        Take a tracemalloc snapshot and keep it for comparisons.
+
+        Returns:
+            {'label', 'time', 'traced_kib'} of the new snapshot
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is off (enable ENABLE_MEMORY_DIAGNOSTICS or call start())")
+        snap = tracemalloc.take_snapshot()
+        entry = {
+            'label': label or f"snapshot {len(self._snapshots) + 1}",
+            'time': time.time(),
+            'traced_kib': tracemalloc.get_traced_memory()[0] / 1024,
+            'snapshot': snap
+        }
+        with self._lock:
+            self._snapshots.append(entry)
+        return {key: entry[key] for key in ('label', 'time', 'traced_kib')}
+
+    def _statistics(self, entry: Dict[str, Any]) -> list:
+        """Per-line statistics of a kept snapshot (computed once)."""
+        if 'statistics' not in entry:
+            entry['statistics'] = _without_noise(entry['snapshot'].statistics('lineno'))
+        return entry['statistics']
+
+    def top_allocations(self, limit: int = 15) -> List[Dict[str, Any]]:
+        """Largest allocation sites of the latest snapshot."""
+        with self._lock:
+            if not self._snapshots:
+                return []
+            entry = self._snapshots[-1]
+        return [
+            {'site': _site(stat.traceback[0]), 'size_kib': stat.size / 1024, 'blocks': stat.count}
+            for stat in self._statistics(entry)[:limit]
+        ]
+
+    def growth(self, limit: int = 15, since_first: bool = False) -> Dict[str, Any]:
+        """
+        Allocation growth between the two latest snapshots (or the oldest kept and the latest).
+
+        Returns:
+            {'from', 'to', 'total_kib', 'sites': [{'site', 'size_diff_kib', 'size_kib', 'blocks_diff'}]}
+            with the sites sorted by absolute size change
+        """
+        with self._lock:
+            if len(self._snapshots) < 2:
+                return {}
+            before = self._snapshots[0] if since_first else self._snapshots[-2]
+            after = self._snapshots[-1]
+        sites: Dict[str, List[int]] = {}
+        for sign, entry in ((-1, before), (1, after)):
+            for stat in self._statistics(entry):
+                row = sites.setdefault(_site(stat.traceback[0]), [0, 0, 0])
+                row[0] += sign * stat.size
+                row[1] += sign * stat.count
+                if sign > 0:
+                    row[2] = stat.size
+        ranked = sorted(sites.items(), key=lambda item: -abs(item[1][0]))
+        return {
+            'from': before['label'],
+            'to': after['label'],
+            'total_kib': sum(row[0] for row in sites.values()) / 1024,
+            'sites': [
+                {'site': site, 'size_diff_kib': diff / 1024, 'size_kib': size / 1024, 'blocks_diff': blocks}
+                for site, (diff, blocks, size) in ranked[:limit] if diff
+            ]
+        }
+
+    # ----------------------------------------------------------------- sizing
+
+    def record_session(self, session_id: str, components: Dict[str, Any], seen: Optional[set] = None,
+                       max_sessions: int = 50) -> Dict[str, Any]:
+        """
+        Size one session's components and remember the figures (not the objects).
+
+        Args:
+            session_id: Session key
+            components: Name -> object (e.g. chat messages, the study guide expert)
+            seen: Shared "seen" set (objects already counted are not counted again)
+
+        Returns:
+            {'total_kib', 'components': {name: {'kib', 'objects'}}, 'time'}
+        """
+        seen = set() if seen is None else seen
+        sizes = {}
+        for name, obj in components.items():
+            size = deep_sizeof(obj, seen)
+            sizes[name] = {'kib': size['bytes'] / 1024, 'objects': size['objects']}
+        record = {'total_kib': sum(s['kib'] for s in sizes.values()), 'components': sizes, 'time': time.time()}
+        with self._lock:
+            self._sessions[session_id] = record
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > max_sessions:
+                self._sessions.popitem(last=False)
+        return record
+
+    def engine_sizes(self, agents: List[Any], seen: set) -> Dict[str, Dict[str, Any]]:
+        """Per pooled agent: each expert engine and the agent's conversation history."""
+        engines = {}
+        for i, agent in enumerate(agents):
+            for tool_name, expert in getattr(agent, 'tools', {}).items():
+                size = deep_sizeof(expert, seen)
+                engines[f"agent{i}.{tool_name}"] = {
+                    'kib': size['bytes'] / 1024,
+                    'objects': size['objects'],
+                    'facts': len(getattr(expert, 'facts', ()) or ()),
+                    'agenda': len(getattr(getattr(expert, 'agenda', None), 'activations', ()) or ())
+                }
+            history = getattr(agent, 'conversation_history', None)
+            if history is not None:
+                size = deep_sizeof(history, seen)
+                engines[f"agent{i}.conversation_history"] = {'kib': size['bytes'] / 1024, 'objects': size['objects']}
+        return engines
+
+    def report(self, agents: List[Any] = (), session: Optional[Dict[str, Any]] = None,
+               session_id: Optional[str] = None, top: int = 15) -> Dict[str, Any]:
+        """
+        Full memory report.
+
+        Args:
+            agents: Pooled agents to size (see AgentPool.idle_agents())
+            session: The current session's components, recorded under ``session_id``
+            top: Allocation sites listed
+
+        Returns:
+            rss_mb, tracemalloc totals, caches, engines, sessions (recent
+            records), top allocation sites and growth since the previous snapshot
+        """
+        seen: set = set()
+        with self._lock:
+            caches = dict(self._caches)
+        cache_sizes = {}
+        for name, getter in caches.items():
+            size = deep_sizeof(getter(), seen)
+            cache_sizes[name] = {'kib': size['bytes'] / 1024, 'objects': size['objects']}
+        engines = self.engine_sizes(list(agents), seen)
+        if session is not None and session_id is not None:
+            self.record_session(session_id, session, seen)
+
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+        with self._lock:
+            sessions = {sid: dict(record) for sid, record in reversed(self._sessions.items())}
+            snapshots = [{key: entry[key] for key in ('label', 'time', 'traced_kib')} for entry in self._snapshots]
+        return {
+            'rss_mb': rss_mb(),
+            'tracing': traced is not None,
+            'traced_kib': traced[0] / 1024 if traced else None,
+            'traced_peak_kib': traced[1] / 1024 if traced else None,
+            'caches': cache_sizes,
+            'engines': engines,
+            'sessions': sessions,
+            'snapshots': snapshots,
+            'top_allocations': self.top_allocations(top),
+            'growth': self.growth(top)
+        }
+
+
+# Process-wide diagnostics (sizes are only computed when a report is requested)
+MEMORY_DIAGNOSTICS = MemoryDiagnostics()
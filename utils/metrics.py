@@ -0,0 +1,333 @@
+"""
+Operational Metrics
+-------------------
+In-process metrics registry: counters, gauges and latency histograms, plus the
+``stats()`` of the process-wide components.
+
+Call sites record events on ``METRICS`` with labels, e.g.
+``METRICS.inc('queries_total', subject='biology', route='llm')``. Recording is
+a no-op when ``ENABLE_AGENT_STATISTICS`` is off. Components that already keep
+counters (LLM cache, token ledger, LLM client pool, agent pool, session store,
+KB loader) are registered as collectors and read when metrics are exported
+(fields that only grow, like cache hits, as counters); stage latencies come
+from ``TRACE_HISTOGRAMS`` (utils/tracing.py).
+
+Recorded metrics:
+    queries_total{subject, route}     Tutor queries by expert and routing path
+    llm_errors_total{stage, error}    Failed LLM calls (each answered by the stage's fallback)
+    agent_pool_wait_ms                Time requests waited for a pooled agent
+    spelling_corrections_total        Query words corrected before topic search
+
+Exports: ``snapshot()`` (JSON-serializable, for the Streamlit sidebar) and
+``prometheus_text()`` (Prometheus text format), served on a local port by
+``start_metrics_server()`` when ``METRICS_PORT`` is set and at ``GET /metrics``
+of the headless API.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from config import ENABLE_AGENT_STATISTICS, METRICS_HOST, METRICS_PORT
+from utils.llm_cache import LLM_CACHE
+from utils.llm_client import get_llm_client_stats
+from utils.log import get_logger
+from utils.token_usage import TOKEN_USAGE
+from utils.tracing import TRACE_HISTOGRAMS, LatencyHistogram
+
+log = get_logger(__name__)
+
+PREFIX = 'edumentor'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# name -> help text of the metrics recorded by call sites
+DESCRIPTIONS = {
+    'queries_total': "Tutor queries by subject expert and routing path",
+    'llm_errors_total': "LLM calls that failed and were answered by the stage's fallback",
+    'agent_pool_wait_ms': "Time a request waited for a pooled ExpertAgent (ms)",
+    'spelling_corrections_total': "Query words corrected against the KB vocabulary before topic search",
+    'stage_latency_ms': "Request trace span durations by pipeline and stage (ms)",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', '_'.join(part for part in parts if part))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in dict(labels).items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _histogram_lines(name: str, labels: Dict[str, str], histogram: Dict[str, Any]) -> List[str]:
+    """Prometheus ``_bucket``/``_sum``/``_count`` lines of a LatencyHistogram.to_dict()."""
+    lines = []
+    cumulative = 0
+    for bound, count in histogram['buckets'].items():
+        cumulative += count
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum_ms'])}")
+    lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+    return lines
+
+
+def _flatten(stats: Dict[str, Any], label_names: Dict[str, str], path: str = '',
+             labels: Optional[Dict[str, str]] = None) -> List[Tuple[str, Dict[str, str], float, str]]:
+    """
+    Numeric leaves of a stats() dict as (name, labels, value, stats key).
+
+    A nested dict listed in ``label_names`` is keyed by a label instead of by
+    name, e.g. {'by_stage': 'stage'} turns by_stage.routing.calls into
+    by_stage_calls{stage="routing"}. The stats key is the dict key holding the
+    value (``calls`` there, ``by_stage`` for a labelled dict of numbers).
+    Strings, lists and None are skipped.
+    """
+    rows = []
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            rows.append((_metric_name(path, key), labels or {}, float(value), key))
+        elif isinstance(value, (int, float)):
+            rows.append((_metric_name(path, key), labels or {}, value, key))
+        elif isinstance(value, dict):
+            label = label_names.get(key)
+            if label is None:
+                rows.extend(_flatten(value, label_names, _metric_name(path, key), labels))
+                continue
+            for item, nested in value.items():
+                item_labels = {**(labels or {}), label: str(item)}
+                if isinstance(nested, dict):
+                    rows.extend(_flatten(nested, label_names, _metric_name(path, key), item_labels))
+                elif isinstance(nested, (int, float)):
+                    rows.append((_metric_name(path, key), item_labels, nested, key))
+    return rows
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms with labels, plus collectors.
+
+    Args:
+        enabled: Record call-site metrics (collectors and stage latencies are
+            exported either way)
+    """
+
+    def __init__(self, enabled: bool = ENABLE_AGENT_STATISTICS):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, LatencyHistogram]] = {}
+        self._collectors: Dict[str, Tuple[Callable[[], Dict], Dict[str, str], FrozenSet[str]]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add ``value`` to a counter."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value_ms: float, **labels):
+        """Add a latency (ms) to a histogram."""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = LatencyHistogram()
+            histogram.observe(value_ms)
+
+    def register_collector(self, name: str, stats: Callable[[], Dict], labels: Optional[Dict[str, str]] = None,
+                           counters: Iterable[str] = ()):
+        """
+        Export a component's ``stats()`` dict under ``name``.
+
+        Args:
+            name: Metric name prefix (e.g. 'llm_cache')
+            stats: Callable returning the stats dict (called on every export)
+            labels: Nested dict key -> label name (see _flatten)
+            counters: Stats keys that only ever grow (exported as Prometheus
+                counters; other values are untyped)
+        """
+        with self._lock:
+            self._collectors[name] = (stats, labels or {}, frozenset(counters))
+
+    def _collect(self) -> Dict[str, Dict]:
+        with self._lock:
+            collectors = dict(self._collectors)
+        collected = {}
+        for name, (stats, _, _) in collectors.items():
+            try:
+                collected[name] = stats()
+            except Exception as e:
+                log.warning("metrics_collector_failed", collector=name, error=str(e))
+        return collected
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        JSON-serializable view of every metric.
+
+        Returns:
+            {'counters'/'gauges': {name: [{'labels', 'value'}]},
+             'histograms': {name: [{'labels', **LatencyHistogram.to_dict()}]},
+             'stage_latency_ms': TRACE_HISTOGRAMS.snapshot(),
+             'collected': {collector: stats()}}
+        """
+        with self._lock:
+            counters = {name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                        for name, series in sorted(self._counters.items())}
+            gauges = {name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                      for name, series in sorted(self._gauges.items())}
+            histograms = {name: [{'labels': dict(key), **histogram.to_dict()} for key, histogram in sorted(series.items())]
+                          for name, series in sorted(self._histograms.items())}
+        return {
+            'enabled': self.enabled,
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': histograms,
+            'stage_latency_ms': TRACE_HISTOGRAMS.snapshot(),
+            'collected': self._collect()
+        }
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name: str, kind: str, help_text: Optional[str]):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for kind in ('counters', 'gauges'):
+            for name, series in snapshot[kind].items():
+                metric = _metric_name(PREFIX, name)
+                header(metric, kind[:-1], DESCRIPTIONS.get(name))
+                lines.extend(f"{metric}{_format_labels(row['labels'])} {_format_value(row['value'])}" for row in series)
+
+        for name, series in snapshot['histograms'].items():
+            metric = _metric_name(PREFIX, name)
+            header(metric, 'histogram', DESCRIPTIONS.get(name))
+            for row in series:
+                lines.extend(_histogram_lines(metric, row['labels'], row))
+
+        if snapshot['stage_latency_ms']:
+            metric = _metric_name(PREFIX, 'stage_latency_ms')
+            header(metric, 'histogram', DESCRIPTIONS['stage_latency_ms'])
+            for key, histogram in snapshot['stage_latency_ms'].items():
+                trace, _, stage = key.partition('.')
+                lines.extend(_histogram_lines(metric, {'trace': trace, 'stage': stage}, histogram))
+
+        with self._lock:
+            collectors = dict(self._collectors)
+        # A family's samples must be contiguous, so rows are grouped by metric first
+        families = {}
+        for collector, stats in snapshot['collected'].items():
+            _, label_names, counters = collectors[collector]
+            for name, labels, value, key in _flatten(stats, label_names, collector):
+                metric = _metric_name(PREFIX, name)
+                if metric not in families:
+                    families[metric] = ('counter' if key in counters else 'untyped', [])
+                families[metric][1].append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+        for metric, (kind, samples) in families.items():
+            header(metric, kind, None)
+            lines.extend(samples)
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Drop recorded metrics (collectors stay registered)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+# Process-wide metrics registry
+METRICS = MetricsRegistry()
+METRICS.register_collector('llm_cache', LLM_CACHE.stats, counters=('hits', 'misses', 'evictions'))
+METRICS.register_collector('token_usage', TOKEN_USAGE.stats, labels={'by_stage': 'stage', 'budget_fallbacks': 'stage'},
+                           counters=('calls', 'prompt_tokens', 'completion_tokens', 'total_tokens', 'cost_usd',
+                                     'budget_fallbacks'))
+METRICS.register_collector('llm_client', get_llm_client_stats, counters=('requests', 'errors'))
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def _handler_class(registry: MetricsRegistry):
+    """Request handler serving GET /metrics (Prometheus text) and /metrics.json (snapshot)."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.prometheus_text().encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+            elif self.path == '/metrics.json':
+                body = json.dumps(registry.snapshot(), default=str).encode('utf-8')
+                content_type = 'application/json; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            log.debug("metrics_scraped", client=self.client_address[0], request=format % args, sampled=True)
+
+    return MetricsHandler
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """
+    Serve METRICS on ``host:port`` from a daemon thread (once per process).
+
+    Returns:
+        The running ThreadingHTTPServer, or None when ``port`` is 0 or the port
+        is taken (e.g. by another worker process on the same host)
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            # http.server is only imported when the endpoint is enabled (cold start)
+            from http.server import ThreadingHTTPServer
+            try:
+                _server = ThreadingHTTPServer((host, port), _handler_class(METRICS))
+            except OSError as e:
+                log.warning("metrics_server_failed", host=host, port=port, error=str(e))
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            log.info("metrics_server_started", host=host, port=port)
+        return _server
@@ -0,0 +1,248 @@
+"""
+Rule Profiler
+-------------
+Opt-in per-rule firing profiler for the Experta expert engines.
+
+When profiling is enabled, an engine's ``run()`` records for every rule how
+many activations reached the agenda, how many of them fired and how much time
+was spent inside the rule's right-hand side (RHS). Each run also records the
+agenda size and the working-memory fact count.
+
+Reports are available per run (``engine.get_last_run_profile()``) and
+aggregated per process (``get_process_rule_profile()``) as plain dictionaries
+that can be rendered directly on a diagnostics page.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from experta import KnowledgeEngine, watchers
+
+from config import ENABLE_RULE_PROFILING
+
+
+class RuleStats:
+    """Activation/firing counters and cumulative RHS time for one rule."""
+
+    __slots__ = ('activations', 'firings', 'rhs_time')
+
+    def __init__(self):
+        self.activations = 0
+        self.firings = 0
+        self.rhs_time = 0.0
+
+    def merge(self, other: 'RuleStats'):
+        """Add another rule's counters to this one."""
+        self.activations += other.activations
+        self.firings += other.firings
+        self.rhs_time += other.rhs_time
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for reporting."""
+        return {
+            'activations': self.activations,
+            'firings': self.firings,
+            'rhs_time_ms': self.rhs_time * 1000,
+            'avg_rhs_time_ms': (self.rhs_time * 1000 / self.firings) if self.firings else 0.0
+        }
+
+
+class RunProfile:
+    """Profile of a single ``run()`` of one engine."""
+
+    def __init__(self, engine_name: str):
+        self.engine_name = engine_name
+        self.rules: Dict[str, RuleStats] = {}
+        self.initial_agenda_size = 0
+        self.peak_agenda_size = 0
+        self.final_agenda_size = 0
+        self.fact_count = 0
+        self.total_time = 0.0
+
+    def rule(self, name: str) -> RuleStats:
+        """Get (or create) the counters for a rule."""
+        stats = self.rules.get(name)
+        if stats is None:
+            stats = self.rules[name] = RuleStats()
+        return stats
+
+    @property
+    def total_firings(self) -> int:
+        return sum(stats.firings for stats in self.rules.values())
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for reporting."""
+        return {
+            'engine': self.engine_name,
+            'total_time_ms': self.total_time * 1000,
+            'total_firings': self.total_firings,
+            'initial_agenda_size': self.initial_agenda_size,
+            'peak_agenda_size': self.peak_agenda_size,
+            'final_agenda_size': self.final_agenda_size,
+            'fact_count': self.fact_count,
+            'rules': {name: stats.to_dict() for name, stats in self.rules.items()}
+        }
+
+
+class RuleProfiler:
+    """
+    Process-wide aggregate of run profiles, grouped by engine.
+
+    Thread-safe: Streamlit serves sessions from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Dict] = {}
+
+    def record(self, profile: RunProfile):
+        """Merge a finished run into the per-process totals."""
+        with self._lock:
+            engine = self._engines.get(profile.engine_name)
+            if engine is None:
+                engine = self._engines[profile.engine_name] = {
+                    'runs': 0,
+                    'total_time': 0.0,
+                    'peak_agenda_size': 0,
+                    'total_agenda_size': 0,
+                    'peak_fact_count': 0,
+                    'total_fact_count': 0,
+                    'rules': {}
+                }
+            engine['runs'] += 1
+            engine['total_time'] += profile.total_time
+            engine['peak_agenda_size'] = max(engine['peak_agenda_size'], profile.peak_agenda_size)
+            engine['total_agenda_size'] += profile.peak_agenda_size
+            engine['peak_fact_count'] = max(engine['peak_fact_count'], profile.fact_count)
+            engine['total_fact_count'] += profile.fact_count
+            for name, stats in profile.rules.items():
+                engine['rules'].setdefault(name, RuleStats()).merge(stats)
+
+    def report(self, top_n: Optional[int] = None) -> Dict:
+        """
+        Get the aggregated report.
+
+        Args:
+            top_n: If given, only include the N rules with the highest cumulative RHS time per engine
+
+        Returns:
+            {engine_name: {'runs': ..., 'avg_run_time_ms': ..., 'rules': {...}}}
+        """
+        with self._lock:
+            report = {}
+            for name, engine in self._engines.items():
+                runs = engine['runs']
+                rules = sorted(engine['rules'].items(), key=lambda item: item[1].rhs_time, reverse=True)
+                if top_n is not None:
+                    rules = rules[:top_n]
+                report[name] = {
+                    'runs': runs,
+                    'total_time_ms': engine['total_time'] * 1000,
+                    'avg_run_time_ms': engine['total_time'] * 1000 / runs,
+                    'peak_agenda_size': engine['peak_agenda_size'],
+                    'avg_agenda_size': engine['total_agenda_size'] / runs,
+                    'peak_fact_count': engine['peak_fact_count'],
+                    'avg_fact_count': engine['total_fact_count'] / runs,
+                    'rules': {rule_name: stats.to_dict() for rule_name, stats in rules}
+                }
+            return report
+
+    def reset(self):
+        """Clear all aggregated data."""
+        with self._lock:
+            self._engines = {}
+
+
+# Process-wide profiler shared by all engines
+PROCESS_PROFILER = RuleProfiler()
+
+
+def get_process_rule_profile(top_n: Optional[int] = None) -> Dict:
+    """Get the per-process rule profile (see RuleProfiler.report)."""
+    return PROCESS_PROFILER.report(top_n)
+
+
+class ProfiledKnowledgeEngine(KnowledgeEngine):
+    """
+    KnowledgeEngine whose ``run()`` can record per-rule statistics.
+
+    Profiling is off by default (config.ENABLE_RULE_PROFILING) and can be
+    switched per instance with ``enable_profiling()``. When disabled, ``run()``
+    is Experta's own implementation with no overhead.
+    """
+
+    profiling_enabled = ENABLE_RULE_PROFILING
+
+    def __init__(self):
+        super().__init__()
+        self.last_run_profile: Optional[RunProfile] = None
+
+    def enable_profiling(self, enabled: bool = True):
+        """Turn profiling on or off for this engine instance."""
+        self.profiling_enabled = enabled
+
+    def get_last_run_profile(self) -> Optional[Dict]:
+        """Get the profile of the most recent run, or None if not profiled."""
+        return self.last_run_profile.to_dict() if self.last_run_profile else None
+
+    def run(self, steps=float('inf')):
+        """Execute agenda activations, recording a RunProfile when profiling is enabled."""
+        if not self.profiling_enabled:
+            self.last_run_profile = None
+            return super().run(steps)
+
+        profile = RunProfile(self.__class__.__name__)
+        run_start = time.perf_counter()
+
+        # Activations created by declare() before run() are already on the agenda
+        for act in self.agenda.activations:
+            profile.rule(act.rule.__name__).activations += 1
+        profile.initial_agenda_size = len(self.agenda.activations)
+        profile.peak_agenda_size = profile.initial_agenda_size
+
+        self.running = True
+        execution = 0
+        while steps > 0 and self.running:
+            added, removed = self.get_activations()
+            for act in added:
+                profile.rule(act.rule.__name__).activations += 1
+            self.strategy.update_agenda(self.agenda, added, removed)
+
+            agenda_size = len(self.agenda.activations)
+            if agenda_size > profile.peak_agenda_size:
+                profile.peak_agenda_size = agenda_size
+
+            activation = self.agenda.get_next()
+            if activation is None:
+                break
+
+            steps -= 1
+            execution += 1
+            rule_name = activation.rule.__name__
+
+            watchers.RULES.info(
+                "FIRE %s %s: %s",
+                execution,
+                rule_name,
+                ", ".join(str(f) for f in activation.facts))
+
+            rhs_start = time.perf_counter()
+            try:
+                activation.rule(
+                    self,
+                    **{k: v
+                       for k, v in activation.context.items()
+                       if not k.startswith('__')})
+            finally:
+                stats = profile.rule(rule_name)
+                stats.firings += 1
+                stats.rhs_time += time.perf_counter() - rhs_start
+
+        self.running = False
+
+        profile.final_agenda_size = len(self.agenda.activations)
+        profile.fact_count = len(self.facts)
+        profile.total_time = time.perf_counter() - run_start
+        self.last_run_profile = profile
+        PROCESS_PROFILER.record(profile)
@@ -0,0 +1,239 @@
+"""
+Spelling Correction
+-------------------
+Symmetric-delete (SymSpell) spelling correction over a fixed vocabulary.
+
+Every vocabulary word is indexed under the strings obtained by deleting up to
+``max_distance`` characters from its first ``prefix_length`` characters. A
+misspelled word generates the same kind of deletes, so candidate corrections
+are found with a few dozen dictionary lookups instead of a scan of the
+vocabulary; only those candidates get a full edit distance computation
+(optimal string alignment: insert, delete, substitute, swap adjacent letters).
+
+The index is built once (a vocabulary of a few thousand words takes tens of
+milliseconds) and lookups take microseconds; results for recently seen words
+are cached, since students repeat the same misspellings. Words in ``known_words`` are
+recognised as correctly spelled but never suggested, so ordinary English words
+of the query are left alone without becoming correction targets;
+english_words.txt holds a general list of them. Inflected forms of known
+words (``laws``, ``compared``) count as known too.
+
+Only ``domain_words`` get the full edit budget. Other targets are corrected
+at most one edit away, so a correct word outside the vocabulary is not
+rewritten into a distant, unrelated one. Corrections keep the first letter of
+the word (it is rarely the mistyped one), so ``france`` does not become
+``range``.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from config import SPELLING_MAX_EDIT_DISTANCE, SPELLING_PREFIX_LENGTH, SPELLING_MIN_WORD_LENGTH
+
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+# General English words (utils/english_words.txt)
+ENGLISH_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'english_words.txt')
+
+# (suffix, replacement) turning an inflected word back into its stem
+INFLECTIONS = (
+    ('ies', 'y'), ('ied', 'y'), ('es', ''), ('s', ''), ('ed', ''), ('ed', 'e'),
+    ('ing', ''), ('ing', 'e'), ('er', ''), ('er', 'e'), ('est', ''), ('est', 'e'), ('ly', ''),
+    ('ness', ''), ('ment', ''), ('ful', ''), ('less', '')
+)
+
+
+def load_word_list(path: str = ENGLISH_WORDS_PATH) -> FrozenSet[str]:
+    """Lowercase words of a whitespace-separated word list (``#`` starts a comment line)."""
+    words = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.startswith('#'):
+                words.update(WORD_PATTERN.findall(line.lower()))
+    return frozenset(words)
+
+
+def word_stems(word: str) -> Iterable[str]:
+    """Candidate stems of an inflected word (``magnets`` -> ``magnet``, ``stopped`` -> ``stop``)."""
+    for suffix, replacement in INFLECTIONS:
+        if len(word) - len(suffix) < 3 or not word.endswith(suffix):
+            continue
+        stem = word[:len(word) - len(suffix)]
+        yield stem + replacement
+        if not replacement and stem[-1] == stem[-2]:
+            yield stem[:-1]
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance between ``a`` and ``b``.
+
+    Returns:
+        The distance, or ``max_distance + 1`` once it is known to exceed ``max_distance``
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # Candidates mostly share a prefix (and often a suffix) with the word: skip them
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b) if len(a) + len(b) <= max_distance else max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    """``word`` and every string made by deleting up to ``max_distance`` characters from it."""
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+class SpellingIndex:
+    """
+    SymSpell index of correction targets with their frequencies.
+
+    Args:
+        words: Correction target -> frequency (ties between equally close
+            candidates go to the more frequent word)
+        known_words: Further words that are spelled correctly but never suggested
+        domain_words: Targets corrected up to ``max_distance`` edits away (the
+            others at most one edit away); None = all targets
+        max_distance: Largest edit distance corrected
+        prefix_length: Characters of each word the delete index covers
+        min_length: Shorter query words are never corrected
+        same_first_letter: Only suggest targets starting with the word's first letter
+    """
+
+    # Distinct query words whose lookup result is kept
+    CACHE_SIZE = 4096
+
+    def __init__(self, words: Dict[str, int], known_words: Iterable[str] = (),
+                 domain_words: Optional[Iterable[str]] = None,
+                 max_distance: int = SPELLING_MAX_EDIT_DISTANCE, prefix_length: int = SPELLING_PREFIX_LENGTH,
+                 min_length: int = SPELLING_MIN_WORD_LENGTH, same_first_letter: bool = True):
+        self.max_distance = max_distance
+        self.same_first_letter = same_first_letter
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.frequencies = dict(words)
+        self.known = frozenset(known_words) | frozenset(self.frequencies)
+        self.domain = frozenset(self.frequencies) if domain_words is None else frozenset(domain_words)
+        # delete -> target words (a str for the common single-word case, else a tuple)
+        self._index: Dict[str, object] = {}
+        for word in self.frequencies:
+            reach = max_distance if word in self.domain else min(max_distance, 1)
+            for delete in _deletes(word[:prefix_length], reach):
+                present = self._index.get(delete)
+                if present is None:
+                    self._index[delete] = word
+                elif isinstance(present, str):
+                    self._index[delete] = (present, word)
+                else:
+                    self._index[delete] = present + (word,)
+        self._cached_lookup = lru_cache(maxsize=self.CACHE_SIZE)(self._lookup)
+
+    def _allowed_distance(self, word: str) -> int:
+        """Edit budget for a word: one edit below six letters, so short words are not rewritten wholesale."""
+        if len(word) < self.min_length:
+            return 0
+        return min(self.max_distance, 1 if len(word) < 6 else 2)
+
+    def lookup(self, word: str) -> Optional[Tuple[str, int]]:
+        """
+        Closest vocabulary word to a lowercase word that is not itself known.
+
+        Returns:
+            (correction, distance), or None if ``word`` is known, too short or
+            has no target within its edit budget
+        """
+        if self.is_known(word):
+            return None
+        return self._cached_lookup(word)
+
+    def is_known(self, word: str) -> bool:
+        """Whether a lowercase word, or the stem of an inflected one, is spelled correctly."""
+        return word in self.known or any(stem in self.known for stem in word_stems(word))
+
+    def _lookup(self, word: str) -> Optional[Tuple[str, int]]:
+        max_distance = self._allowed_distance(word)
+        if not max_distance:
+            return None
+        best = None
+        seen = set()
+        for delete in _deletes(word[:self.prefix_length], max_distance):
+            targets = self._index.get(delete)
+            if targets is None:
+                continue
+            for target in (targets,) if isinstance(targets, str) else targets:
+                if target in seen:
+                    continue
+                seen.add(target)
+                if self.same_first_letter and target[0] != word[0]:
+                    continue
+                # Only candidates at least as close as the best so far matter
+                limit = best[0] if best else max_distance
+                if target not in self.domain:
+                    limit = min(limit, 1)
+                distance = edit_distance(word, target, limit)
+                if distance > limit:
+                    continue
+                rank = (distance, -self.frequencies[target], target)
+                if best is None or rank < best:
+                    best = rank
+        return (best[2], best[0]) if best else None
+
+    def correct(self, text: str) -> Tuple[str, List[Dict[str, object]]]:
+        """
+        Correct every misspelled word of ``text``.
+
+        Returns:
+            (lowercased text with corrections applied, one
+            {'original', 'corrected', 'distance'} dict per corrected word)
+        """
+        corrections = []
+
+        def replace(match):
+            found = self.lookup(match.group(0))
+            if found is None:
+                return match.group(0)
+            corrections.append({'original': match.group(0), 'corrected': found[0], 'distance': found[1]})
+            return found[0]
+
+        corrected = WORD_PATTERN.sub(replace, text.lower())
+        return corrected, corrections
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'words': len(self.frequencies),
+            'domain_words': len(self.domain),
+            'known_words': len(self.known),
+            'deletes': len(self._index),
+            'max_distance': self.max_distance,
+            'prefix_length': self.prefix_length,
+            'cached_lookups': self._cached_lookup.cache_info().currsize
+        }
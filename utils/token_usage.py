@@ -0,0 +1,200 @@
+"""
+Token Usage Accounting
+----------------------
+LLM token usage by stage, per session and per process, with budgets.
+
+Every chat-completion call site reports its response with
+``record_usage(stage, response)``. The counts go to the current request trace
+(see utils/tracing.py) and to the process-wide ``TOKEN_USAGE`` ledger, under
+the session of the active log context (utils/log.py) or an explicit
+``session_id``.
+
+Stages: routing, enhancement, synthesis (ExpertAgent), study_guide_refinement,
+reasoning_explanation (study guide tab), intent_classification, refinement
+(Orchestrator).
+
+Once a session has used ``SESSION_TOKEN_BUDGET`` tokens (or the process
+``PROCESS_TOKEN_BUDGET``), call sites check ``TOKEN_USAGE.over_budget()``
+before calling the LLM and answer from LLM_CACHE or their template fallback
+instead (counted with ``note_fallback()``). A session's usage is saved with
+its SessionState, so the budget holds across worker processes.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import (
+    SESSION_TOKEN_BUDGET, PROCESS_TOKEN_BUDGET, LLM_PROMPT_PRICE_PER_1K,
+    LLM_COMPLETION_PRICE_PER_1K, TOKEN_USAGE_MAX_SESSIONS
+)
+from utils.log import current_context
+from utils.tracing import current_trace, usage_counts
+
+COUNT_FIELDS = ('calls', 'prompt_tokens', 'completion_tokens', 'total_tokens')
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised instead of an LLM call when the session or process budget is used up."""
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of the given token counts."""
+    return (prompt_tokens * LLM_PROMPT_PRICE_PER_1K + completion_tokens * LLM_COMPLETION_PRICE_PER_1K) / 1000
+
+
+def _summarize(by_stage: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """Totals, estimated cost and a per-stage copy of stage counters."""
+    prompt = sum(c['prompt_tokens'] for c in by_stage.values())
+    completion = sum(c['completion_tokens'] for c in by_stage.values())
+    return {
+        'calls': sum(c['calls'] for c in by_stage.values()),
+        'prompt_tokens': prompt,
+        'completion_tokens': completion,
+        'total_tokens': prompt + completion,
+        'cost_usd': estimate_cost(prompt, completion),
+        'by_stage': {stage: dict(counts) for stage, counts in by_stage.items()}
+    }
+
+
+def _add(by_stage: Dict[str, Dict[str, int]], stage: str, counts: Dict[str, int]):
+    totals = by_stage.setdefault(stage, dict.fromkeys(COUNT_FIELDS, 0))
+    totals['calls'] += 1
+    for key in COUNT_FIELDS[1:]:
+        totals[key] += counts.get(key, 0)
+
+
+class TokenLedger:
+    """
+    Thread-safe per-session and per-process token counters.
+
+    Args:
+        session_budget: Tokens per session before over_budget() (0 = unlimited)
+        process_budget: Tokens per process before over_budget() for everyone (0 = unlimited)
+        max_sessions: Sessions kept in memory (least recently used are dropped;
+            their usage lives on in the session store)
+    """
+
+    def __init__(self, session_budget: int = SESSION_TOKEN_BUDGET, process_budget: int = PROCESS_TOKEN_BUDGET,
+                 max_sessions: int = TOKEN_USAGE_MAX_SESSIONS):
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.max_sessions = max_sessions
+        self._sessions: 'OrderedDict[str, Dict[str, Dict[str, int]]]' = OrderedDict()
+        self._process: Dict[str, Dict[str, int]] = {}
+        self._fallbacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> Dict[str, Dict[str, int]]:
+        """Counters of a session, marked most recently used (call with the lock held)."""
+        usage = self._sessions.get(session_id)
+        if usage is None:
+            usage = self._sessions[session_id] = {}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return usage
+
+    def record(self, stage: str, counts: Dict[str, int], session_id: Optional[str] = None):
+        """Add one call's token counts (see usage_counts) to the process and the session."""
+        with self._lock:
+            _add(self._process, stage, counts)
+            if session_id is not None:
+                _add(self._session(session_id), stage, counts)
+
+    def note_fallback(self, stage: str):
+        """Count a call that was answered without the LLM because of the budget."""
+        with self._lock:
+            self._fallbacks[stage] = self._fallbacks.get(stage, 0) + 1
+
+    def session_tokens(self, session_id: Optional[str]) -> int:
+        with self._lock:
+            usage = self._sessions.get(session_id, {}) if session_id is not None else {}
+            return sum(counts['total_tokens'] for counts in usage.values())
+
+    def process_tokens(self) -> int:
+        with self._lock:
+            return sum(counts['total_tokens'] for counts in self._process.values())
+
+    def over_budget(self, session_id: Optional[str] = None) -> bool:
+        """Whether the session (or the whole process) has used up its token budget."""
+        if self.process_budget and self.process_tokens() >= self.process_budget:
+            return True
+        return bool(self.session_budget) and self.session_tokens(session_id) >= self.session_budget
+
+    def session_usage(self, session_id: str) -> Dict[str, Any]:
+        """A session's totals, cost, per-stage counters and budget state."""
+        with self._lock:
+            summary = _summarize(self._sessions.get(session_id, {}))
+        summary['budget'] = self.session_budget
+        summary['over_budget'] = self.over_budget(session_id)
+        return summary
+
+    def export(self, session_id: str) -> Dict[str, Dict[str, int]]:
+        """A session's per-stage counters, for SessionState.token_usage."""
+        with self._lock:
+            return {stage: dict(counts) for stage, counts in self._sessions.get(session_id, {}).items()}
+
+    def restore(self, session_id: str, by_stage: Optional[Dict[str, Dict[str, int]]]):
+        """
+        Merge stored per-stage counters into a session.
+
+        Counters only grow, so the larger of the stored and in-memory value wins
+        per field; usage recorded here but not yet saved is kept.
+        """
+        with self._lock:
+            usage = self._session(session_id)
+            for stage, counts in (by_stage or {}).items():
+                totals = usage.setdefault(stage, dict.fromkeys(COUNT_FIELDS, 0))
+                for key in COUNT_FIELDS:
+                    totals[key] = max(totals[key], int(counts.get(key, 0)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Process totals by stage, budget fallbacks and tracked sessions."""
+        with self._lock:
+            summary = _summarize(self._process)
+            summary['sessions'] = len(self._sessions)
+            summary['budget_fallbacks'] = dict(self._fallbacks)
+        summary['session_budget'] = self.session_budget
+        summary['process_budget'] = self.process_budget
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._sessions.clear()
+            self._process.clear()
+            self._fallbacks.clear()
+
+
+# Process-wide token ledger
+TOKEN_USAGE = TokenLedger()
+
+
+def record_usage(stage: str, response: Any, session_id: Optional[str] = None):
+    """
+    Record an LLM response's token usage under ``stage``.
+
+    Adds it to the current request trace (if any) and to TOKEN_USAGE, for
+    ``session_id`` or else the session of the active log context.
+    """
+    counts = usage_counts(response)
+    if not counts:
+        return
+    trace = current_trace()
+    if trace is not None:
+        trace.add_tokens(stage, counts)
+    TOKEN_USAGE.record(stage, counts, session_id or current_context().get('session_id'))
+
+
+def budget_exhausted(stage: str, session_id: Optional[str] = None) -> bool:
+    """
+    Whether ``stage`` must skip its LLM call because the token budget is spent.
+
+    Checks ``session_id`` (default: the active log context's session) and the
+    process budget, and counts the fallback when it returns True.
+    """
+    if not TOKEN_USAGE.over_budget(session_id or current_context().get('session_id')):
+        return False
+    TOKEN_USAGE.note_fallback(stage)
+    return True
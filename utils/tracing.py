@@ -0,0 +1,230 @@
+"""
+Request Tracing
+---------------
+Per-request trace spans with monotonic timings and LLM token counts.
+
+A request opens a trace with ``start_trace()``; code anywhere below it on the
+same thread records spans with ``span(name)``, a no-op when no trace is active,
+so helpers can be instrumented without knowing who called them. LLM token
+usage reaches the trace through ``utils.token_usage.record_usage()``.
+
+``RequestTrace.to_dict()`` is what pipelines return under a result's
+``timings`` key. When a trace finishes, its span durations are also added to
+the per-process ``TRACE_HISTOGRAMS`` (one latency histogram per trace/span
+name).
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import TRACE_HISTOGRAM_BUCKETS_MS
+
+
+def usage_counts(response: Any) -> Optional[Dict[str, int]]:
+    """
+    Prompt/completion token counts of an LLM response.
+
+    Understands OpenAI responses (``.usage``) and Gemini responses
+    (``.usage_metadata``); a usage object itself is accepted too.
+
+    Returns:
+        {'prompt_tokens', 'completion_tokens', 'total_tokens'} or None if unknown
+    """
+    if response is None:
+        return None
+    usage = getattr(response, 'usage', None) or getattr(response, 'usage_metadata', None) or response
+    prompt = getattr(usage, 'prompt_tokens', None)
+    completion = getattr(usage, 'completion_tokens', None)
+    if prompt is None and completion is None:
+        prompt = getattr(usage, 'prompt_token_count', None)
+        completion = getattr(usage, 'candidates_token_count', None)
+    if prompt is None and completion is None:
+        return None
+    prompt, completion = int(prompt or 0), int(completion or 0)
+    return {'prompt_tokens': prompt, 'completion_tokens': completion, 'total_tokens': prompt + completion}
+
+
+class RequestTrace:
+    """
+    Spans and token counts of one request.
+
+    Args:
+        name: Pipeline name (e.g. 'expert_agent'), used as histogram prefix
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, Dict[str, int]] = {}
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block as a span.
+
+        Yields:
+            The span's attribute dict; the block may add attributes to it
+        """
+        record = {'name': name, 'start_ms': (time.perf_counter() - self.started) * 1000}
+        record.update(attrs)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['duration_ms'] = (time.perf_counter() - start) * 1000
+            self.spans.append(record)
+
+    def add_tokens(self, stage: str, counts: Dict[str, int]):
+        """Add token counts (see usage_counts) to a stage."""
+        totals = self.tokens.setdefault(stage, {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0})
+        totals['calls'] += 1
+        for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            totals[key] += counts.get(key, 0)
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Milliseconds per span name (summed over repeated spans)."""
+        totals = {}
+        for record in self.spans:
+            totals[record['name']] = totals.get(record['name'], 0.0) + record['duration_ms']
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict form returned under a result's ``timings`` key."""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            'total_ms': (end - self.started) * 1000,
+            'stages_ms': self.stage_totals(),
+            'spans': sorted(self.spans, key=lambda record: record['start_ms']),
+            'tokens': {
+                'prompt_tokens': sum(t['prompt_tokens'] for t in self.tokens.values()),
+                'completion_tokens': sum(t['completion_tokens'] for t in self.tokens.values()),
+                'total_tokens': sum(t['total_tokens'] for t in self.tokens.values()),
+                'by_stage': {stage: dict(totals) for stage, totals in self.tokens.items()}
+            }
+        }
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram (milliseconds)."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds=TRACE_HISTOGRAM_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket: above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile ``q`` (capped at the largest observed value)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_ms': self.total,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.quantile(0.50),
+            'p95_ms': self.quantile(0.95),
+            'max_ms': self.max,
+            'buckets': {str(bound): n for bound, n in zip(self.bounds + ('+Inf',), self.counts)}
+        }
+
+
+class StageHistograms:
+    """Per-process latency histograms keyed by '<trace>.<span>' (thread-safe)."""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, value_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(value_ms)
+
+    def record(self, trace: RequestTrace):
+        """Add a finished trace: its total and the summed duration of each span name."""
+        trace.finish()
+        self.observe(f"{trace.name}.total", (trace.finished - trace.started) * 1000)
+        for name, value_ms in trace.stage_totals().items():
+            self.observe(f"{trace.name}.{name}", value_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {key: histogram.to_dict() for key, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Process-wide stage latency histograms
+TRACE_HISTOGRAMS = StageHistograms()
+
+_local = threading.local()
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace active on this thread, if any."""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[RequestTrace]:
+    """
+    Make a new trace current for the block and record it in TRACE_HISTOGRAMS.
+
+    If a trace is already active on this thread (a nested request), that trace
+    is yielded instead and left running.
+    """
+    outer = current_trace()
+    if outer is not None:
+        yield outer
+        return
+    trace = RequestTrace(name)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = None
+        trace.finish()
+        TRACE_HISTOGRAMS.record(trace)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict[str, Any]]:
+    """Span on the current trace (yields a throwaway dict when none is active)."""
+    trace = current_trace()
+    if trace is None:
+        yield dict(attrs)
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+